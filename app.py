@@ -44,12 +44,18 @@ autodrive = TernaryObstacleAvoider()
 #    autodrive = BinaryObstacleAvoider()
 
 from felix.nodes.detector import Detector
+from felix.nodes.inference_server import InferenceServer
 from felix.nodes.object_seeker import ObjectSeeker
 
 controller = Controller(frequency=30)
 pico = PicoSensors()
 robot = Robot()
 detector = Detector(frequency=8)  # perception only: publishes Topics.detections
+# One worker runs both camera models on each new frame (shared preprocessing,
+# one CUDA stream); they are not spun on their own.
+inference = InferenceServer(frequency=20)
+inference.register(autodrive)
+inference.register(detector, frequency=8)
 object_seeker = ObjectSeeker(target_label="person")  # detections -> cmd_vel
 
 state = AppState()
@@ -71,10 +77,9 @@ async def _start_background_nodes():
     _video_thread = threading.Thread(target=video_stream.run, daemon=True)
     _video_thread.start()
     for coro in (
-        pico.spin(10),
+        pico.spin(),
         controller.spin(),
-        autodrive.spin(20),
-        detector.spin(8),
+        inference.spin(),
         object_seeker.spin(8),
     ):
         asyncio.create_task(coro)
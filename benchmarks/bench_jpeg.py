@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+JPEG encode benchmark on the 960x540 BGR frames CameraCapture produces:
+every available backend at each quality / chroma setting on the calling
+thread, then pooled throughput through JpegEncoder.submit.
+
+    python -m benchmarks.bench_jpeg --iterations 200 --quality 75 --quality 90
+"""
+
+import os
+import time
+
+import click
+import cv2
+import numpy as np
+
+from felix.vision.jpeg import (
+    Chroma, JpegBackendType, JpegEncoder, create_jpeg_backend,
+)
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(__file__), "..", "felix", "mock", "camera_image.jpg")
+
+
+def _frames(width, height):
+    """The mock camera image (a real scene) plus flipped/shifted variants."""
+    image = cv2.imread(SAMPLE_IMAGE)
+    if image is None:
+        rng = np.random.default_rng(0)
+        image = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return [image, cv2.flip(image, 1), np.roll(image, width // 3, axis=1), cv2.flip(image, 0)]
+
+
+def _stats(samples_ms):
+    ms = np.array(samples_ms)
+    return f"mean {ms.mean():6.2f} ms  p50 {np.percentile(ms, 50):6.2f} ms  p99 {np.percentile(ms, 99):6.2f} ms"
+
+
+@click.command()
+@click.option("--iterations", type=int, default=200)
+@click.option("--width", type=int, default=960)
+@click.option("--height", type=int, default=540)
+@click.option("--quality", "qualities", type=int, multiple=True, default=(75, 90))
+@click.option("--workers", type=int, default=2)
+def cli(iterations, width, height, qualities, workers):
+    frames = _frames(width, height)
+
+    print(f"single-thread encode, {width}x{height}")
+    for backend_type in (JpegBackendType.opencv, JpegBackendType.turbojpeg, JpegBackendType.nvjpeg):
+        for chroma in Chroma:
+            backend = create_jpeg_backend(backend_type, chroma=chroma)
+            if backend.name != backend_type.value:
+                break  # not available here (fell back to opencv)
+            for quality in qualities:
+                backend.encode(frames[0], quality)
+                samples, size = [], 0
+                for i in range(iterations):
+                    start = time.perf_counter()
+                    jpeg = backend.encode(frames[i % len(frames)], quality)
+                    samples.append((time.perf_counter() - start) * 1000.0)
+                    size += len(jpeg)
+                print(f"{backend.name:>9} q{quality:<3} {chroma.value}: {_stats(samples)}  "
+                      f"{size / iterations / 1024:6.1f} KiB")
+
+    encoder = JpegEncoder(backend="auto", quality=qualities[0], workers=workers, max_pending=2 * workers)
+    encoder.encode(frames[0])
+    start = time.perf_counter()
+    futures = [encoder.submit(frames[i % len(frames)]) for i in range(iterations)]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    encoder.shutdown()
+    print(f"pool ({encoder.backend_name}, {workers} workers, q{qualities[0]}): "
+          f"{iterations / elapsed:.1f} frames/s")
+
+
+if __name__ == "__main__":
+    cli()
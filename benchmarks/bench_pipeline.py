@@ -0,0 +1,405 @@
+#!/usr/bin/python3
+"""
+End-to-end perception -> motor benchmark on mocks, runnable on a CPU-only
+Linux box.
+
+A publisher writes frames into the frame ring and announces them on
+Topics.raw_image at the camera rate, exactly as Camera._publish does. The
+frames are synthetic (the mock camera image, shifted per frame) or replayed
+from a folder of JPEGs or .navshard files. The real nodes consume them, wired
+as in app.py:
+
+    InferenceServer -> TernaryObstacleAvoider (random-weight checkpoint)
+                    -> Detector (YOLO if installed, else a stub with --detector-ms latency)
+    Detector -> ObjectSeeker -> Topics.cmd_vel
+    TernaryObstacleAvoider  -> Topics.cmd_vel -> Controller -> MockRosmaster.set_motor
+
+Synthetic ToF readings flow through Topics.pico_sensors. The run reports:
+
+- per-stage latency percentiles: capture -> inference start, inference time
+  per model, capture -> controller (cmd_vel received), capture -> motor write
+- frames published, refused by a full ring, and inferred per model
+- CPU use and resident memory
+- motor writer, inference server and node scheduling stats
+
+Everything is written as JSON. Given a baseline file from another commit,
+the p50/p99 deltas are printed:
+
+    python -m benchmarks.bench_pipeline --duration 20 --output pipeline.json
+    python -m benchmarks.bench_pipeline --baseline pipeline.json
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+import click
+import cv2
+import numpy as np
+import torch
+
+from felix.settings import ModelType, settings
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(__file__), "..", "felix", "mock", "camera_image.jpg")
+
+
+# ---- frame sources ------------------------------------------------------------
+
+def synthetic_frames(width, height, count=30):
+    image = cv2.imread(SAMPLE_IMAGE)
+    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return [np.roll(image, (i * width) // count, axis=1) for i in range(count)]
+
+
+def replay_frames(path, width, height, limit=300):
+    """Frames from a folder of .jpg files or .navshard files, resized to the camera size."""
+    from felix.training.nav_shards import NavShard, find_shards
+
+    path = Path(path)
+    images = []
+    for shard_path in find_shards(path):
+        shard = NavShard(shard_path)
+        images += [shard.image(i) for i in range(min(len(shard), limit - len(images)))]
+    for jpg in sorted(path.rglob("*.jpg"))[: max(0, limit - len(images))]:
+        images.append(cv2.imread(str(jpg)))
+    images = [cv2.resize(im, (width, height), interpolation=cv2.INTER_AREA) for im in images if im is not None]
+    if not images:
+        raise click.ClickException(f"no frames found under {path}")
+    return images
+
+
+# ---- stand-ins ----------------------------------------------------------------
+
+class StubYolo:
+    """Plays ultralytics.YOLO: one 'person' box drifting across the frame, after a fixed delay."""
+
+    names = {0: "person"}
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def predict(self, frame, conf=None, classes=None, verbose=False):
+        time.sleep(self.latency)
+        self.calls += 1
+        cx = 0.5 + 0.3 * math.sin(self.calls / 10.0)
+        boxes = SimpleNamespace(
+            xyxyn=torch.tensor([[cx - 0.1, 0.3, cx + 0.1, 0.9]]),
+            cls=torch.tensor([0.0]),
+            conf=torch.tensor([0.9]),
+        )
+        return [SimpleNamespace(names=self.names, boxes=boxes)]
+
+
+def _random_checkpoint(model_type: ModelType, directory: str) -> str:
+    """Checkpoint of the configured classifier with random weights (latency doesn't depend on them)."""
+    from torchvision.models import alexnet, mobilenet_v3_large, mobilenet_v3_small, resnet50
+
+    builders = {
+        ModelType.resnet_50: resnet50,
+        ModelType.mobilenet_large: mobilenet_v3_large,
+        ModelType.mobilenet_small: mobilenet_v3_small,
+        ModelType.alexnet: alexnet,
+    }
+    model = builders[model_type](weights=None, num_classes=3)
+    path = os.path.join(directory, "bench_classifier.pth")
+    torch.save(model.state_dict(), path)
+    return path
+
+
+# ---- measurement --------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.counts: dict[str, int] = defaultdict(int)
+        self.capture_ts: dict[int, float] = {}
+
+    def since_capture(self, name: str, seq: int | None, now: float):
+        ts = self.capture_ts.get(seq)
+        if ts is not None:
+            self.samples[name].append(now - ts)
+
+    @staticmethod
+    def summary(values: list[float]) -> dict:
+        if not values:
+            return {"n": 0}
+        ms = np.array(values) * 1000.0
+        return {
+            "n": len(ms),
+            "mean_ms": round(float(ms.mean()), 3),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p90_ms": round(float(np.percentile(ms, 90)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "max_ms": round(float(ms.max()), 3),
+        }
+
+    def latencies(self) -> dict:
+        return {name: self.summary(values) for name, values in sorted(self.samples.items())}
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:  # noqa: BLE001
+        return None
+
+
+# ---- the run ------------------------------------------------------------------
+
+def _instrument(recorder, autodrive, detector, seeker, controller, bot):
+    """Wrap the nodes' entry points to timestamp each stage."""
+
+    def timed_infer(node, name):
+        original = node.infer
+        seen = set()
+
+        def infer(shared):
+            start = time.monotonic()
+            recorder.since_capture(f"{name}.queue", shared.seq, start)
+            original(shared)
+            recorder.samples[f"{name}.infer"].append(time.monotonic() - start)
+            seen.add(shared.seq)
+            recorder.counts[f"frames.inferred.{name}"] = len(seen)
+
+        node.infer = infer
+
+    timed_infer(autodrive, "autodrive")
+    timed_infer(detector, "detector")
+
+    origin = {"seq": None}
+    on_cmd_vel = controller._on_cmd_vel_signal
+
+    def on_cmd_vel_signal(sender, payload):
+        now = time.monotonic()
+        if sender == "autodrive":
+            seq = autodrive.frame_seq
+        elif sender == "seek" and seeker.latest is not None:
+            seq = seeker.latest.seq
+        else:
+            seq = None
+        recorder.since_capture(f"capture_to_controller.{sender}", seq, now)
+        origin["seq"] = seq
+        on_cmd_vel(sender, payload=payload)
+
+    # Topics hold receivers weakly: keep the wrapper alive on the controller.
+    controller._bench_on_cmd_vel = on_cmd_vel_signal
+    from felix.signals import Topics
+    Topics.cmd_vel.disconnect(on_cmd_vel)
+    Topics.cmd_vel.connect(on_cmd_vel_signal)
+
+    set_motor = bot.set_motor
+
+    def timed_set_motor(*powers):
+        recorder.since_capture("capture_to_motor", origin["seq"], time.monotonic())
+        recorder.counts["motor_writes"] += 1
+        return set_motor(*powers)
+
+    # MotorCommandWriter captured bot.set_motor at construction
+    bot.set_motor = timed_set_motor
+    controller._motor_writer._write = timed_set_motor
+
+
+async def _publish(frames, fps, duration, recorder):
+    from felix.signals import Topics
+    from felix.vision.frame_ring import frame_ring
+    from lib.interfaces import SensorReading
+
+    period = 1.0 / fps
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    n = 0
+    while loop.time() - start < duration:
+        frame = frames[n % len(frames)]
+        seq = frame_ring.write(frame)
+        recorder.counts["frames.published"] += 1
+        if seq is None:
+            recorder.counts["frames.ring_full"] += 1
+        else:
+            with frame_ring.lease(seq) as lease:
+                recorder.capture_ts[seq] = lease.ts
+                Topics.raw_image.send("bench", payload=lease.image, seq=seq, ts=lease.ts)
+        for sensor_id in (0, 1):
+            Topics.pico_sensors.send(payload=SensorReading(
+                id=sensor_id, type="tof", value=900 + 100 * math.sin(n / 15.0), ts=int(time.time()),
+                received_at=time.monotonic(),
+            ))
+        n += 1
+        await asyncio.sleep(max(0.0, start + n * period - loop.time()))
+
+
+async def _run(frames, fps, duration, inference_hz, detector_hz, seeker_hz, controller_hz, detector_ms):
+    from felix.nodes import controller as controller_module
+    from felix.nodes import autodriver as autodriver_module
+    from felix.nodes.autodriver import TernaryObstacleAvoider
+    from felix.nodes.controller import Controller
+    from felix.nodes.detector import Detector
+    from felix.nodes.inference_server import InferenceServer
+    from felix.nodes.object_seeker import ObjectSeeker
+    from lib.mock.rosmaster import MockRosmaster
+
+    controller_module.Rosmaster = MockRosmaster
+    autodriver_module.DEBUG = False
+
+    recorder = Recorder()
+    controller = Controller(frequency=controller_hz)
+    autodrive = TernaryObstacleAvoider()
+    detector = Detector(frequency=detector_hz)
+    if not detector.model_loaded:
+        detector.model = StubYolo(detector_ms)
+        detector.model_loaded = True
+    seeker = ObjectSeeker(target_label="person")
+    inference = InferenceServer(frequency=inference_hz)
+    inference.register(autodrive)
+    inference.register(detector, frequency=detector_hz)
+    _instrument(recorder, autodrive, detector, seeker, controller, controller._bot)
+
+    autodrive.is_active = True
+    seeker.activate(True)
+
+    rusage = resource.getrusage(resource.RUSAGE_SELF)
+    rss_before = _rss_mb()
+    wall = time.monotonic()
+    tasks = [
+        asyncio.create_task(controller.spin()),
+        asyncio.create_task(inference.spin()),
+        asyncio.create_task(seeker.spin(seeker_hz)),
+    ]
+    await _publish(frames, fps, duration, recorder)
+    wall = time.monotonic() - wall
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    for node in (inference, seeker, controller):
+        node._running = False
+    await asyncio.sleep(0.2)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    published = recorder.counts["frames.published"]
+    result = {
+        "latency": recorder.latencies(),
+        "frames": {
+            "published": published,
+            "ring_full": recorder.counts["frames.ring_full"],
+            "inferred": {
+                name: recorder.counts[f"frames.inferred.{name}"] for name in ("autodrive", "detector")
+            },
+            "autodrive_drop_rate": round(1 - recorder.counts["frames.inferred.autodrive"] / max(1, published), 4),
+        },
+        "motor_writes": recorder.counts["motor_writes"],
+        "resources": {
+            "wall_s": round(wall, 3),
+            "cpu_percent": round(
+                100 * ((after.ru_utime - rusage.ru_utime) + (after.ru_stime - rusage.ru_stime)) / wall, 1
+            ),
+            "rss_mb": round(_rss_mb(), 1),
+            "rss_growth_mb": round(_rss_mb() - rss_before, 1),
+            "peak_rss_mb": round(after.ru_maxrss / 1024, 1),
+        },
+        "motor_writer": controller._motor_writer.stats,
+        "inference_server": inference.stats,
+        "spin": {
+            type(node).__name__: str(node.spin_stats) for node in (inference, seeker, controller)
+        },
+    }
+    return result  # nodes shut down through their atexit hooks
+
+
+def _compare(result, baseline, prefix=""):
+    for key, value in result.items():
+        other = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            _compare(value, other or {}, f"{prefix}{key}.")
+        elif key in ("p50_ms", "p99_ms", "cpu_percent", "rss_mb") and isinstance(other, (int, float)) and other:
+            print(f"{prefix}{key:<8} {other:10.2f} -> {value:10.2f}  ({(value - other) / other:+.1%})")
+
+
+@click.command()
+@click.option("--duration", type=float, default=20.0, help="Seconds of frames to publish")
+@click.option("--fps", type=float, default=30.0, help="Camera frame rate")
+@click.option("--width", type=int, default=960)
+@click.option("--height", type=int, default=540)
+@click.option("--replay", type=click.Path(exists=True), default=None, help="Folder of .jpg or .navshard files")
+@click.option("--model-type", type=click.Choice([m.value for m in ModelType]), default=None,
+              help="Classifier architecture (default: config)")
+@click.option("--inference-hz", type=float, default=20.0)
+@click.option("--detector-hz", type=float, default=8.0)
+@click.option("--detector-ms", type=float, default=40.0, help="Stub detector latency when YOLO is unavailable")
+@click.option("--seeker-hz", type=float, default=8.0)
+@click.option("--controller-hz", type=float, default=30.0)
+@click.option("--output", type=click.Path(), default=None, help="Write results JSON here")
+@click.option("--baseline", type=click.Path(exists=True), default=None, help="Results JSON to compare against")
+@click.option("--verbose", is_flag=True, help="Keep node logging and prints")
+def cli(duration, fps, width, height, replay, model_type, inference_hz, detector_hz, detector_ms,
+        seeker_hz, controller_hz, output, baseline, verbose):
+    logging.getLogger().setLevel(logging.INFO if verbose else logging.ERROR)
+    frames = replay_frames(replay, width, height) if replay else synthetic_frames(width, height)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A random-weight checkpoint and throwaway capture folders, so nothing
+        # on the box (models, training data) is read or written.
+        if model_type is not None:
+            settings.model_type = ModelType(model_type)
+        settings.model_file = _random_checkpoint(settings.model_type, tmp)
+        settings.model_backend = "torch"
+        settings.TRAINING.tags_path = os.path.join(tmp, "tags")
+        settings.TRAINING.navigation_path = os.path.join(tmp, "navigation")
+
+        quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            result = asyncio.run(_run(
+                frames, fps, duration, inference_hz, detector_hz, seeker_hz, controller_hz, detector_ms
+            ))
+
+    result = {
+        "config": {
+            "duration_s": duration, "fps": fps, "frame": [width, height],
+            "source": replay or "synthetic", "model_type": settings.model_type.value,
+            "inference_hz": inference_hz, "detector_hz": detector_hz, "detector_ms": detector_ms,
+            "seeker_hz": seeker_hz, "controller_hz": controller_hz,
+        },
+        "environment": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cuda": torch.cuda.is_available(),
+            "cpus": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+        **result,
+    }
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+    if baseline:
+        with open(baseline) as f:
+            print("\nvs baseline:")
+            _compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Micro-benchmark: original AutoDriver.preprocess vs the fused RoiPreprocessor
+on the 960x540 BGR frames CameraCapture produces.
+
+    python -m benchmarks.bench_preprocess --iterations 500 --device cuda
+"""
+
+import time
+
+import click
+import cv2
+import numpy as np
+import torch
+import torchvision
+
+from felix.vision.preprocess import RoiPreprocessor
+from felix.vision.roi_utils import apply_roi_crop
+
+ROI = (0.6, 0.4, 1.0)
+MEAN = 255.0 * np.array([0.485, 0.456, 0.406])
+STDEV = 255.0 * np.array([0.229, 0.224, 0.225])
+NORMALIZE = torchvision.transforms.Normalize(MEAN, STDEV)
+
+
+def legacy_preprocess(sensor_image, device):
+    """AutoDriver.preprocess as it was before RoiPreprocessor."""
+    x = cv2.cvtColor(sensor_image, cv2.COLOR_BGR2RGB)
+    x = apply_roi_crop(x, roi_height_ratio=ROI[0], roi_vertical_offset=ROI[1], roi_width_ratio=ROI[2])
+    x = cv2.resize(x, (224, 224), interpolation=cv2.INTER_LINEAR)
+    x = x.transpose((2, 0, 1))
+    x = torch.from_numpy(x).float()
+    x = NORMALIZE(x)
+    x = x.to(device)
+    return x[None, ...]
+
+
+def _time(fn, frames, iterations, device):
+    for frame in frames[:10]:
+        fn(frame)
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(frames[i % len(frames)])
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        samples.append(time.perf_counter() - start)
+    return np.array(samples) * 1000.0
+
+
+@click.command()
+@click.option("--iterations", type=int, default=500)
+@click.option("--device", type=str, default="cpu")
+@click.option("--width", type=int, default=960)
+@click.option("--height", type=int, default=540)
+def cli(iterations, device, width, height):
+    device = torch.device(device)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(8)]
+    fused = RoiPreprocessor(roi=ROI, device=device)
+
+    diff = (legacy_preprocess(frames[0], device) - fused(frames[0])).abs().max().item()
+    print(f"max abs difference vs legacy: {diff:.2e}")
+
+    for name, fn in (
+        ("legacy", lambda f: legacy_preprocess(f, device)),
+        ("fused", fused),
+    ):
+        ms = _time(fn, frames, iterations, device)
+        print(f"{name:>7}: mean {ms.mean():.3f} ms  p50 {np.percentile(ms, 50):.3f} ms  "
+              f"p99 {np.percentile(ms, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    cli()
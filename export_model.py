@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+import logging
+import random
+from pathlib import Path
+
+import click
+import cv2
+import torch
+
+from felix.inference.backends import (
+    BackendType,
+    Precision,
+    TorchBackend,
+    build_tensorrt_engine,
+    check_parity,
+    create_backend,
+    engine_path_for,
+    export_onnx,
+    onnx_path_for,
+)
+from felix.settings import settings
+
+logger = logging.getLogger("export")
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+
+def _driver():
+    if settings.TRAINING.mode == "binary":
+        from felix.nodes.autodriver import BinaryObstacleAvoider
+        return BinaryObstacleAvoider()
+    from felix.nodes.autodriver import TernaryObstacleAvoider
+    return TernaryObstacleAvoider()
+
+
+def _sample_inputs(driver, samples: int, batch_size: int) -> list[torch.Tensor]:
+    paths = sorted(Path(settings.model_images).rglob("*.jpg"))
+    random.Random(0).shuffle(paths)
+    tensors = []
+    for p in paths[:samples]:
+        image = cv2.imread(str(p))
+        if image is not None:
+            # preprocess() reuses its output tensor, so keep a copy per sample
+            tensors.append(driver.preprocess(image).cpu().clone())
+    return [torch.cat(tensors[i:i + batch_size]) for i in range(0, len(tensors), batch_size)]
+
+
+@click.command()
+@click.option(
+    "--backend",
+    type=click.Choice([b.value for b in BackendType]),
+    default=BackendType.onnxruntime.value,
+    help="Backend to export for and check against PyTorch",
+)
+@click.option(
+    "--precision",
+    type=click.Choice([p.value for p in Precision]),
+    default=Precision.fp16.value,
+    help="Engine precision (int8 is calibrated on training images)",
+)
+@click.option("--samples", type=int, default=256, help="Training images used for parity/calibration")
+@click.option("--batch-size", type=int, default=4, help="Batch size for parity/calibration")
+@click.option("--max-abs-diff", type=float, default=0.02, help="Max allowed softmax difference")
+@click.option("--min-agreement", type=float, default=0.99, help="Min top-1 agreement with PyTorch")
+def cli(backend, precision, samples, batch_size, max_abs_diff, min_agreement):
+    """
+    Export the autodrive checkpoint (settings.model_file) and verify the exported
+    backend agrees with the PyTorch model on real training images.
+    """
+    driver = _driver()
+    if not driver.model_loaded:
+        raise click.ClickException(f"Could not load {driver.model_file}")
+
+    model_file = driver.model_file
+    inputs = _sample_inputs(driver, samples, batch_size)
+    if not inputs:
+        raise click.ClickException(f"No images found under {settings.model_images}")
+
+    onnx_file = export_onnx(driver.build_model(), onnx_path_for(model_file))
+    if backend == BackendType.tensorrt.value:
+        build_tensorrt_engine(
+            onnx_file,
+            engine_path_for(model_file, precision),
+            precision,
+            max_batch=batch_size,
+            calibration_batches=inputs if precision == Precision.int8.value else None,
+        )
+
+    reference = TorchBackend(driver.build_model(), driver.device)
+    candidate = create_backend(
+        driver.build_model(), model_file, backend, precision, driver.device
+    )
+    report = check_parity(reference, candidate, inputs)
+    logger.info(f"{candidate} vs torch fp32: {report}")
+    if not report.passed(max_abs_diff, min_agreement):
+        raise click.ClickException(
+            f"{candidate} failed parity (max_abs_diff <= {max_abs_diff}, "
+            f"top1_agreement >= {min_agreement}); keep backend: torch"
+        )
+    logger.info(f"Parity OK. Set model.backend: {backend} / model.precision: {precision} in config.yml")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,162 @@
+"""
+Detections and robot telemetry over a WebRTC data channel.
+
+The viewer used to get nothing but video, so the YOLO boxes had to be burned
+into the pixels server-side and anything else (speed, ToF) meant polling the
+NiceGUI app. Each peer now also gets an unordered, unreliable ``telemetry``
+data channel (pre-negotiated as id 0 on both sides) carrying small binary
+messages, and the embedded viewer draws them on a canvas over the video.
+
+All messages are little-endian and start with a one-byte type:
+
+- ``DETECTIONS``: ``<BiB`` type, frame seq, count; then per detection
+  ``<4HBB`` x1, y1, x2, y2 in units of 1/65535 of the frame, confidence in
+  1/255, label length, followed by that many bytes of UTF-8 label.
+- ``TELEMETRY``: ``<B3fB`` type, cmd_vel linear.x, linear.y, angular.z,
+  ToF count; then per sensor ``<Bf`` id, range.
+
+A detection message is built once per ``DetectionFrame`` and a telemetry
+message once per interval (the detector's rate by default), and the same
+bytes go to every open channel. Both are "latest wins", so a channel whose
+send buffer hasn't drained is skipped rather than queued behind.
+"""
+
+import asyncio
+import logging
+import struct
+
+from felix.signals import Topics
+from felix.state import state_store
+from lib.interfaces import Detection, DetectionFrame
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_LABEL = "telemetry"
+CHANNEL_ID = 0
+
+DETECTIONS = 1
+TELEMETRY = 2
+
+_DETECTIONS_HEADER = struct.Struct("<BiB")
+_DETECTION = struct.Struct("<4HBB")
+_TELEMETRY_HEADER = struct.Struct("<B3fB")
+_SENSOR = struct.Struct("<Bf")
+
+
+def _unit(value: float, scale: int) -> int:
+    return round(min(max(value, 0.0), 1.0) * scale)
+
+
+def encode_detections(frame: DetectionFrame) -> bytes:
+    detections = frame.detections[:255]
+    parts = [_DETECTIONS_HEADER.pack(DETECTIONS, frame.seq, len(detections))]
+    for d in detections:
+        label = d.label.encode("utf-8")[:255]
+        parts.append(_DETECTION.pack(
+            _unit(d.x1, 65535), _unit(d.y1, 65535), _unit(d.x2, 65535), _unit(d.y2, 65535),
+            _unit(d.confidence, 255), len(label),
+        ))
+        parts.append(label)
+    return b"".join(parts)
+
+
+def encode_telemetry(cmd_vel: tuple[float, float, float], tof: dict[int, float]) -> bytes:
+    sensors = sorted(tof.items())[:255]
+    parts = [_TELEMETRY_HEADER.pack(TELEMETRY, *cmd_vel, len(sensors))]
+    parts.extend(_SENSOR.pack(sensor_id, value) for sensor_id, value in sensors)
+    return b"".join(parts)
+
+
+def decode(data: bytes):
+    """(type, payload) of a message; the Python twin of the viewer's decoder."""
+    kind = data[0]
+    if kind == DETECTIONS:
+        _, seq, count = _DETECTIONS_HEADER.unpack_from(data)
+        offset = _DETECTIONS_HEADER.size
+        detections = []
+        for _ in range(count):
+            x1, y1, x2, y2, confidence, length = _DETECTION.unpack_from(data, offset)
+            offset += _DETECTION.size
+            label = data[offset:offset + length].decode("utf-8", errors="replace")
+            offset += length
+            detections.append(Detection(
+                label, confidence / 255, x1 / 65535, y1 / 65535, x2 / 65535, y2 / 65535,
+            ))
+        return kind, {"seq": seq, "detections": detections}
+    if kind == TELEMETRY:
+        _, vx, vy, wz, count = _TELEMETRY_HEADER.unpack_from(data)
+        offset = _TELEMETRY_HEADER.size
+        tof = {}
+        for _ in range(count):
+            sensor_id, value = _SENSOR.unpack_from(data, offset)
+            offset += _SENSOR.size
+            tof[sensor_id] = value
+        return kind, {"cmd_vel": (vx, vy, wz), "tof": tof}
+    raise ValueError(f"unknown telemetry message type {kind}")
+
+
+def current_telemetry() -> bytes:
+    """A TELEMETRY message from the latest cmd_vel and ToF in ``state_store``."""
+    latest = state_store.cmd_vel.latest()
+    cmd_vel = (0.0, 0.0, 0.0) if latest is None else tuple(latest[1].tolist())
+    return encode_telemetry(cmd_vel, state_store.sensors_at("tof"))
+
+
+class TelemetryFanout:
+    """
+    Sends detections and telemetry to every attached data channel.
+
+    Must be created on the event loop that serves the peers, so detections
+    are delivered there. The telemetry timer runs only while a channel is
+    attached.
+    """
+
+    def __init__(self, rate: float = 8.0, max_buffered: int = 64 * 1024):
+        self.interval = 1.0 / rate
+        self.max_buffered = max_buffered
+        self._channels: set = set()
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.skipped = 0
+        # Keep a strong ref so the bus's default weak connection isn't GC'd.
+        self._on_detections_ref = self._on_detections
+        Topics.detections.connect(self._on_detections_ref)
+
+    @property
+    def channels(self) -> int:
+        return len(self._channels)
+
+    def attach(self, channel):
+        self._channels.add(channel)
+        channel.on("close", lambda: self.detach(channel))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def detach(self, channel):
+        self._channels.discard(channel)
+        if not self._channels and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _on_detections(self, sender, payload: DetectionFrame = None):
+        if payload is not None and self._channels:
+            self.broadcast(encode_detections(payload))
+
+    async def _run(self):
+        while True:
+            self.broadcast(current_telemetry())
+            await asyncio.sleep(self.interval)
+
+    def broadcast(self, data: bytes):
+        for channel in list(self._channels):
+            if channel.readyState != "open":
+                continue
+            if channel.bufferedAmount > self.max_buffered:
+                self.skipped += 1
+                continue
+            channel.send(data)
+            self.sent += 1
+
+    @property
+    def stats(self) -> dict:
+        return {"channels": self.channels, "sent": self.sent, "skipped": self.skipped}
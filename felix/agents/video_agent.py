@@ -9,8 +9,24 @@ from aiohttp import web
 from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
 from av import VideoFrame
 
+from felix.agents.telemetry import CHANNEL_ID, CHANNEL_LABEL, TelemetryFanout
+from felix.agents.video_overlay import DetectionOverlay, bgr_view
+from felix.agents.video_quality import QualityController, TieredRelay, quality_ladder
+from felix.agents.video_relay import prefer_h264
 from felix.settings import settings
 from felix.signals import Topics
+from felix.vision.capture_branches import (
+    Branch,
+    BranchSpec,
+    GstBranchCapture,
+    SoftwareBranches,
+    build_tee_pipeline,
+    capture_branches,
+    default_branches,
+    display_branch,
+    hardware_available,
+)
+from felix.vision.frame_ring import FrameRing, frame_ring
 
 logger = logging.getLogger(__name__)
 
@@ -36,23 +52,40 @@ def _build_gst_pipeline(sensor_id, in_w, in_h, fps, out_w, out_h):
 
 
 class CameraCapture:
-    """Background thread that keeps only the latest CSI frame.
+    """Background capture that writes each CSI frame into the shared frame ring.
 
-    Replaces the old ``jetson_utils.videoSource`` capture. A single thread
-    continuously pulls frames and (a) stashes the most recent one for the
-    WebRTC track to read on demand and (b) republishes it on
+    Replaces the old ``jetson_utils.videoSource`` capture. Each frame is
+    decoded straight into a preallocated ``FrameRing`` slot and announced on
     ``Topics.raw_image`` for the autodrive classifier, detector and snapshot
-    collector. Consumers never pull frames on their own timing.
+    collector. The WebRTC track and the nodes lease frames from the ring
+    instead of copying them, so a frame is written once no matter how many
+    consumers read it.
+
+    Alongside the display frame the capture fills the inference ``branches``
+    (felix/vision/capture_branches.py): with the GStreamer bindings and
+    nvargus they come off a hardware ``tee``, otherwise a single cv2 capture
+    thread derives them from the display frame. ``source`` other than
+    ``"csi"`` is a V4L2 device index or path, for machines without the CSI
+    camera.
     """
 
-    def __init__(self, sensor_id=0, out_w=960, out_h=540):
-        mode = settings.DEFAULT_SENSOR_MODE
+    def __init__(self, sensor_id=0, out_w=960, out_h=540, ring: FrameRing | None = None,
+                 branches: list[BranchSpec] | None = None, source=None):
+        self._sensor_id = sensor_id
+        self._mode = settings.DEFAULT_SENSOR_MODE
+        self._source = settings.CAMERA_SOURCE if source is None else source
         self._pipeline = _build_gst_pipeline(
-            sensor_id, mode.width, mode.height, mode.framerate, out_w, out_h
+            sensor_id, self._mode.width, self._mode.height, self._mode.framerate, out_w, out_h
         )
+        self._shape = (out_h, out_w, 3)
+        self._ring = ring or frame_ring
+        self._branches = [
+            Branch(spec, capture_branches.register(spec))
+            for spec in (default_branches() if branches is None else branches)
+        ]
+        self._software: SoftwareBranches | None = None
+        self._gst: GstBranchCapture | None = None
         self._cap = None
-        self._frame = None
-        self._lock = threading.Lock()
         self._running = False
         self._thread = None
 
@@ -62,15 +95,12 @@ class CameraCapture:
         The CSI camera allows only one argus consumer at a time, and argus
         needs a moment to release the sensor after a previous process exits.
         Restarting the app too soon after a prior run would otherwise fail the
-        single ``VideoCapture`` open and kill the whole video thread. Retry a
-        few times with backoff so that release window is tolerated.
+        single open and kill the whole video thread. Retry a few times with
+        backoff so that release window is tolerated.
         """
         for attempt in range(1, attempts + 1):
-            self._cap = cv2.VideoCapture(self._pipeline, cv2.CAP_GSTREAMER)
-            if self._cap.isOpened():
+            if self._open():
                 break
-            self._cap.release()
-            self._cap = None
             if attempt < attempts:
                 logger.warning(
                     "CSI camera busy (attempt %d/%d), retrying in %.1fs",
@@ -79,28 +109,86 @@ class CameraCapture:
                 time.sleep(backoff)
         else:
             raise RuntimeError(
-                "Could not open CSI camera via GStreamer after "
+                f"Could not open camera {self._source!r} after "
                 f"{attempts} attempts (camera held by another process?). "
                 f"Pipeline:\n{self._pipeline}"
             )
         self._running = True
-        self._thread = threading.Thread(target=self._loop, daemon=True)
-        self._thread.start()
-        logger.info("CameraCapture started")
+        if self._gst is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        logger.info(
+            "CameraCapture started (%s branches: %s)",
+            "hardware" if self._gst is not None else "software",
+            ", ".join(branch.spec.name for branch in self._branches) or "none",
+        )
+
+    def _open(self) -> bool:
+        """One attempt at opening the camera; True on success."""
+        if self._source == "csi" and hardware_available():
+            branches = [display_branch(self._shape[1], self._shape[0], self._ring), *self._branches]
+            pipeline = build_tee_pipeline(
+                self._sensor_id, self._mode.width, self._mode.height, self._mode.framerate,
+                [branch.spec for branch in branches],
+            )
+            gst = GstBranchCapture(pipeline, branches, on_display=self._announce)
+            try:
+                gst.start()
+            except RuntimeError:
+                gst.stop()
+                return False
+            self._gst = gst
+            return True
+
+        if self._source == "csi":
+            self._cap = cv2.VideoCapture(self._pipeline, cv2.CAP_GSTREAMER)
+        else:
+            source = int(self._source) if str(self._source).isdigit() else self._source
+            self._cap = cv2.VideoCapture(source)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            return False
+        self._software = SoftwareBranches(self._branches)
+        return True
 
     def _loop(self):
         while self._running:
-            ok, frame = self._cap.read()
+            claimed = self._ring.claim(self._shape)
+            if claimed is None:
+                # Every slot is leased by a slow reader: skip this frame rather
+                # than stall capture. The grab keeps the appsink draining.
+                self._cap.grab()
+                continue
+            index, buf = claimed
+            ok, frame = self._cap.read(buf)
             if not ok:
+                self._ring.abort(index)
                 logger.warning("CameraCapture: empty frame")
                 continue
-            with self._lock:
-                self._frame = frame
-            Topics.raw_image.send(self, payload=frame)
-
-    def latest(self):
-        with self._lock:
-            return None if self._frame is None else self._frame.copy()
+            if frame is not buf:
+                # Backend ignored the destination (size/format mismatch).
+                if frame.shape != buf.shape:
+                    cv2.resize(frame, (buf.shape[1], buf.shape[0]), dst=buf)
+                else:
+                    np.copyto(buf, frame)
+            self._announce(self._ring.commit(index))
+
+    def _announce(self, seq: int):
+        # Hold a lease while synchronous receivers run so the slot can't be
+        # recycled under them; queued receivers re-lease by seq. Branches are
+        # written first, so a receiver of seq finds them.
+        lease = self._ring.lease(seq)
+        if lease is None:
+            return
+        with lease:
+            if self._software is not None:
+                self._software.write(lease.image, seq, lease.ts)
+            Topics.raw_image.send(self, payload=lease.image, seq=seq, ts=lease.ts)
+
+    def lease(self):
+        """Lease the latest frame from the ring (``None`` before the first frame)."""
+        return self._ring.lease()
 
     def stop(self):
         self._running = False
@@ -108,58 +196,37 @@ class CameraCapture:
             self._thread.join(timeout=2)
         if self._cap is not None:
             self._cap.release()
+        if self._gst is not None:
+            self._gst.stop()
 
 
 class CameraTrack(VideoStreamTrack):
     """aiortc media track that serves the camera's latest frame.
 
-    Draws YOLO detection boxes on the outgoing WebRTC copy only. The frames
-    published on Topics.raw_image (model/detector input) are never touched
-    because camera.latest() hands back a fresh copy.
+    Leases the frame from the ring and hands the read-only view straight to
+    ``VideoFrame.from_ndarray``; with an ``overlay`` the YOLO boxes are then
+    composited into the ``VideoFrame``'s own copy (video_overlay.py), so the
+    frames other nodes lease are never touched. Each track is encoded separately by its peer's
+    sender; ``SharedEncoder`` (video_relay.py) is the single-encode
+    alternative.
     """
 
-    def __init__(self, camera: CameraCapture, fallback=(540, 960)):
+    def __init__(self, camera: CameraCapture, fallback=(540, 960), overlay: DetectionOverlay | None = None):
         super().__init__()
         self._camera = camera
         self._blank = np.zeros((*fallback, 3), dtype=np.uint8)
-        self._detections = None
-        # Keep a strong ref so blinker's default weak connection isn't GC'd.
-        self._on_detections_ref = self._on_detections
-        Topics.detections.connect(self._on_detections_ref)
-
-    def _on_detections(self, sender, payload=None):
-        self._detections = payload
-
-    def _draw_boxes(self, frame):
-        det = self._detections
-        if det is None or not det.detections:
-            return frame
-        h, w = frame.shape[:2]
-        for d in det.detections:
-            x1, y1 = int(d.x1 * w), int(d.y1 * h)
-            x2, y2 = int(d.x2 * w), int(d.y2 * h)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            label = f"{d.label} {d.confidence * 100:.0f}%"
-            (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            bh = th + 6
-            # Put the label above the box, or just inside the top edge when
-            # there's no room above (object near the top of the frame) -- else
-            # the label is drawn at a negative y and clipped off-screen.
-            ytop = y1 - bh if y1 - bh >= 0 else y1
-            x = max(x1, 0)
-            cv2.rectangle(frame, (x, ytop), (x + tw + 4, ytop + bh), (0, 255, 0), -1)
-            cv2.putText(frame, label, (x + 2, ytop + th + 2),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
-        return frame
+        self._overlay = overlay
 
     async def recv(self):
         pts, time_base = await self.next_timestamp()
-        frame = self._camera.latest()
-        if frame is None:
-            frame = self._blank
+        lease = self._camera.lease()
+        if lease is None:
+            video_frame = VideoFrame.from_ndarray(self._blank, format="bgr24")
         else:
-            frame = self._draw_boxes(frame)
-        video_frame = VideoFrame.from_ndarray(frame, format="bgr24")
+            with lease:
+                video_frame = VideoFrame.from_ndarray(lease.image, format="bgr24")
+            if self._overlay is not None:
+                self._overlay.composite(bgr_view(video_frame))
         video_frame.pts = pts
         video_frame.time_base = time_base
         return video_frame
@@ -173,12 +240,17 @@ _VIEWER_HTML = """<!DOCTYPE html>
 <head><meta charset="utf-8"><title>Felix</title>
 <style>html,body{margin:0;padding:0;background:#333;height:100%;overflow:hidden}
 video{width:100%;height:100%;object-fit:contain;background:#333}
-#s{position:absolute;top:6px;left:6px;font:12px monospace;color:#0f0;
-   background:rgba(0,0,0,.5);padding:2px 6px;border-radius:3px;z-index:9}</style>
+canvas{position:absolute;top:0;left:0;width:100%;height:100%;pointer-events:none}
+#s,#h{position:absolute;left:6px;font:12px monospace;color:#0f0;
+   background:rgba(0,0,0,.5);padding:2px 6px;border-radius:3px;z-index:9}
+#s{top:6px}
+#h{bottom:6px;display:none}</style>
 </head>
 <body>
 <video id="v" autoplay playsinline muted></video>
+<canvas id="c"></canvas>
 <div id="s">init</div>
+<div id="h"></div>
 <script>
 const v = document.getElementById('v');
 const s = document.getElementById('s');
@@ -194,11 +266,76 @@ async function play() {
 }
 v.addEventListener('loadedmetadata', play);
 document.body.addEventListener('click', () => v.play());
+
+// Detections and telemetry arrive on the "telemetry" data channel, in the
+// binary layout documented in felix/agents/telemetry.py.
+const c = document.getElementById('c');
+const ctx = c.getContext('2d');
+const h = document.getElementById('h');
+let boxes = [], boxesAt = 0;
+function onMessage(e) {
+  const d = new DataView(e.data);
+  if (d.getUint8(0) === 1) {
+    const n = d.getUint8(5), text = new TextDecoder();
+    boxes = [];
+    for (let i = 0, o = 6; i < n; i++) {
+      const len = d.getUint8(o + 9);
+      boxes.push({
+        x1: d.getUint16(o, true) / 65535, y1: d.getUint16(o + 2, true) / 65535,
+        x2: d.getUint16(o + 4, true) / 65535, y2: d.getUint16(o + 6, true) / 65535,
+        label: text.decode(new Uint8Array(e.data, o + 10, len)) + ' '
+               + Math.round(d.getUint8(o + 8) / 2.55) + '%',
+      });
+      o += 10 + len;
+    }
+    boxesAt = performance.now();
+  } else if (d.getUint8(0) === 2) {
+    const f = (o) => d.getFloat32(o, true).toFixed(2);
+    const tof = [];
+    for (let i = 0, o = 14; i < d.getUint8(13); i++, o += 5)
+      tof.push('tof' + d.getUint8(o) + ' ' + d.getFloat32(o + 1, true).toFixed(0));
+    h.textContent = 'vx ' + f(1) + '  vy ' + f(5) + '  wz ' + f(9) + (tof.length ? '  ' + tof.join('  ') : '');
+    h.style.display = 'block';
+  }
+}
+// Redrawn every animation frame: boxes stay on the letterboxed picture
+// (object-fit: contain) through resizes, and vanish once stale.
+function draw() {
+  const r = window.devicePixelRatio || 1;
+  const cw = c.clientWidth * r, ch = c.clientHeight * r;
+  if (c.width !== cw || c.height !== ch) { c.width = cw; c.height = ch; }
+  ctx.clearRect(0, 0, cw, ch);
+  if (v.videoWidth && performance.now() - boxesAt < 1000) {
+    const scale = Math.min(cw / v.videoWidth, ch / v.videoHeight);
+    const w = v.videoWidth * scale, hh = v.videoHeight * scale;
+    const x0 = (cw - w) / 2, y0 = (ch - hh) / 2;
+    ctx.lineWidth = 2 * r;
+    ctx.font = (13 * r) + 'px sans-serif';
+    ctx.textBaseline = 'top';
+    for (const b of boxes) {
+      const x = x0 + b.x1 * w, y = y0 + b.y1 * hh;
+      ctx.strokeStyle = ctx.fillStyle = '#0f0';
+      ctx.strokeRect(x, y, (b.x2 - b.x1) * w, (b.y2 - b.y1) * hh);
+      // Label above the box, or just inside its top edge if that's off-screen.
+      const lh = 17 * r, tw = ctx.measureText(b.label).width + 4 * r;
+      const ly = y - lh >= 0 ? y - lh : y;
+      ctx.fillRect(x, ly, tw, lh);
+      ctx.fillStyle = '#000';
+      ctx.fillText(b.label, x + 2 * r, ly + 2 * r);
+    }
+  }
+  requestAnimationFrame(draw);
+}
+requestAnimationFrame(draw);
 async function start() {
   try {
     const pc = new RTCPeerConnection();
     pc.oniceconnectionstatechange = () => log('ice: ' + pc.iceConnectionState);
     pc.addTransceiver('video', {direction: 'recvonly'});
+    const dc = pc.createDataChannel('telemetry',
+      {negotiated: true, id: 0, ordered: false, maxRetransmits: 0});
+    dc.binaryType = 'arraybuffer';
+    dc.onmessage = onMessage;
     pc.ontrack = (e) => { v.srcObject = e.streams[0]; log('track'); };
     const offer = await pc.createOffer();
     await pc.setLocalDescription(offer);
@@ -219,12 +356,26 @@ start();
 
 
 class VideoStream:
-    """CSI camera -> WebRTC (aiortc) on port 8554, and publishes each frame as a
-    BGR numpy array on ``Topics.raw_image`` for the rest of the system.
+    """CSI camera -> WebRTC (aiortc) on port 8554, and publishes each frame into
+    the shared ``frame_ring`` (announced on ``Topics.raw_image``) for the rest of
+    the system.
 
     Drop-in replacement for the previous ``jetson_utils`` based implementation:
     same ``run()`` / ``shutdown()`` interface so ``app.py`` keeps starting it on
     a background thread.
+
+    With ``shared_encoder`` (the ``webrtc:`` config default) every viewer
+    that offers H.264 is served from one ``SharedEncoder``, so the frame is
+    drawn and encoded once however many browsers are watching. Peers without
+    H.264 fall back to their own ``CameraTrack``. With more than one
+    ``webrtc.levels``, a ``QualityController`` per viewer moves it between
+    quality tiers from its RTCP stats; ``GET /stats`` reports them.
+
+    Peers that bring the pre-negotiated ``telemetry`` data channel (the
+    embedded viewer does) get the detections, cmd_vel and ToF over it
+    (telemetry.py). With ``webrtc.client_overlay`` the viewer draws the
+    boxes itself and the video is sent clean; otherwise they're also
+    composited server-side.
     """
 
     def __init__(
@@ -233,6 +384,7 @@ class VideoStream:
         port: int = 8554,
         video_output_width: int = 960,
         video_output_height: int = 540,
+        shared_encoder: bool | None = None,
         **_legacy_kwargs,  # tolerate old call sites passing video_input/etc.
     ):
         self.port = port
@@ -241,6 +393,12 @@ class VideoStream:
             out_w=video_output_width,
             out_h=video_output_height,
         )
+        self.shared_encoder = settings.webrtc_shared_encoder if shared_encoder is None else shared_encoder
+        self._fallback = (video_output_height, video_output_width)
+        self._overlay: DetectionOverlay | None = None
+        self._telemetry: TelemetryFanout | None = None
+        self._relay: TieredRelay | None = None
+        self._viewers: dict[RTCPeerConnection, QualityController] = {}
         self._pcs: set[RTCPeerConnection] = set()
         self._loop = None
         self._runner = None
@@ -249,6 +407,13 @@ class VideoStream:
     async def _index(self, request):
         return web.Response(text=_VIEWER_HTML, content_type="text/html")
 
+    async def _stats(self, request):
+        return web.json_response({
+            "tiers": self._relay.stats if self._relay is not None else [],
+            "viewers": [viewer.stats for viewer in self._viewers.values()],
+            "telemetry": self._telemetry.stats if self._telemetry is not None else None,
+        })
+
     async def _offer(self, request):
         params = await request.json()
         offer = RTCSessionDescription(sdp=params["sdp"], type=params["type"])
@@ -256,15 +421,54 @@ class VideoStream:
         pc = RTCPeerConnection()
         self._pcs.add(pc)
 
+        # Created here so detections are delivered on this loop.
+        if self._overlay is None and not settings.webrtc_client_overlay:
+            self._overlay = DetectionOverlay()
+        if self._telemetry is None:
+            self._telemetry = TelemetryFanout(rate=settings.webrtc_telemetry_hz)
+        channel = None
+        if "m=application" in offer.sdp:
+            # Pre-negotiated (same label/id on both sides), so it exists before
+            # the answer and needs no in-band DCEP handshake. Unordered and
+            # never retransmitted: a late detection is worthless.
+            channel = pc.createDataChannel(
+                CHANNEL_LABEL, negotiated=True, id=CHANNEL_ID, ordered=False, maxRetransmits=0,
+            )
+            self._telemetry.attach(channel)
+        if self.shared_encoder and "H264/90000" in offer.sdp:
+            if self._relay is None:
+                ladder = quality_ladder(
+                    settings.webrtc_width,
+                    settings.webrtc_height,
+                    settings.webrtc_fps,
+                    settings.webrtc_bitrate,
+                    levels=settings.webrtc_levels,
+                )
+                self._relay = TieredRelay(self.camera, ladder, overlay=self._overlay)
+            track = self._relay.subscribe()
+            prefer_h264(pc, pc.addTrack(track))
+            if len(self._relay.tiers) > 1:
+                self._viewers[pc] = QualityController(pc, track, self._relay)
+                self._viewers[pc].start()
+        else:
+            track = CameraTrack(self.camera, fallback=self._fallback, overlay=self._overlay)
+            pc.addTrack(track)
+
         @pc.on("connectionstatechange")
         async def _on_state_change():
             logger.info("WebRTC connection state: %s", pc.connectionState)
             if pc.connectionState in ("failed", "closed"):
+                viewer = self._viewers.pop(pc, None)
+                if viewer is not None:
+                    viewer.stop()
+                if channel is not None:
+                    self._telemetry.detach(channel)
+                track.stop()
                 await pc.close()
                 self._pcs.discard(pc)
 
-        pc.addTrack(CameraTrack(self.camera))
-
+        # Codecs are negotiated here, so the track (and its H.264 preference)
+        # has to be attached first.
         await pc.setRemoteDescription(offer)
         answer = await pc.createAnswer()
         await pc.setLocalDescription(answer)
@@ -280,6 +484,7 @@ class VideoStream:
         app = web.Application()
         app.router.add_get("/", self._index)
         app.router.add_post("/offer", self._offer)
+        app.router.add_get("/stats", self._stats)
 
         self._runner = web.AppRunner(app)
         await self._runner.setup()
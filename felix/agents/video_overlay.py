@@ -0,0 +1,105 @@
+"""
+Detection overlay for the WebRTC video.
+
+The boxes used to be drawn with ``cv2.rectangle``/``cv2.putText`` on a full
+copy of every outgoing frame, for every viewer, although detections change
+at the detector's few Hz rather than at the camera's 30. ``DetectionOverlay``
+rasterizes each new ``DetectionFrame`` once into a cached BGRA patch cropped
+to the boxes' extent. Each frame then costs one masked ``cv2.copyTo`` of
+that patch, straight into the ``av.VideoFrame`` being encoded
+(``bgr_view``), so the leased camera frame is never copied either. Boxes
+and labels are opaque, so the alpha blend reduces to that masked copy.
+"""
+
+import av
+import cv2
+import numpy as np
+
+from felix.signals import Topics
+
+GREEN = (0, 255, 0, 255)
+BLACK = (0, 0, 0, 255)
+
+
+def bgr_view(frame: av.VideoFrame) -> np.ndarray:
+    """Writable (H, W, 3) view of a bgr24 frame's pixels (rows may be padded)."""
+    plane = frame.planes[0]
+    rows = np.frombuffer(plane, dtype=np.uint8).reshape(frame.height, plane.line_size)
+    return rows[:, : frame.width * 3].reshape(frame.height, frame.width, 3)
+
+
+def rasterize(detections, height: int, width: int) -> np.ndarray:
+    """(height, width, 4) BGRA image of the boxes and labels, clear elsewhere."""
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+    for d in detections:
+        x1, y1 = int(d.x1 * width), int(d.y1 * height)
+        x2, y2 = int(d.x2 * width), int(d.y2 * height)
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), GREEN, 2)
+        label = f"{d.label} {d.confidence * 100:.0f}%"
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        bh = th + 6
+        # Put the label above the box, or just inside the top edge when
+        # there's no room above (object near the top of the frame) -- else
+        # the label is drawn at a negative y and clipped off-screen.
+        ytop = y1 - bh if y1 - bh >= 0 else y1
+        x = max(x1, 0)
+        cv2.rectangle(canvas, (x, ytop), (x + tw + 4, ytop + bh), GREEN, -1)
+        cv2.putText(canvas, label, (x + 2, ytop + th + 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, BLACK, 1, cv2.LINE_AA)
+    return canvas
+
+
+class DetectionOverlay:
+    """
+    Composites the latest ``Topics.detections`` onto outgoing video frames.
+
+    Must be created on the event loop that serves the video, so detections
+    are delivered there.
+    """
+
+    def __init__(self):
+        self._detections = None
+        # (detections, frame shape, (y, x), BGR patch, mask), swapped as a
+        # whole: the relay's encoder thread and CameraTracks may both draw.
+        self._cache = None
+        self.rasterized = 0
+        # Keep a strong ref so the bus's default weak connection isn't GC'd.
+        self._on_detections_ref = self._on_detections
+        Topics.detections.connect(self._on_detections_ref)
+
+    def _on_detections(self, sender, payload=None):
+        self._detections = payload
+
+    def _overlay(self, height: int, width: int):
+        """The cached overlay for this frame size, re-rasterized if the detections changed."""
+        det = self._detections
+        if det is None or not det.detections:
+            return None
+        cache = self._cache
+        if cache is None or cache[0] is not det or cache[1] != (height, width):
+            canvas = rasterize(det.detections, height, width)
+            x, y, w, h = cv2.boundingRect(canvas[:, :, 3])
+            patch = canvas[y:y + h, x:x + w, :3].copy()
+            mask = (canvas[y:y + h, x:x + w, 3] > 0).astype(np.uint8)
+            cache = self._cache = (det, (height, width), (y, x), patch, mask)
+            self.rasterized += 1
+        return cache if cache[3].size else None
+
+    def composite(self, image: np.ndarray) -> bool:
+        """Draw the overlay onto writable BGR ``image`` in place; False if there was none."""
+        overlay = self._overlay(*image.shape[:2])
+        if overlay is None:
+            return False
+        _, _, (y, x), patch, mask = overlay
+        ph, pw = patch.shape[:2]
+        # In place: dst is a view into image (cv2 honours its row stride).
+        cv2.copyTo(patch, mask, image[y:y + ph, x:x + pw])
+        return True
+
+    def draw(self, frame: np.ndarray) -> np.ndarray:
+        """``frame`` with the overlay on a private copy, or ``frame`` itself if there is none."""
+        if self._overlay(*frame.shape[:2]) is None:
+            return frame
+        frame = frame.copy()
+        self.composite(frame)
+        return frame
@@ -0,0 +1,170 @@
+"""
+Congestion-aware quality for the WebRTC camera stream.
+
+Without feedback the stream ran at 960x540/30 fps whatever the link could
+carry, so on a weak Wi-Fi link packets queued up and the picture stalled
+rather than getting softer. Here the stream is offered as a ladder of
+``QualityTier``s (size, frame rate and bitrate scaled down together), each
+served by its own ``SharedEncoder``, so viewers on the same tier still share
+one encode and idle tiers cost nothing.
+
+A ``QualityController`` per peer polls ``RTCPeerConnection.getStats()``:
+the RTCP receiver reports give loss and round-trip time, and the relay
+track counts its own overflows. Any of those past its threshold moves the
+viewer one tier down at once; a few clean intervals in a row move it back
+up, so a recovering link is probed gently.
+"""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from felix.agents.video_relay import RelayTrack, SharedEncoder
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    width: int
+    height: int
+    fps: int
+    bitrate: int
+
+
+def quality_ladder(width: int, height: int, fps: int, bitrate: int, levels: int = 4,
+                   min_scale: float = 1 / 3, min_fps: int = 5) -> list[QualityTier]:
+    """
+    ``levels`` tiers from the given (best) settings down to ``min_scale`` of
+    the width, height and frame rate; bitrate follows the pixel count.
+    """
+    tiers = []
+    for scale in np.geomspace(1.0, min_scale, levels) if levels > 1 else [1.0]:
+        tiers.append(QualityTier(
+            width=max(16, int(width * scale) // 2 * 2),
+            height=max(16, int(height * scale) // 2 * 2),
+            fps=max(min_fps, round(fps * scale)),
+            bitrate=int(bitrate * scale * scale),
+        ))
+    return tiers
+
+
+class TieredRelay:
+    """One SharedEncoder per tier; level 0 is the best."""
+
+    def __init__(self, camera, tiers: list[QualityTier], overlay=None):
+        self.tiers = tiers
+        self.encoders = [
+            SharedEncoder(camera, tier.width, tier.height, tier.fps, tier.bitrate, overlay=overlay)
+            for tier in tiers
+        ]
+
+    def subscribe(self, level: int = 0) -> RelayTrack:
+        return self.encoders[level].subscribe()
+
+    def level_of(self, track: RelayTrack) -> int:
+        return self.encoders.index(track.encoder)
+
+    def set_level(self, track: RelayTrack, level: int):
+        track.switch(self.encoders[level])
+
+    @property
+    def stats(self) -> list[dict]:
+        return [
+            {**asdict(tier), "viewers": encoder.viewers, "frames": encoder.frames_encoded}
+            for tier, encoder in zip(self.tiers, self.encoders)
+        ]
+
+
+class QualityController:
+    """Moves one viewer's track along a TieredRelay from its RTCP stats."""
+
+    def __init__(self, pc, track: RelayTrack, relay: TieredRelay, interval: float = 2.0,
+                 max_loss: float = 0.08, max_rtt: float = 0.4, clean_loss: float = 0.02,
+                 up_after: int = 3):
+        self.pc = pc
+        self.track = track
+        self.relay = relay
+        self.interval = interval
+        self.max_loss = max_loss
+        self.max_rtt = max_rtt
+        self.clean_loss = clean_loss
+        self.up_after = up_after
+        self.level = relay.level_of(track)
+        self.loss = 0.0
+        self.rtt: float | None = None
+        self.send_bps = 0.0
+        self.switches = 0
+        self._clean = 0
+        self._flushes = track.flushes
+        self._bytes_sent: int | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.update()
+
+    async def update(self):
+        loss, rtt, bytes_sent = 0.0, None, None
+        for stats in (await self.pc.getStats()).values():
+            if getattr(stats, "kind", None) != "video":
+                continue
+            if stats.type == "remote-inbound-rtp":
+                loss = stats.fractionLost / 256.0  # RTCP's 8-bit fixed point
+                rtt = stats.roundTripTime
+            elif stats.type == "outbound-rtp":
+                bytes_sent = stats.bytesSent
+        if bytes_sent is not None and self._bytes_sent is not None:
+            self.send_bps = 8.0 * (bytes_sent - self._bytes_sent) / self.interval
+        self._bytes_sent = bytes_sent
+        flushes, self._flushes = self.track.flushes - self._flushes, self.track.flushes
+        self.decide(loss, rtt, flushes)
+
+    def decide(self, loss: float, rtt: float | None, flushes: int) -> int:
+        """Apply one interval's measurements; returns the (new) level."""
+        self.loss, self.rtt = loss, rtt
+        congested = flushes > 0 or loss > self.max_loss or (rtt is not None and rtt > self.max_rtt)
+        level = self.level
+        if congested:
+            self._clean = 0
+            level = min(level + 1, len(self.relay.tiers) - 1)
+        elif loss <= self.clean_loss:
+            self._clean += 1
+            if self._clean >= self.up_after:
+                self._clean = 0
+                level = max(level - 1, 0)
+        else:
+            self._clean = 0
+        if level != self.level:
+            tier = self.relay.tiers[level]
+            logger.info(
+                "WebRTC viewer -> level %d (%dx%d @ %d fps, %d bps): loss %.1f%%, rtt %s, flushes %d",
+                level, tier.width, tier.height, tier.fps, tier.bitrate, 100 * loss,
+                "-" if rtt is None else f"{1000 * rtt:.0f}ms", flushes,
+            )
+            self.relay.set_level(self.track, level)
+            self.level = level
+            self.switches += 1
+        return self.level
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "level": self.level,
+            **asdict(self.relay.tiers[self.level]),
+            "loss": self.loss,
+            "rtt": self.rtt,
+            "send_bps": self.send_bps,
+            "switches": self.switches,
+        }
@@ -0,0 +1,206 @@
+"""
+Single-encode fan-out for the WebRTC camera stream.
+
+With one ``CameraTrack`` per ``/offer``, aiortc runs a separate H.264 encoder
+for every viewer, so each extra browser tab costs a full encode of every
+frame. ``SharedEncoder`` encodes each frame once, at a fixed resolution and
+bitrate, and pushes the resulting ``av.Packet`` to one ``RelayTrack`` per
+peer. aiortc only packetizes pre-encoded packets (``RTCRtpSender`` calls
+``encoder.pack`` instead of ``encode``), so the per-viewer cost is the RTP
+send.
+
+The packets are shared, so the peers must all negotiate H.264 (see
+``prefer_h264``). A viewer that joins, or falls behind and has its queue
+flushed, waits for the next keyframe and asks the encoder for one; the GOP
+length bounds how long a lost packet corrupts the picture, since a peer's
+PLI can't force a keyframe on a pre-encoded stream. A track can be moved
+to another encoder (``RelayTrack.switch``) without renegotiating; every
+encoder stamps packets on the same clock, so RTP timestamps stay monotonic
+across the switch.
+"""
+
+import asyncio
+import fractions
+import logging
+import time
+
+import av
+import numpy as np
+from aiortc import MediaStreamTrack, RTCRtpSender
+from aiortc.mediastreams import MediaStreamError
+
+from felix.agents.video_overlay import bgr_view
+
+logger = logging.getLogger(__name__)
+
+VIDEO_CLOCK_RATE = 90000
+VIDEO_TIME_BASE = fractions.Fraction(1, VIDEO_CLOCK_RATE)
+_EPOCH = time.monotonic()
+
+
+def prefer_h264(pc, sender):
+    """Restrict ``sender``'s transceiver to H.264 (and its RTX); call before ``setRemoteDescription``."""
+    codecs = [
+        codec for codec in RTCRtpSender.getCapabilities("video").codecs
+        if codec.mimeType in ("video/H264", "video/rtx")
+    ]
+    for transceiver in pc.getTransceivers():
+        if transceiver.sender is sender:
+            transceiver.setCodecPreferences(codecs)
+
+
+class RelayTrack(MediaStreamTrack):
+    """One peer's view of a SharedEncoder: a bounded queue of encoded packets."""
+
+    kind = "video"
+
+    def __init__(self, encoder: "SharedEncoder", maxsize: int = 30):
+        super().__init__()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._need_keyframe = True
+        self.encoder: SharedEncoder | None = None
+        self.flushes = 0
+        self.switch(encoder)
+
+    def switch(self, encoder: "SharedEncoder"):
+        """Take packets from ``encoder`` from its next keyframe on."""
+        if encoder is self.encoder:
+            return
+        if self.encoder is not None:
+            self.encoder._detach(self)
+        self.encoder = encoder
+        self._need_keyframe = True
+        encoder._attach(self)
+
+    def _push(self, packet: av.Packet):
+        if self._need_keyframe:
+            if not packet.is_keyframe:
+                return
+            self._need_keyframe = False
+        try:
+            self._queue.put_nowait(packet)
+        except asyncio.QueueFull:
+            # The peer isn't keeping up. Dropping single packets would corrupt
+            # its decoder until the next keyframe anyway, so flush and resync.
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self.flushes += 1
+            self._need_keyframe = True
+            self.encoder.request_keyframe()
+
+    async def recv(self) -> av.Packet:
+        if self.readyState != "live":
+            raise MediaStreamError
+        return await self._queue.get()
+
+    def stop(self):
+        super().stop()
+        self.encoder._detach(self)
+
+
+class SharedEncoder:
+    """
+    Encodes the camera once for every connected viewer.
+
+    ``camera`` only needs ``lease()`` (a FrameLease or None), and
+    ``overlay`` (a DetectionOverlay) is composited at capture resolution,
+    into the VideoFrame's copy of the leased frame. The encode loop runs on the
+    event loop that calls ``subscribe`` and stops with the last viewer, so an
+    unwatched robot spends nothing on video.
+    """
+
+    def __init__(self, camera, width: int = 960, height: int = 540, fps: int = 30,
+                 bitrate: int = 1_500_000, gop_seconds: float = 2.0, overlay=None):
+        self.camera = camera
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.bitrate = bitrate
+        self.gop_seconds = gop_seconds
+        self._overlay = overlay
+        self._blank = np.zeros((height, width, 3), dtype=np.uint8)
+        self._tracks: set[RelayTrack] = set()
+        self._task: asyncio.Task | None = None
+        self._force_keyframe = False
+        self.frames_encoded = 0
+
+    @property
+    def viewers(self) -> int:
+        return len(self._tracks)
+
+    def subscribe(self) -> RelayTrack:
+        return RelayTrack(self)
+
+    def _attach(self, track: RelayTrack):
+        self._tracks.add(track)
+        self.request_keyframe()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _detach(self, track: RelayTrack):
+        self._tracks.discard(track)
+        if not self._tracks and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def request_keyframe(self):
+        self._force_keyframe = True
+
+    def _open(self) -> av.video.codeccontext.VideoCodecContext:
+        # Same settings as aiortc's own H264Encoder, plus a bounded GOP.
+        codec = av.CodecContext.create("libx264", "w")
+        codec.width = self.width
+        codec.height = self.height
+        codec.bit_rate = self.bitrate
+        codec.pix_fmt = "yuv420p"
+        codec.framerate = fractions.Fraction(self.fps, 1)
+        codec.time_base = VIDEO_TIME_BASE
+        codec.gop_size = max(1, int(self.fps * self.gop_seconds))
+        codec.options = {"level": "31", "tune": "zerolatency"}
+        codec.profile = "Baseline"
+        return codec
+
+    def _encode(self, codec, pts: int, force_keyframe: bool) -> list[av.Packet]:
+        lease = self.camera.lease()
+        if lease is None:
+            frame = av.VideoFrame.from_ndarray(self._blank, format="bgr24")
+        else:
+            with lease:
+                frame = av.VideoFrame.from_ndarray(lease.image, format="bgr24")
+            if self._overlay is not None:
+                self._overlay.composite(bgr_view(frame))
+        # Scale and convert to yuv420p in one swscale pass.
+        frame = frame.reformat(width=self.width, height=self.height, format="yuv420p")
+        frame.pts = pts
+        frame.time_base = VIDEO_TIME_BASE
+        frame.pict_type = av.video.frame.PictureType.I if force_keyframe else av.video.frame.PictureType.NONE
+        packets = codec.encode(frame)
+        for packet in packets:
+            packet.pts = pts
+            packet.time_base = VIDEO_TIME_BASE
+        return packets
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        codec = self._open()
+        period = 1.0 / self.fps
+        next_at = time.monotonic()
+        logger.info("SharedEncoder started (%dx%d @ %d fps, %d bps)", self.width, self.height, self.fps, self.bitrate)
+        try:
+            while True:
+                force, self._force_keyframe = self._force_keyframe, False
+                pts = int((time.monotonic() - _EPOCH) * VIDEO_CLOCK_RATE)
+                packets = await loop.run_in_executor(None, self._encode, codec, pts, force)
+                self.frames_encoded += 1
+                for packet in packets:
+                    for track in list(self._tracks):
+                        track._push(packet)
+                next_at += period
+                delay = next_at - time.monotonic()
+                if delay < 0:
+                    # Encoding fell behind: drop frames rather than burst to catch up.
+                    next_at = time.monotonic()
+                    delay = 0
+                await asyncio.sleep(delay)
+        finally:
+            logger.info("SharedEncoder stopped after %d frames", self.frames_encoded)
@@ -0,0 +1,25 @@
+from .backends import (
+    BackendType,
+    Precision,
+    InferenceBackend,
+    TorchBackend,
+    OnnxRuntimeBackend,
+    TensorRTBackend,
+    create_backend,
+    export_onnx,
+    build_tensorrt_engine,
+    check_parity,
+)
+
+__all__ = [
+    'BackendType',
+    'Precision',
+    'InferenceBackend',
+    'TorchBackend',
+    'OnnxRuntimeBackend',
+    'TensorRTBackend',
+    'create_backend',
+    'export_onnx',
+    'build_tensorrt_engine',
+    'check_parity',
+]
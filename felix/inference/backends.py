@@ -0,0 +1,345 @@
+"""
+Pluggable inference backends for the AutoDriver classifiers.
+
+AutoDriver builds a torchvision classifier and loads the ROI checkpoint at
+``settings.model_file``. Instead of always running that module in fp32 eager
+PyTorch, it asks ``create_backend`` for one of:
+
+- ``torch``:       the eager module (optionally fp16 on CUDA), under inference_mode
+- ``onnxruntime``: the checkpoint exported to ONNX next to the .pth, run by
+                   ONNX Runtime with the TensorRT / CUDA / CPU provider,
+                   whichever is available
+- ``tensorrt``:    a serialized TensorRT engine built from that ONNX file
+
+Every backend takes the same normalized NCHW float32 tensor AutoDriver already
+produces and returns logits, so softmax and the driving logic are unchanged.
+ONNX Runtime and TensorRT are optional; when either can't be imported or built
+``create_backend`` logs why and falls back to torch, mirroring how Detector
+prefers a ``.engine`` file but still runs without one.
+
+    python export_model.py --backend tensorrt --precision fp16
+"""
+
+import copy
+import inspect
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# Both are only present in the runtime container; import defensively so the
+# torch backend still works on a plain host.
+try:
+    import onnxruntime as ort
+except Exception:  # noqa: BLE001
+    ort = None
+
+try:
+    import tensorrt as trt
+except Exception:  # noqa: BLE001
+    trt = None
+
+logger = logging.getLogger(__name__)
+
+INPUT_NAME = "image"
+OUTPUT_NAME = "logits"
+
+
+class BackendType(str, Enum):
+    torch = "torch"
+    onnxruntime = "onnxruntime"
+    tensorrt = "tensorrt"
+
+
+class Precision(str, Enum):
+    fp32 = "fp32"
+    fp16 = "fp16"
+    int8 = "int8"
+
+
+def onnx_path_for(model_file) -> str:
+    return str(Path(model_file).with_suffix(".onnx"))
+
+
+def engine_path_for(model_file, precision: Precision) -> str:
+    return str(Path(model_file).with_suffix(f".{Precision(precision).value}.engine"))
+
+
+def _is_stale(derived: str, source) -> bool:
+    return not os.path.isfile(derived) or os.path.getmtime(derived) < os.path.getmtime(source)
+
+
+class InferenceBackend(ABC):
+    name: str = "base"
+
+    @abstractmethod
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        """x: normalized (N, 3, H, W) float32 tensor -> (N, num_targets) logits."""
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name})"
+
+
+class TorchBackend(InferenceBackend):
+    name = "torch"
+
+    def __init__(self, model: torch.nn.Module, device: torch.device, precision: Precision = Precision.fp32):
+        self.device = device
+        # fp16 only pays off (and is only well supported) on CUDA.
+        self.half = Precision(precision) is Precision.fp16 and device.type == "cuda"
+        # A private copy: .to()/.eval()/.half() work in place, and the caller's
+        # model may be the fp32 reference other backends are checked against.
+        self.model = copy.deepcopy(model).to(device).eval()
+        if self.half:
+            self.model = self.model.half()
+
+    def __call__(self, x):
+        with torch.inference_mode():
+            x = x.to(self.device)
+            y = self.model(x.half() if self.half else x)
+        return y.float()
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = "onnxruntime"
+
+    def __init__(self, onnx_file: str, device: torch.device, precision: Precision = Precision.fp32):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed")
+        precision = Precision(precision)
+        available = ort.get_available_providers()
+        providers = []
+        if "TensorrtExecutionProvider" in available and device.type == "cuda":
+            cache = os.path.join(os.path.dirname(onnx_file), "trt_cache")
+            providers.append(("TensorrtExecutionProvider", {
+                "trt_fp16_enable": precision is not Precision.fp32,
+                "trt_int8_enable": precision is Precision.int8,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": cache,
+            }))
+        if "CUDAExecutionProvider" in available and device.type == "cuda":
+            providers.append("CUDAExecutionProvider")
+        providers.append("CPUExecutionProvider")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_file, sess_options=options, providers=providers)
+        self.name = f"onnxruntime[{self.session.get_providers()[0]}]"
+
+    def __call__(self, x):
+        x = x.detach().to("cpu", torch.float32).contiguous().numpy()
+        (y,) = self.session.run([OUTPUT_NAME], {INPUT_NAME: x})
+        return torch.from_numpy(y)
+
+
+class TensorRTBackend(InferenceBackend):
+    name = "tensorrt"
+
+    def __init__(self, engine_file: str, device: torch.device):
+        if trt is None:
+            raise RuntimeError("tensorrt is not installed")
+        if device.type != "cuda":
+            raise RuntimeError("tensorrt backend needs a CUDA device")
+        self.device = device
+        runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+        with open(engine_file, "rb") as f:
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        self.context = self.engine.create_execution_context()
+        self.stream = torch.cuda.Stream(device=device)
+        self._output = None
+
+    def __call__(self, x):
+        x = x.to(self.device, torch.float32).contiguous()
+        self.context.set_input_shape(INPUT_NAME, tuple(x.shape))
+        out_shape = tuple(self.context.get_tensor_shape(OUTPUT_NAME))
+        if self._output is None or tuple(self._output.shape) != out_shape:
+            self._output = torch.empty(out_shape, dtype=torch.float32, device=self.device)
+        self.context.set_tensor_address(INPUT_NAME, x.data_ptr())
+        self.context.set_tensor_address(OUTPUT_NAME, self._output.data_ptr())
+        self.stream.wait_stream(torch.cuda.current_stream(self.device))
+        self.context.execute_async_v3(self.stream.cuda_stream)
+        self.stream.synchronize()
+        return self._output.clone()
+
+
+# ---- export / build ---------------------------------------------------------
+
+
+def export_onnx(model: torch.nn.Module, onnx_file: str, input_size: int = 224, opset: int = 17) -> str:
+    """Export a classifier to ONNX with a dynamic batch dimension."""
+    # Export a CPU copy so the caller's (possibly CUDA) module is left untouched.
+    model = copy.deepcopy(model).to("cpu").float().eval()
+    dummy = torch.zeros(1, 3, input_size, input_size)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter (needs onnxscript); the
+        # TorchScript exporter handles these torchvision classifiers fine.
+        kwargs["dynamo"] = False
+    torch.onnx.export(
+        model,
+        dummy,
+        onnx_file,
+        input_names=[INPUT_NAME],
+        output_names=[OUTPUT_NAME],
+        dynamic_axes={INPUT_NAME: {0: "batch"}, OUTPUT_NAME: {0: "batch"}},
+        opset_version=opset,
+        **kwargs,
+    )
+    logger.info(f"Exported ONNX model: {onnx_file}")
+    return onnx_file
+
+
+class _Int8Calibrator(trt.IInt8EntropyCalibrator2 if trt is not None else object):
+    """Feeds preprocessed calibration batches (already normalized NCHW float32) to TensorRT."""
+
+    def __init__(self, batches: list[torch.Tensor], cache_file: str):
+        super().__init__()
+        self.batches = [b.to("cuda", torch.float32).contiguous() for b in batches]
+        self.cache_file = cache_file
+        self.index = 0
+
+    def get_batch_size(self):
+        return self.batches[0].shape[0] if self.batches else 1
+
+    def get_batch(self, names):
+        if self.index >= len(self.batches):
+            return None
+        batch = self.batches[self.index]
+        self.index += 1
+        return [int(batch.data_ptr())]
+
+    def read_calibration_cache(self):
+        if os.path.isfile(self.cache_file):
+            with open(self.cache_file, "rb") as f:
+                return f.read()
+        return None
+
+    def write_calibration_cache(self, cache):
+        with open(self.cache_file, "wb") as f:
+            f.write(cache)
+
+
+def build_tensorrt_engine(
+    onnx_file: str,
+    engine_file: str,
+    precision: Precision = Precision.fp16,
+    input_size: int = 224,
+    max_batch: int = 4,
+    calibration_batches: list[torch.Tensor] | None = None,
+) -> str:
+    """Build and serialize a TensorRT engine from an ONNX export."""
+    if trt is None:
+        raise RuntimeError("tensorrt is not installed")
+    precision = Precision(precision)
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+    with open(onnx_file, "rb") as f:
+        if not parser.parse(f.read()):
+            errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+            raise RuntimeError(f"TensorRT could not parse {onnx_file}: {errors}")
+
+    config = builder.create_builder_config()
+    profile = builder.create_optimization_profile()
+    shape = (3, input_size, input_size)
+    profile.set_shape(INPUT_NAME, (1, *shape), (1, *shape), (max_batch, *shape))
+    config.add_optimization_profile(profile)
+    if precision is not Precision.fp32 and builder.platform_has_fast_fp16:
+        config.set_flag(trt.BuilderFlag.FP16)
+    if precision is Precision.int8:
+        if not calibration_batches:
+            raise ValueError("int8 engines need calibration_batches")
+        config.set_flag(trt.BuilderFlag.INT8)
+        config.set_calibration_profile(profile)
+        config.int8_calibrator = _Int8Calibrator(calibration_batches, engine_file + ".calib")
+
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError(f"TensorRT engine build failed for {onnx_file}")
+    with open(engine_file, "wb") as f:
+        f.write(serialized)
+    logger.info(f"Built TensorRT {precision.value} engine: {engine_file}")
+    return engine_file
+
+
+def create_backend(
+    model: torch.nn.Module,
+    model_file,
+    backend: BackendType = BackendType.torch,
+    precision: Precision = Precision.fp32,
+    device: torch.device | None = None,
+    input_size: int = 224,
+) -> InferenceBackend:
+    """
+    Wrap a loaded classifier in the requested backend.
+
+    ONNX / engine files are derived from ``model_file`` and rebuilt whenever
+    the checkpoint is newer. Any failure falls back to the torch backend.
+    """
+    backend, precision = BackendType(backend), Precision(precision)
+    device = device or torch.device("cpu")
+    try:
+        if backend is BackendType.onnxruntime:
+            onnx_file = onnx_path_for(model_file)
+            if _is_stale(onnx_file, model_file):
+                export_onnx(model, onnx_file, input_size=input_size)
+            return OnnxRuntimeBackend(onnx_file, device, precision)
+        if backend is BackendType.tensorrt:
+            engine_file = engine_path_for(model_file, precision)
+            if _is_stale(engine_file, model_file):
+                if precision is Precision.int8:
+                    raise RuntimeError(
+                        f"int8 engine '{engine_file}' must be built with calibration data "
+                        "first (export_model.py --precision int8)"
+                    )
+                onnx_file = onnx_path_for(model_file)
+                if _is_stale(onnx_file, model_file):
+                    export_onnx(model, onnx_file, input_size=input_size)
+                build_tensorrt_engine(onnx_file, engine_file, precision, input_size=input_size)
+            return TensorRTBackend(engine_file, device)
+    except Exception as ex:  # noqa: BLE001
+        logger.warning(f"{backend.value} backend unavailable ({ex}); falling back to torch")
+    return TorchBackend(model, device, precision)
+
+
+# ---- accuracy parity --------------------------------------------------------
+
+
+@dataclass
+class ParityReport:
+    samples: int
+    max_abs_diff: float
+    mean_abs_diff: float
+    top1_agreement: float
+
+    def passed(self, max_abs_diff: float = 0.02, min_top1_agreement: float = 0.99) -> bool:
+        return self.max_abs_diff <= max_abs_diff and self.top1_agreement >= min_top1_agreement
+
+    def __str__(self):
+        return (f"ParityReport(samples={self.samples}, max_abs_diff={self.max_abs_diff:.5f}, "
+                f"mean_abs_diff={self.mean_abs_diff:.5f}, top1_agreement={self.top1_agreement:.3f})")
+
+
+def check_parity(reference: InferenceBackend, candidate: InferenceBackend, inputs) -> ParityReport:
+    """Compare softmax outputs of two backends over an iterable of input tensors."""
+    diffs, agree, n = [], 0, 0
+    for x in inputs:
+        p_ref = F.softmax(reference(x).cpu(), dim=1)
+        p_new = F.softmax(candidate(x).cpu(), dim=1)
+        diffs.append((p_ref - p_new).abs().max(dim=1).values.numpy())
+        agree += int((p_ref.argmax(dim=1) == p_new.argmax(dim=1)).sum())
+        n += x.shape[0]
+    diffs = np.concatenate(diffs) if diffs else np.zeros(0)
+    return ParityReport(
+        samples=n,
+        max_abs_diff=float(diffs.max()) if n else 0.0,
+        mean_abs_diff=float(diffs.mean()) if n else 0.0,
+        top1_agreement=agree / n if n else 1.0,
+    )
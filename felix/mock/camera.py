@@ -3,6 +3,7 @@ import cv2
 from felix.settings import settings
 from lib.nodes import BaseNode
 from felix.signals import Topics
+from felix.vision.frame_ring import frame_ring
 
 class VideoCapture:
     def __init__(self, *args):
@@ -43,9 +44,16 @@ class Camera(BaseNode):
             raise Exception("Could not initialize camera")
         else:
             self.image = frame
-            Topics.raw_image.send(self, payload=frame)
+            self._publish(frame)
             return cap
 
+    def _publish(self, frame):
+        seq = frame_ring.write(frame)
+        if seq is None:
+            return
+        with frame_ring.lease(seq) as lease:
+            Topics.raw_image.send(self, payload=lease.image, seq=seq, ts=lease.ts)
+
     def _convert_color(self, frame):
         return frame
 
@@ -64,7 +72,7 @@ class Camera(BaseNode):
             frame = self._convert_color(frame)
             frame = self._undistort(frame)
             self.image = frame
-            Topics.raw_image.send(self, payload=frame)
+            self._publish(frame)
             """
             try:
                 cv2.namedWindow("felix", cv2.WINDOW_NORMAL)
@@ -1,4 +1,7 @@
+import cv2
 from felix.nodes.autodriver import AutoDriver, Direction
+from felix.nodes.inference_server import SharedFrame
+from felix.vision.preprocess import RoiPreprocessor
 from felix.training.mecanum.inference import MecanumDriver
 from lib.interfaces import Twist
 from felix.settings import settings
@@ -19,6 +22,12 @@ class MecanumAutoDriver(AutoDriver):
         
         # Initialize the mecanum driver
         self.mecanum_driver = None
+        # Full-frame 224x224 input. INTER_AREA approximates the antialiased PIL
+        # Resize MecanumDriver.transform uses, and lets the InferenceServer share
+        # the resize with any other full-frame model.
+        self._full_frame_preprocessor = RoiPreprocessor(
+            size=224, roi=None, device=self.device, interpolation=cv2.INTER_AREA
+        )
         if self.model_file_exists:
             try:
                 self.mecanum_driver = MecanumDriver(
@@ -62,10 +71,12 @@ class MecanumAutoDriver(AutoDriver):
         
         try:
             # Get prediction from model
+            shared = isinstance(input, SharedFrame)
             prediction = self.mecanum_driver.predict(
-                image=input,
+                image=input.image if shared else input,
                 tof_left_mm=tof_left,
-                tof_right_mm=tof_right
+                tof_right_mm=tof_right,
+                img_tensor=input.tensor(self._full_frame_preprocessor) if shared else None,
             )
             
             # Extract velocities
@@ -1,17 +1,22 @@
 from abc import abstractmethod
 from typing import Any
 
+from felix.inference.backends import create_backend
+from felix.nodes.inference_server import SharedFrame
+from felix.state import state_store
+from felix.vision.change_gate import ChangeGate
+from felix.vision.frame_ring import frame_ring
+from felix.vision.preprocess import RoiPreprocessor
 from felix.vision.roi_utils import apply_roi_crop
-from lib.interfaces import SensorReading, Twist
+from lib.interfaces import Prediction, Twist
 from lib.nodes.base import BaseNode
 import torch
 import torchvision
-import cv2
 import numpy as np
 import torch.nn.functional as F
 from felix.settings import settings
-from felix.vision.image import ImageUtils
 import os
+import time
 from felix.signals import Topics
 from enum import Enum
 
@@ -36,25 +41,39 @@ class Direction(str, Enum):
 
 
 class AutoDriver(BaseNode):
-    mean = 255.0 * np.array([0.485, 0.456, 0.406])
-    stdev = 255.0 * np.array([0.229, 0.224, 0.225])
-    normalize = torchvision.transforms.Normalize(mean, stdev)
+    # predict() is a full CNN forward pass: keep it off the event loop.
+    blocking_spinner = True
 
     def __init__(self, model_file: str, num_targets: int, **kwargs):
         super(AutoDriver, self).__init__(**kwargs)
-        self.device = torch.device("cuda" if torch.backends.cuda.is_built() else "cpu")
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
         self.model_loaded = False
         self.is_active = False
-        self.raw_image = None
-        self.tof: dict = {}
         self.model_file = model_file
         self.num_targets = num_targets
+        self.backend = None
+        self.frame_seq = -1
+        self.frame_ts: float | None = None
+        self._preprocessor = RoiPreprocessor(
+            size=224,
+            roi=(
+                (settings.model_roi_height_ratio, settings.model_roi_vertical_offset, 1.0)
+                if settings.model_use_roi else None
+            ),
+            device=self.device,
+        )
+        # Reuse the last softmax while the robot is idle and the ROI is unchanged.
+        self.change_gate = (
+            ChangeGate(threshold=settings.model_change_threshold)
+            if settings.model_change_threshold > 0 else None
+        )
+        self._last_predictions = None
+        self._idle = True
 
-        Topics.raw_image.connect(self._on_raw_image)
         Topics.autodrive.connect(self._on_autodrive)
+        Topics.cmd_vel.connect(self._on_cmd_vel)
         Topics.stop.connect(self._on_stop)
-        Topics.pico_sensors.connect(self._on_pico_sensors)
 
         print(f"AutoDriver using device: {self.device}")
         print(f"Model file: {self.model_file}")
@@ -62,7 +81,16 @@ class AutoDriver(BaseNode):
         if self.model_file_exists:
             self.model = self._create_model()
             self.load_state_dict(self.model)
-            self.model = self.model.to(self.device)
+            if self.model_loaded:
+                # The backend places (and for torch, copies) the model itself.
+                self.backend = create_backend(
+                    self.model,
+                    self.model_file,
+                    backend=settings.model_backend,
+                    precision=settings.model_precision,
+                    device=self.device,
+                )
+                self.logger.info(f"Inference backend: {self.backend}")
         else:
             print(
                 f"Model file '{self.model_file}' does not exist. AutoDrive is not safe!"
@@ -73,26 +101,35 @@ class AutoDriver(BaseNode):
 
         self.logger.info(f"Model loaded: {self.model_loaded}")
 
-    def _on_pico_sensors(self, sender, payload: SensorReading):
-        if payload.type != "tof":
-            return
-        self.tof[payload.id] = payload.value
-        self.logger.debug(f"tof: {payload.id} = {payload.value}")
+    @property
+    def tof(self) -> dict:
+        # ToF as it was when the frame being inferred on was captured, not
+        # whatever arrived while the model was running.
+        return state_store.sensors_at("tof", self.frame_ts)
 
-    def _on_raw_image(self, sender, payload):
-        self.raw_image = payload
-        self.logger.debug("Raw image received")
+    def _on_cmd_vel(self, sender, payload: Twist):
+        # Every sender counts, autodrive included: a cached prediction is only
+        # safe while the robot is stationary.
+        self._idle = payload.is_zero
 
     def _on_autodrive(self, sender, **kwargs):
         self.logger.info("AutoDrive signal received")
         self.is_active = not self.is_active
+        self._invalidate_predictions()
         self.logger.info(f"AutoDrive is_active: {self.is_active}")
 
     def _on_stop(self, sender, **kwargs):
         self.logger.info("Stop signal received, deactivating autodrive.")
         self.is_active = False
+        self._idle = True
+        self._invalidate_predictions()
         self.logger.info(f"AutoDrive is_active: {self.is_active}")
 
+    def _invalidate_predictions(self):
+        self._last_predictions = None
+        if self.change_gate is not None:
+            self.change_gate.reset()
+
     @property
     def model_file_exists(self) -> bool:
         return os.path.isfile(self.model_file)
@@ -156,18 +193,33 @@ class AutoDriver(BaseNode):
         return model
 
     def spinner(self):
-        if self.is_active and self.raw_image is not None:
-            if DEBUG:
-                print("Autodrive active, making prediction...")
-            try:
-                cmd = self.predict(self.raw_image)
-                self.logger.info(f"AutoDrive: {cmd}")
-                Topics.cmd_vel.send("autodrive", payload=cmd)
-            except Exception as ex:  # noqa: E722
-                self.logger.info(f"Autodrive error: {ex}. Stopping")
-                Topics.cmd_vel.send("autodrive", payload=Twist())
-                Topics.stop.send("autodrive")
-                raise ex
+        if not self.is_active:
+            return
+        # Lease the latest frame straight from the shared ring: no per-node copy,
+        # and the slot can't be recycled while the model is reading it.
+        lease = frame_ring.lease()
+        if lease is None:
+            return
+        with lease, SharedFrame(lease) as shared:
+            self.infer(shared)
+
+    def infer(self, shared: SharedFrame):
+        """Predict on one frame and publish the resulting cmd_vel (spinner or InferenceServer)."""
+        if not self.is_active:
+            return
+        self.frame_seq = shared.seq
+        self.frame_ts = shared.ts
+        if DEBUG:
+            print("Autodrive active, making prediction...")
+        try:
+            cmd = self.predict(shared)
+            self.logger.info(f"AutoDrive: {cmd}")
+            Topics.cmd_vel.send("autodrive", payload=cmd)
+        except Exception as ex:  # noqa: E722
+            self.logger.info(f"Autodrive error: {ex}. Stopping")
+            Topics.cmd_vel.send("autodrive", payload=Twist())
+            Topics.stop.send("autodrive")
+            raise ex
 
     def load_state_dict(self, model):
         try:
@@ -183,8 +235,16 @@ class AutoDriver(BaseNode):
             self.logger.warning(ex.__str__())
             self.model_loaded = False
 
+    def build_model(self) -> torch.nn.Module:
+        """Fresh fp32 CPU copy of the classifier with the checkpoint weights (export/parity)."""
+        model = self._create_model()
+        model.load_state_dict(torch.load(self.model_file, map_location="cpu", weights_only=False))
+        return model.eval()
+
     def shutdown(self):
         self.is_active = False
+        if self.change_gate is not None:
+            self.logger.info(f"change gate: {self.change_gate.stats}")
 
     @abstractmethod
     def predict(self, input) -> Twist:
@@ -203,35 +263,34 @@ class AutoDriver(BaseNode):
         )
 
     def preprocess(self, sensor_image):
-        # Convert from BGR to RGB
-        x = ImageUtils.bgr8_to_rgb8(sensor_image)
-
-        # Apply ROI cropping if enabled (CRITICAL for matching training!)
-        x = self._apply_roi_crop(x)
-
-        # Resize to 224x224 (now resizing the ROI-cropped image)
-        x = cv2.resize(x, (224, 224), interpolation=cv2.INTER_LINEAR)  # type: ignore
-
-        # Standard PyTorch preprocessing
-        x = x.transpose((2, 0, 1))
-        x = torch.from_numpy(x).float()
-        x = self.normalize(x)
-        x = x.to(self.device)
-        x = x[None, ...]
-        return x
+        # BGR->RGB, ROI crop (CRITICAL for matching training!), 224x224 resize and
+        # ImageNet normalize in one allocation-free pass; see RoiPreprocessor for
+        # the equivalence with the crop/resize/Normalize steps used in training.
+        # The returned (1, 3, 224, 224) tensor is reused on the next call.
+        return self._preprocessor(sensor_image)
 
     def get_predictions(self, input) -> list[float] | None:
         if not self.model_loaded:
             print("Model not loaded, cannot get predictions")
             return None
 
-        x = self.preprocess(input)
-        y = self.model(x)
+        # A SharedFrame reuses a crop/resize/normalize already done this tick by
+        # another model with the same input spec.
+        shared = isinstance(input, SharedFrame)
+        resized = input.resized(self._preprocessor) if shared else self._preprocessor.resize(input)
+
+        idle = self._idle and self._last_predictions is not None
+        if self.change_gate is not None and self.change_gate.reuse(resized, idle=idle):
+            return self._last_predictions
+
+        x = input.tensor(self._preprocessor) if shared else self._preprocessor.normalize(resized)
+        y = self.backend(x)
 
         # we apply the `softmax` function to normalize the output vector so it sums to 1 (which makes it a probability distribution)
         y = F.softmax(y, dim=1)
         self.logger.debug("softmax", y)
-        return y.flatten()
+        self._last_predictions = y.flatten()
+        return self._last_predictions
 
 
 class BinaryObstacleAvoider(AutoDriver):
@@ -305,6 +364,14 @@ class TernaryObstacleAvoider(AutoDriver):
         left = float(predictions[self._left])
         right = float(predictions[self._right])
 
+        Topics.prediction.send(
+            "autodrive",
+            payload=Prediction(
+                source="autodrive", left=left, right=right, forward=forward,
+                ts=int(time.time()), seq=self.frame_seq,
+            ),
+        )
+
         tof = self.tof_prediction
 
         self.logger.info(
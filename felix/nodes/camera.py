@@ -4,6 +4,7 @@ from felix.settings import settings
 
 from lib.nodes import BaseNode
 from felix.signals import Topics
+from felix.vision.frame_ring import frame_ring
 
 class Camera(BaseNode):
 
@@ -24,9 +25,16 @@ class Camera(BaseNode):
             raise Exception("Could not initialize camera")
         else:
             self.image = frame
-            Topics.raw_image.send(self, payload=frame)
+            self._publish(frame)
             return cap
 
+    def _publish(self, frame):
+        seq = frame_ring.write(frame)
+        if seq is None:
+            return
+        with frame_ring.lease(seq) as lease:
+            Topics.raw_image.send(self, payload=lease.image, seq=seq, ts=lease.ts)
+
     def _convert_color(self, frame):
         return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
 
@@ -47,7 +55,7 @@ class Camera(BaseNode):
             frame = self._convert_color(frame)
             frame = self._undistort(frame)
             self.image = frame
-            Topics.raw_image.send(self, payload=frame)
+            self._publish(frame)
             """
             try:
                 cv2.namedWindow("felix", cv2.WINDOW_NORMAL)
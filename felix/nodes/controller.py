@@ -3,15 +3,19 @@ from enum import Enum
 import math
 from typing import Optional
 from felix.settings import settings
-from felix.vision.image import ImageUtils
+from felix.state import state_store
+from felix.vision.jpeg import jpeg_encoder
 from felix.vision.image_collector import ImageCollector
-from lib.interfaces import Odometry, SensorReading, Twist, Vector3
+from felix.vision.frame_ring import frame_ring
+from lib.interfaces import Odometry, Twist, Vector3
 from lib.nodes.base import BaseNode
 import asyncio
 import numpy as np
 from lib.controllers.rosmaster import Rosmaster
+from lib.controllers.motor_writer import MotorCommandWriter
 import concurrent.futures
 
+import threading
 import time
 from felix.signals import Topics
 from lib.vehicles.vehicle import VehicleTrajectory, VehicleDirection
@@ -84,18 +88,23 @@ class Controller(BaseNode):
     def __init__(self, publish_frequency_hz=10, **kwargs):
         super(Controller, self).__init__(**kwargs)
         self.publish_frequency_hz = publish_frequency_hz
-        self.camera_image = None
 
         self.cmd_vel = Twist()
         self.prev_cmd_vel = Twist()
         self.vehicle = settings.VEHICLE
         self._bot = Rosmaster(car_type=2, com=self.vehicle.yaboom_port)
         self._bot.create_receive_threading()
+        # Serial writes happen on the writer's thread, coalesced to one frame per
+        # control period, never on the thread that published cmd_vel.
+        self._motor_writer = MotorCommandWriter(self._bot.set_motor, frequency=self.frequency)
         self._running = False
         self._nav_target: Optional[Odometry] = None
-
-        self.tof: dict[int, int] = {}
-        self.prev_tof: dict[int, int] = {}
+        # cmd_vel is queued (LATEST) but stop is synchronous, so a twist sent
+        # just before a stop can be delivered after it. Twists are stamped
+        # with their send time and dropped if a stop came later; the lock
+        # keeps one that already passed that check from landing after stop().
+        self._cmd_lock = threading.RLock()
+        self._stopped_at = float("-inf")
 
 
         self.attitude_data = np.zeros(3)
@@ -105,7 +114,6 @@ class Controller(BaseNode):
         self.motion_data = np.zeros(3)
 
         self.angle_delta = 0
-        self.camera_image = None
         self.nav_capture = False
         self._image_collector = ImageCollector()
         self._last_capture_time = time.time()
@@ -134,40 +142,42 @@ class Controller(BaseNode):
 
     def _connect_signals(self):
         Topics.stop.connect(self._on_stop_signal)
-        Topics.cmd_vel.connect(self._on_cmd_vel_signal)
+        Topics.cmd_vel.connect(self._on_cmd_vel_signal, stamp=True)
         Topics.nav_target.connect(self._on_nav_signal)
-        Topics.raw_image.connect(self._on_raw_image_signal)
         Topics.nav_capture.connect(self._on_nav_capture_signal)
-        Topics.pico_sensors.connect(self._on_pico_sensors)
 
-    def _on_pico_sensors(self, sender, payload: SensorReading):
-        self.logger.debug(f"Received pico sensor reading: {payload}")
-        if payload.type != "tof":
-            return
-        self.prev_tof = self.tof.copy()
-        self.tof[payload.id] = int(payload.value)
-        self.logger.debug(f"tof: {payload.id} = {payload.value}")
-        
+    @property
+    def tof(self) -> dict[int, int]:
+        return {k: int(v) for k, v in state_store.sensors_at("tof").items()}
+
     def _on_stop_signal(self, sender, **kwargs):
         self.stop()
 
     def _on_nav_signal(self, sender, payload: NavRequest):
         self._apply_nav_request(payload)
 
-    def _on_cmd_vel_signal(self, sender, payload: Twist):
-        self._apply_cmd_vel(payload)
-
-    def _on_raw_image_signal(self, sender, payload):
-        self.camera_image = payload
+    def _on_cmd_vel_signal(self, sender, payload: Twist, sent_at: float | None = None):
+        with self._cmd_lock:
+            if sent_at is not None and sent_at <= self._stopped_at:
+                self.logger.info(f"dropping cmd_vel from {sender} sent before the last stop")
+                return
+            # Latency from the send, so the writer's stats include the time the
+            # twist spent queued on the bus.
+            self._apply_cmd_vel(payload, received_at=sent_at)
 
     def _on_nav_capture_signal(self, sender, payload: bool):
         self.nav_capture = payload
         if self.nav_capture:
             self.capture_session_id = _generate_session_id()
             self.logger.info(f"Navigation image capture enabled, session id: {self.capture_session_id}")
+        else:
+            # finish the session's shard once any in-flight capture is done
+            self._executor.submit(self._image_collector.close_navigation)
 
     def get_imu_data(self):
-        self.attitude_data = Vector3.from_tuple(self._bot.get_imu_attitude_data())
+        attitude = self._bot.get_imu_attitude_data()
+        state_store.imu.append(time.monotonic(), attitude)
+        self.attitude_data = Vector3.from_tuple(attitude)
         self.magnometer_data = Vector3.from_tuple(self._bot.get_magnetometer_data())
         self.gyroscope_data = Vector3.from_tuple(self._bot.get_gyroscope_data())
         self.accelerometer_data = Vector3.from_tuple(self._bot.get_accelerometer_data())
@@ -179,35 +189,35 @@ class Controller(BaseNode):
     async def capture_nav_image(self):
         if self.nav_capture:
             if time.time() - self._last_capture_time > settings.nav_capture_frequency_seconds:
-                if self.camera_image is None:
-                    return
                 if self.cmd_vel.is_zero:
                     return
-                if not self.tof or not self.prev_tof:
+                lease = frame_ring.lease()
+                if lease is None:
                     return
-                
-                image = ImageUtils.bgr8_to_jpeg(self.camera_image)
+                # ToF as it was when this frame was captured, and the sample before
+                tof = [state_store.sensor_at("tof", i, lease.ts) for i in (0, 1)]
+                prev_tof = [state_store.sensor_at("tof", i, lease.ts, back=1) for i in (0, 1)]
+                if None in tof or None in prev_tof:
+                    lease.release()
+                    return
+                # the encode pool owns (and releases) the lease from here
+                try:
+                    image = await asyncio.wrap_future(jpeg_encoder.submit(lease))
+                except Exception as ex:
+                    self.logger.info(f"nav image encode failed: {ex}")
+                    return
+                tof = [int(v) for v in tof]
+                prev_tof = [int(v) for v in prev_tof]
                 self.logger.info("Capturing nav image")
                 try:
-                    values = [self.prev_tof[0], 
-                        self.prev_tof[1],
-                        _normalize_velocity(self.prev_cmd_vel.linear.x),
-                        _normalize_velocity(self.prev_cmd_vel.linear.y),
-                        _normalize_velocity(self.prev_cmd_vel.angular.z),
-                        self.tof[0], 
-                        self.tof[1], 
-                        _normalize_velocity(self.cmd_vel.linear.x), 
-                        _normalize_velocity(self.cmd_vel.linear.y),
-                        _normalize_velocity(self.cmd_vel.angular.z)]
-                    
                     saved = self._image_collector.save_navigation_image(
-                        [self.prev_tof[0], 
-                        self.prev_tof[1],
+                        [prev_tof[0], 
+                        prev_tof[1],
                         _normalize_velocity(self.prev_cmd_vel.linear.x),
                         _normalize_velocity(self.prev_cmd_vel.linear.y),
                         _normalize_velocity(self.prev_cmd_vel.angular.z),
-                        self.tof[0], 
-                        self.tof[1], 
+                        tof[0], 
+                        tof[1], 
                         _normalize_velocity(self.cmd_vel.linear.x), 
                         _normalize_velocity(self.cmd_vel.linear.y),
                         _normalize_velocity(self.cmd_vel.angular.z)], 
@@ -236,10 +246,16 @@ class Controller(BaseNode):
         """
 
     def stop(self):
+        """Stop the motors now; any cmd_vel sent before this that is still queued is dropped."""
+        with self._cmd_lock:
+            self._stopped_at = time.monotonic()
+            self._halt()
+
+    def _halt(self):
         self.logger.info("Stopping controller")
         self.cmd_vel = Twist()
         self.prev_cmd_vel = Twist()
-        self._bot.set_motor(0, 0, 0, 0)
+        self._motor_writer.submit((0, 0, 0, 0))
         self.logger.info(self._bot.get_motion_data())
         self.trajectory = VehicleTrajectory(VehicleDirection.STATIONARY, 0.0)
 
@@ -247,12 +263,15 @@ class Controller(BaseNode):
         self.logger.info(f"applying nav request\n: {payload}")
         odom = payload.target
         self.logger.info(f"applying nav target\n: {odom}")
-        self._apply_cmd_vel(odom.twist)
+        with self._cmd_lock:
+            self._apply_cmd_vel(odom.twist)
 
-    def _apply_cmd_vel(self, cmd_vel: Twist):
+    def _apply_cmd_vel(self, cmd_vel: Twist, received_at: float | None = None):
         if cmd_vel.is_zero:
             self.logger.info("cmd_vel is zero, stopping")
-            self.stop()
+            # Not stop(): a zero twist is ordered like any other, so it must
+            # not void a newer twist already queued behind it.
+            self._halt()
             return
         
         if cmd_vel == self.prev_cmd_vel:
@@ -276,7 +295,7 @@ class Controller(BaseNode):
 
         power = self.vehicle.mps_to_motor_power(velocity)
 
-        self._bot.set_motor(power[0], power[2], power[1], power[3])
+        self._motor_writer.submit((power[0], power[2], power[1], power[3]), received_at)
         self.logger.info("--- Applying CMD Vel ---")
         self.logger.info(f"CMD Vel: (x: {cmd_vel.linear.x},y:{cmd_vel.linear.y}, z:{cmd_vel.angular.z}")
         self.logger.debug(f"Scaled CMD Vel: (x: {scaled.linear.x},y:{scaled.linear.y}, z:{scaled.angular.z}")
@@ -299,3 +318,9 @@ class Controller(BaseNode):
 
     def shutdown(self):
         self.stop()
+        try:
+            self._executor.submit(self._image_collector.close_navigation).result()
+        except RuntimeError:  # at interpreter exit executors refuse new work
+            self._image_collector.close_navigation()
+        self._motor_writer.close()
+        self.logger.info(f"motor writer: {self._motor_writer.stats}")
@@ -5,6 +5,8 @@ from lib.nodes.base import BaseNode
 from lib.interfaces import Detection, DetectionFrame
 from felix.settings import settings
 from felix.signals import Topics
+from felix.vision.frame_ring import frame_ring
+from felix.nodes.inference_server import SharedFrame
 
 # Ultralytics is only present in the runtime container. Import defensively so the
 # module can still be imported (e.g. in tests on the host) without it installed.
@@ -33,13 +35,17 @@ def _default_model_file() -> str:
 
 class Detector(BaseNode):
     """
-    Object detector. Subscribes to raw_image, runs YOLO at its own (slower than
-    capture) frequency, and publishes a DetectionFrame on Topics.detections.
+    Object detector. Leases the latest frame from the shared frame ring, runs
+    YOLO at its own (slower than capture) frequency, and publishes a
+    DetectionFrame on Topics.detections.
 
     This node only *perceives*. It never issues cmd_vel — downstream consumers
     (the UI overlay, an object-seek behavior) decide what to do with the boxes.
     """
 
+    # YOLO inference blocks for tens of ms: run it on the node's worker thread.
+    blocking_spinner = True
+
     def __init__(
         self,
         model_file: str | None = None,
@@ -52,12 +58,9 @@ class Detector(BaseNode):
         self.model_file = model_file or _default_model_file()
         self.conf = conf
         self.classes = classes  # restrict to COCO class ids, or None for all
-        self.raw_image = None
         self.model = None
         self.model_loaded = False
 
-        Topics.raw_image.connect(self._on_raw_image)
-
         if YOLO is None:
             self.logger.warning(
                 f"ultralytics not importable, Detector disabled: {_IMPORT_ERROR}"
@@ -74,15 +77,25 @@ class Detector(BaseNode):
 
         self.loaded()
 
-    def _on_raw_image(self, sender, payload):
-        self.raw_image = payload
-
     def spinner(self):
-        if not self.model_loaded or self.raw_image is None:
+        if not self.model_loaded:
             return
 
-        frame = self.raw_image
-        h, w = frame.shape[:2]
+        lease = frame_ring.lease()
+        if lease is None:
+            return
+
+        with lease, SharedFrame(lease) as shared:
+            self.infer(shared)
+
+    def infer(self, shared: SharedFrame):
+        """Detect on one frame and publish a DetectionFrame (spinner or InferenceServer)."""
+        # The capture's "detector" branch is already at YOLO's input size; the
+        # boxes are normalized, so they apply to the display frame unchanged.
+        h, w = shared.image.shape[:2]
+        frame = shared.branch("detector")
+        if frame is None:
+            frame = shared.image
 
         try:
             results = self.model.predict(
@@ -117,9 +130,9 @@ class Detector(BaseNode):
         Topics.detections.send(
             "detector",
             payload=DetectionFrame(
-                detections=detections, width=w, height=h, ts=int(time.time())
+                detections=detections, width=w, height=h, ts=int(time.time()), seq=shared.seq
             ),
         )
 
     def shutdown(self):
-        self.raw_image = None
+        self.model_loaded = False
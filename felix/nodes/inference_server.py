@@ -0,0 +1,181 @@
+import time
+
+import numpy as np
+import torch
+
+from lib.nodes.base import BaseNode
+from felix.vision.capture_branches import capture_branches
+from felix.vision.frame_ring import FrameLease, frame_ring
+from felix.vision.preprocess import RoiPreprocessor
+
+
+class SharedFrame:
+    """
+    One camera frame as seen by every model in an InferenceServer tick.
+
+    Wraps a frame_ring lease and memoizes the expensive per-model steps so
+    models asking for the same input share them: the ROI crop + resize is done
+    once per ``RoiPreprocessor.resize_key`` and the normalized tensor once per
+    ``RoiPreprocessor.key``. When the capture already produces that crop as a
+    branch (felix/vision/capture_branches.py), the branch frame is used and
+    nothing is resized. Use it as a context manager so branch leases are
+    released with the tick.
+    """
+
+    def __init__(self, lease: FrameLease):
+        self.lease = lease
+        self.image = lease.image
+        self.seq = lease.seq
+        self.ts = lease.ts
+        self._resized: dict[tuple, np.ndarray] = {}
+        self._tensors: dict[tuple, torch.Tensor] = {}
+        self._branches: dict[str, np.ndarray | None] = {}
+        self._leases: list[FrameLease] = []
+
+    def branch(self, name: str) -> np.ndarray | None:
+        """This frame from capture branch ``name``, or None if it has none."""
+        if name not in self._branches:
+            image = None
+            branch = capture_branches.get(name)
+            lease = branch.ring.lease(self.seq) if branch is not None else None
+            if lease is not None:
+                self._leases.append(lease)
+                image = lease.image
+            self._branches[name] = image
+        return self._branches[name]
+
+    def resized(self, pre: RoiPreprocessor) -> np.ndarray:
+        key = pre.resize_key
+        if key not in self._resized:
+            branch = capture_branches.serving(pre)
+            image = self.branch(branch.spec.name) if branch is not None else None
+            if image is None:
+                image = pre.resize(self.image, out=np.empty((pre.size, pre.size, 3), np.uint8))
+            self._resized[key] = image
+        return self._resized[key]
+
+    def release(self):
+        for lease in self._leases:
+            lease.release()
+        self._leases.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def tensor(self, pre: RoiPreprocessor) -> torch.Tensor:
+        key = pre.key
+        if key not in self._tensors:
+            self._tensors[key] = pre.normalize(self.resized(pre))
+        return self._tensors[key]
+
+
+class _Registration:
+    def __init__(self, model, frequency: float | None):
+        self.model = model
+        self.name = type(model).__name__
+        self.period = 1.0 / frequency if frequency else 0.0
+        self.next_run = 0.0
+        self.runs = 0
+        self.total_time = 0.0
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_run
+
+    def ran(self, now: float, elapsed: float):
+        self.runs += 1
+        self.total_time += elapsed
+        if self.period:
+            # keep phase, but never queue up catch-up runs
+            self.next_run += self.period
+            if self.next_run <= now:
+                self.next_run = now + self.period
+
+
+class InferenceServer(BaseNode):
+    """
+    In-process inference service shared by the camera models.
+
+    Instead of every model node leasing the latest frame, preprocessing it and
+    running on its own timer, the server leases the frame once per tick, wraps
+    it in a SharedFrame (shared crop/resize/normalize) and runs every
+    registered model back-to-back on one worker thread -- and, on CUDA, one
+    stream -- so the GPU isn't context-switched between nodes. Models publish
+    their own results (Topics.prediction / Topics.detections / Topics.cmd_vel),
+    stamped with ``shared.seq``.
+
+    A registered model is any object with ``model_loaded`` and
+    ``infer(shared: SharedFrame)``; AutoDriver and Detector implement it.
+    Registered nodes must not also be spun on their own.
+    """
+
+    blocking_spinner = True
+
+    def __init__(self, **kwargs):
+        super(InferenceServer, self).__init__(**kwargs)
+        self._models: list[_Registration] = []
+        self._last_seq = -1
+        self._stream = (
+            torch.cuda.Stream() if torch.cuda.is_available() else None
+        )
+        self.frames = 0
+        self.skipped = 0
+        self.loaded()
+
+    def register(self, model, frequency: float | None = None):
+        """Run ``model`` on every new frame, or at most ``frequency`` Hz."""
+        self._models.append(_Registration(model, frequency))
+        self.logger.info(
+            f"registered {type(model).__name__}"
+            + (f" at {frequency} Hz" if frequency else " on every frame")
+        )
+        return model
+
+    def spinner(self):
+        seq = frame_ring.latest_seq
+        if seq < 0 or seq == self._last_seq:
+            self.skipped += 1
+            return
+        lease = frame_ring.lease()
+        if lease is None:
+            return
+        with lease, SharedFrame(lease) as shared:
+            self._last_seq = lease.seq
+            self.frames += 1
+            if self._stream is not None:
+                with torch.cuda.stream(self._stream):
+                    self._run(shared)
+                self._stream.synchronize()
+            else:
+                self._run(shared)
+
+    def _run(self, shared: SharedFrame):
+        now = time.monotonic()
+        for reg in self._models:
+            if not reg.model.model_loaded or not reg.due(now):
+                continue
+            start = time.monotonic()
+            try:
+                reg.model.infer(shared)
+            except Exception as ex:  # noqa: BLE001
+                self.logger.warning(f"{reg.name} inference error: {ex}")
+            reg.ran(now, time.monotonic() - start)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "models": {
+                reg.name: {
+                    "runs": reg.runs,
+                    "mean_ms": 1000.0 * reg.total_time / reg.runs if reg.runs else 0.0,
+                }
+                for reg in self._models
+            },
+        }
+
+    def shutdown(self):
+        self.logger.info(f"InferenceServer stats: {self.stats}")
@@ -1,7 +1,8 @@
 from lib.nodes.base import BaseNode
-from lib.interfaces import Twist, SensorReading, DetectionFrame
+from lib.interfaces import Twist, DetectionFrame
 from felix.settings import settings
 from felix.signals import Topics
+from felix.state import state_store
 
 
 class ObjectSeeker(BaseNode):
@@ -36,11 +37,9 @@ class ObjectSeeker(BaseNode):
         self.is_active = False
 
         self.latest: DetectionFrame | None = None
-        self.tof: dict[int, int] = {}
         self._driving = False  # so we only emit one stop when the target is lost
 
         Topics.detections.connect(self._on_detections)
-        Topics.pico_sensors.connect(self._on_pico_sensors)
         Topics.stop.connect(self._on_stop)
         # Activation/target arrive as signals so they reach the instance that is
         # actually being spun (app.py constructs nodes twice; a direct method
@@ -56,10 +55,6 @@ class ObjectSeeker(BaseNode):
     def _on_detections(self, sender, payload: DetectionFrame):
         self.latest = payload
 
-    def _on_pico_sensors(self, sender, payload: SensorReading):
-        if payload.type == "tof":
-            self.tof[payload.id] = int(payload.value)
-
     def _on_stop(self, sender, **kwargs):
         self.is_active = False
         self._driving = False
@@ -84,6 +79,11 @@ class ObjectSeeker(BaseNode):
 
     # ---- helpers --------------------------------------------------------
 
+    @property
+    def tof(self) -> dict[int, int]:
+        # the safety veto wants the freshest reading, not one aligned to a frame
+        return {k: int(v) for k, v in state_store.sensors_at("tof").items()}
+
     @property
     def _obstacle_ahead(self) -> bool:
         threshold = settings.TOF_THRESHOLD
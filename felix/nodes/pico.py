@@ -1,20 +1,70 @@
 #!/usr/bin/env python3
 import logging
 import serial
-import json
 import asyncio
+import threading
 import time
+from collections import deque
+
+import numpy as np
+
 from felix.signals import Topics
+from lib.controllers.pico_protocol import PicoFrameDecoder
 from lib.interfaces import SensorReading
 from lib.nodes.base import BaseNode
 
+
+class _LatencyWindow:
+    """Percentiles (ms) over the most recent samples (s)."""
+
+    def __init__(self, size: int = 1024):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    @property
+    def dict(self) -> dict:
+        ms = np.array(self._samples) * 1000.0
+        if not len(ms):
+            return {"n": 0}
+        return {
+            "n": len(ms),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+
+
 class PicoSensors(BaseNode):
+    """
+    Publishes Pico ToF/IR readings on Topics.pico_sensors.
+
+    A reader thread blocks on the serial port and publishes each reading as
+    soon as its bytes arrive, stamped with ``received_at`` (time.monotonic at
+    receipt), instead of the event loop draining the port every 100 ms.
+
+    Latency stats (``self.latency``):
+    - ``transport``: Pico timestamp -> host receipt, relative to the fastest
+      frame seen (the two clocks share no epoch, so the minimum offset is the
+      baseline); binary frames only.
+    - ``delivery``: host receipt -> a Topics.pico_sensors subscriber running.
+    """
+
     def __init__(self, **kwargs):
 
         super(PicoSensors, self).__init__(**kwargs)
 
         self.logger.info("Initializing Pico sensors")
         self.readings = {} 
+        # binary frames from current firmware, JSON lines from older builds
+        self._decoder = PicoFrameDecoder()
+        self._reader: threading.Thread | None = None
+        self._reading = False
+        self._clock_offset: float | None = None
+        self.transport_latency = _LatencyWindow()
+        self.delivery_latency = _LatencyWindow()
+        Topics.pico_sensors.connect(self._on_delivered)
         self.ser = serial.Serial(
             port='/dev/mypico',
             baudrate=115200,  # Adjust if your Pico uses different baud rate
@@ -39,28 +89,72 @@ class PicoSensors(BaseNode):
         except:
             return False
 
-    def read_data(self):
-        # Read all available data at once to reduce latency
-        while self.ser.in_waiting > 0:
+    def read_data(self, block: bool = False):
+        # Read all available data at once to reduce latency. With block=True wait
+        # (up to the port timeout) for the first byte instead of returning.
+        waiting = self.ser.in_waiting
+        if not waiting and not block:
+            return
+        data = self.ser.read(max(1, waiting))
+        if not data:
+            return
+        received = time.monotonic()
+        for reading in self._decoder.feed(data):
+            reading.received_at = received
+            self._record_transport(reading, received)
+            Topics.pico_sensors.send(payload=reading)
+            self.logger.debug(reading)
+
+    def _record_transport(self, reading: SensorReading, received: float):
+        if reading.device_ts is None:
+            return
+        offset = received - reading.device_ts / 1000.0
+        if self._clock_offset is None or offset < self._clock_offset:
+            self._clock_offset = offset
+        self.transport_latency.add(offset - self._clock_offset)
+
+    def _on_delivered(self, sender, payload: SensorReading):
+        if payload.received_at is not None:
+            self.delivery_latency.add(time.monotonic() - payload.received_at)
+
+    @property
+    def latency(self) -> dict:
+        return {
+            "transport": self.transport_latency.dict,
+            "delivery": self.delivery_latency.dict,
+        }
+
+    def start(self):
+        """Start the serial reader thread (idempotent)."""
+        if self._reader is not None:
+            return
+        self._reading = True
+        self._reader = threading.Thread(target=self._read_loop, name="PicoSensors.reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        while self._reading:
             try:
-                line = self.ser.readline().decode('utf-8').strip()
-                if line:
-                    data = json.loads(line)
-                    reading = SensorReading.from_json(data)
-                    Topics.pico_sensors.send(payload=reading)
-                    self.logger.debug(reading)
-                    #if reading.value < 250:
-            except json.JSONDecodeError as e:
-                #print(line)
-                self.logger.error(f"JSON decode error: {e}")
-            except UnicodeDecodeError as e:
-                self.logger.error(f"Unicode decode error: {e}")
-           
+                self.read_data(block=True)
+            except serial.SerialException as ex:
+                self.logger.error(f"Pico serial error: {ex}")
+                time.sleep(0.5)
+
+    async def spin(self, frequency: float = None):
+        # Readings are published by the reader thread as they arrive; the spinner
+        # only reports latency, so it runs slowly.
+        self.start()
+        await super().spin(frequency if frequency is not None else 1)
 
     def spinner(self):
-        self.read_data()
+        self.logger.debug(f"Pico latency: {self.latency}")
 
     def shutdown(self):
+        self._reading = False
+        if self._reader is not None:
+            self._reader.join(timeout=1.0)
+        self.logger.info(f"Pico decoder: {self._decoder.stats}")
+        self.logger.info(f"Pico latency: {self.latency}")
         if self.ser.is_open:
             self.ser.close()
             self.logger.info("Serial connection closed")
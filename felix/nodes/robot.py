@@ -3,9 +3,10 @@ from felix.settings import settings
 from felix.motion.joystick import JoystickNonLinearDampener
 from felix.vision.image import ImageUtils
 from lib.nodes import BaseNode
+import threading
 import time
 from felix.vision.image_collector import ImageCollector
-from felix.signals import Topics
+from felix.vision.frame_ring import frame_ring
 
 class Robot(BaseNode):
     def __init__(self, **kwargs):
@@ -20,19 +21,20 @@ class Robot(BaseNode):
 
         self.dampener = JoystickNonLinearDampener(0.25)
 
-        self.image = None
         self.cmd_zero = True
         self._image_collector = ImageCollector()
 
-        Topics.raw_image.connect(self.handle_raw_image)
+        # JPEGs are only needed for snapshots, tags and the MJPEG stream, so
+        # nothing is encoded per frame: get_image() encodes the latest ring
+        # frame on demand and memoizes the result by frame sequence number.
+        self._jpeg: bytes | None = None
+        self._jpeg_seq = -1
+        self._jpeg_lock = threading.Lock()
 
         self.last_capture_time = time.time()
 
         self.loaded()
 
-    def handle_raw_image(self, sender, payload):
-        self.image = ImageUtils.bgr8_to_jpeg(payload)
-
     def save_tag(self, tag):
         saved = self._image_collector.save_tag(self.get_image(), tag)
         return saved
@@ -52,16 +54,40 @@ class Robot(BaseNode):
             self.logger.info(changed.new)
 
     def get_image(self):
-        return self.image
-
-    def get_stream(self):
+        with self._jpeg_lock:
+            if frame_ring.latest_seq == self._jpeg_seq:
+                return self._jpeg
+            lease = frame_ring.lease()
+            if lease is None:
+                return self._jpeg
+            with lease:
+                if lease.seq != self._jpeg_seq:
+                    jpeg = ImageUtils.bgr8_to_jpeg(lease.image)
+                    if jpeg is not None:
+                        self._jpeg, self._jpeg_seq = jpeg, lease.seq
+            return self._jpeg
+
+    def get_stream(self, poll_seconds: float = 0.005):
+        last_seq = -1
         while True:
+            seq = frame_ring.latest_seq
+            if seq == last_seq:
+                time.sleep(poll_seconds)
+                continue
+            # One attempt per frame: a frame that fails to encode (or encodes
+            # to None) waits for the next one instead of being retried in a
+            # tight loop by every streaming client.
+            last_seq = seq
             try:
                 image = self.get_image()
-                if image is not None:
-                    yield (
-                        b"--frame\r\n"
-                        b"Content-Type: image/jpeg\r\n\r\n" + image + b"\r\n"
-                    )
-            except Exception:
-                pass
+            except Exception as ex:
+                self.logger.warning(f"MJPEG stream: could not encode frame {seq}: {ex}")
+                time.sleep(poll_seconds)
+                continue
+            if image is None:
+                time.sleep(poll_seconds)
+                continue
+            yield (
+                b"--frame\r\n"
+                b"Content-Type: image/jpeg\r\n\r\n" + image + b"\r\n"
+            )
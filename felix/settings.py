@@ -43,6 +43,9 @@ class TrainingConfig:
         self.navigation_path = config.get('training').get('navigation_path')
         self.model_root = config.get('training').get('model_root')
         self.driving_data_path = config.get('training').get('driving_data_path')
+        self.cache_path = config.get('training').get('cache_path', os.path.join(self.training_path, 'cache'))
+        self.batch_size = config.get('training').get('batch_size', 8)
+        self.num_workers = config.get('training').get('num_workers', 2)
         self.num_categories = TrainingCategories[self.mode].value
 
     @property
@@ -94,6 +97,11 @@ class AppSettings:
         camera = config.get('camera',{})
         self.DEFAULT_SENSOR_MODE = CameraSensor.mode(camera.get('sensor_mode',3))
         self.CAMERA_FOV = camera.get('fov',160)
+        # 'csi' (nvargus), or a V4L2 index/path for machines without the CSI camera.
+        self.CAMERA_SOURCE = camera.get('source', 'csi')
+        # Inference branches off the capture (felix/vision/capture_branches.py);
+        # None = one per camera model.
+        self.CAMERA_BRANCHES = camera.get('branches')
         
         self.DISTORTION_COEFFICIENTS = np.array(
             config.get('camera_calibration',{})
@@ -110,6 +118,29 @@ class AppSettings:
         self.autodrive_linear = config.get('autodrive',{}).get('linear',0.2)
         self.autodrive_angular = config.get('autodrive',{}).get('angular',0.5)
         self.nav_capture_frequency_seconds = config.get('nav_capture_frequency_seconds', 2)
+
+        # JPEG encoding for snapshots, tags, nav capture and MJPEG (felix/vision/jpeg.py)
+        jpeg = config.get('jpeg', {})
+        self.jpeg_backend = jpeg.get('backend', 'auto')
+        self.jpeg_quality = jpeg.get('quality', 75)
+        self.jpeg_chroma = str(jpeg.get('chroma', '420'))
+        self.jpeg_workers = jpeg.get('workers', 2)
+
+        # WebRTC camera stream (felix/agents/video_agent.py): one shared H.264
+        # encode per quality level, the best at this size/rate/bitrate. Viewers
+        # drop down the levels on loss/RTT (felix/agents/video_quality.py).
+        # With client_overlay the viewer draws the detections itself from its
+        # data channel (felix/agents/telemetry.py), sent with cmd_vel/ToF at
+        # telemetry_hz, instead of the boxes being burned into the video.
+        webrtc = config.get('webrtc', {})
+        self.webrtc_shared_encoder = webrtc.get('shared_encoder', True)
+        self.webrtc_width = webrtc.get('width', 960)
+        self.webrtc_height = webrtc.get('height', 540)
+        self.webrtc_fps = webrtc.get('fps', 30)
+        self.webrtc_bitrate = webrtc.get('bitrate', 1_500_000)
+        self.webrtc_levels = webrtc.get('levels', 4)
+        self.webrtc_client_overlay = webrtc.get('client_overlay', True)
+        self.webrtc_telemetry_hz = webrtc.get('telemetry_hz', 8)
         
         self.DEBUG: bool = config.get('debug', False)
 
@@ -124,6 +155,11 @@ class AppSettings:
         self.model_roi_height_ratio = model_settings.get('roi_height_ratio', 0.6)
         self.model_roi_vertical_offset = model_settings.get('roi_vertical_offset', 0.4)
         self.model_roi_width_ratio = model_settings.get('roi_width_ratio', 1.0)
+        # Inference backend for the autodrive classifier: torch | onnxruntime | tensorrt,
+        # at fp32 | fp16 | int8 (see felix/inference/backends.py).
+        self.model_backend = model_settings.get('backend', 'torch')
+        self.model_precision = model_settings.get('precision', 'fp32')
+        self.model_change_threshold = model_settings.get('change_threshold', 2.0)
         if self.model_use_roi:
             file_path = Path(self.TRAINING.training_model_path)
             self.model_file = file_path.parent / f"roi_{file_path.name}"
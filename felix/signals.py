@@ -1,21 +1,32 @@
-from blinker import signal
+from lib.bus import Policy, Topic
+
 
 class Topics:
-    cmd_vel = signal('cmd_vel')
-    joystick = signal('joystick')
-    nav_target = signal('nav_target')
-    raw_image = signal('raw_image')
-    autodrive = signal('autodrive')
-    stop = signal('stop')
-    image_tensor = signal('image_tensor')
-    tof = signal('tof')
-    ir = signal('ir')
-    prediction = signal('prediction')
-    pico_sensors = signal('pico_sensors')
-    nav_capture = signal('nav_capture')
-    detections = signal('detections')
+    # Streams: each subscriber gets its own bounded queue and is delivered on its
+    # own loop/thread, so a slow receiver never stalls the camera thread or the
+    # controller. raw_image's payload is a frame_ring view that is only valid
+    # while the capture thread holds its lease; queued receivers must re-lease
+    # the frame by its `seq` kwarg (frame_ring.lease(seq)). `ts` is the frame's
+    # time.monotonic() capture time, the clock felix.state.state_store uses.
+    cmd_vel = Topic('cmd_vel', Policy.LATEST)
+    nav_target = Topic('nav_target', Policy.LATEST)
+    raw_image = Topic('raw_image', Policy.LATEST)
+    image_tensor = Topic('image_tensor', Policy.LATEST)
+    tof = Topic('tof', Policy.DROP_OLDEST, maxsize=32)
+    ir = Topic('ir', Policy.DROP_OLDEST, maxsize=32)
+    prediction = Topic('prediction', Policy.LATEST)
+    # One message per sensor id, so keep a short FIFO rather than only the newest.
+    pico_sensors = Topic('pico_sensors', Policy.DROP_OLDEST, maxsize=32)
+    detections = Topic('detections', Policy.LATEST)
+
+    # Control toggles stay synchronous: callers (app.py, tests) read the effect
+    # right after send(), exactly as with the old blinker signals.
+    joystick = Topic('joystick')
+    autodrive = Topic('autodrive')
+    stop = Topic('stop')
+    nav_capture = Topic('nav_capture')
     # Seek control travels as signals (not direct method calls) so it reaches the
     # spun ObjectSeeker even though the module is instantiated twice -- mirrors how
     # `autodrive` is toggled. See test/test_object_seeker_signal.py.
-    seek = signal('seek')
-    seek_target = signal('seek_target')
\ No newline at end of file
+    seek = Topic('seek')
+    seek_target = Topic('seek_target')
@@ -0,0 +1,84 @@
+"""
+Shared, time-indexed robot state.
+
+Every node used to keep its own ``self.tof`` dict, overwritten (and copied)
+on each Pico message, with nothing tying a camera frame to the sensor values
+that were current when it was captured. The ``state_store`` singleton keeps a
+short history of each signal in a ``TimeSeries`` on the time.monotonic clock
+the frame ring and PicoSensors already stamp with, so a consumer can ask
+"what was the ToF at this frame's timestamp" instead:
+
+    with frame_ring.lease() as lease:
+        left = state_store.sensor_at("tof", 0, lease.ts)
+
+It fills itself from Topics.raw_image (frame seqs), Topics.pico_sensors
+(each (type, id) gets its own series) and Topics.cmd_vel; the Controller
+records IMU attitude as it polls the board.
+"""
+
+import threading
+import time
+
+from felix.signals import Topics
+from lib.interfaces import SensorReading, Twist
+from lib.timeseries import TimeSeries
+
+
+class StateStore:
+    def __init__(self, capacity: int = 512):
+        self.capacity = capacity
+        self.frames = TimeSeries(capacity, dim=1)      # frame_ring seq
+        self.cmd_vel = TimeSeries(capacity, dim=3)     # linear.x, linear.y, angular.z
+        self.imu = TimeSeries(capacity, dim=3)         # roll, pitch, yaw
+        self._sensors: dict[tuple[str, int], TimeSeries] = {}
+        self._create_lock = threading.Lock()
+
+    def connect(self):
+        Topics.raw_image.connect(self._on_raw_image)
+        Topics.pico_sensors.connect(self._on_pico_sensors)
+        Topics.cmd_vel.connect(self._on_cmd_vel)
+        return self
+
+    # ---- writers ----------------------------------------------------------
+
+    def _on_raw_image(self, sender, seq: int, ts: float | None = None, **kwargs):
+        self.frames.append(time.monotonic() if ts is None else ts, seq)
+
+    def _on_pico_sensors(self, sender, payload: SensorReading):
+        self.record_reading(payload)
+
+    def _on_cmd_vel(self, sender, payload: Twist):
+        self.cmd_vel.append(time.monotonic(), (payload.linear.x, payload.linear.y, payload.angular.z))
+
+    def record_reading(self, reading: SensorReading):
+        t = reading.received_at if reading.received_at is not None else time.monotonic()
+        self.sensor(reading.type, reading.id).append(t, reading.value)
+
+    # ---- readers ----------------------------------------------------------
+
+    def sensor(self, type: str, id: int) -> TimeSeries:
+        """History of one sensor, created on first use."""
+        series = self._sensors.get((type, id))
+        if series is None:
+            with self._create_lock:
+                series = self._sensors.setdefault((type, id), TimeSeries(self.capacity, dim=1))
+        return series
+
+    def sensor_at(self, type: str, id: int, t: float | None = None, default=None, back: int = 0):
+        """Sensor value current at ``t`` (latest if None), ``back`` samples earlier, or ``default``."""
+        value = self.sensor(type, id).at(float("inf") if t is None else t, back=back)
+        return default if value is None else value[0].item()
+
+    def sensors_at(self, type: str, t: float | None = None) -> dict[int, float]:
+        """{id: value current at ``t`` (latest if None)} for every sensor of ``type`` seen so far."""
+        values = {}
+        for (sensor_type, sensor_id), series in list(self._sensors.items()):
+            if sensor_type != type:
+                continue
+            value = series.at(float("inf") if t is None else t)
+            if value is not None:
+                values[sensor_id] = value[0].item()
+        return values
+
+
+state_store = StateStore().connect()
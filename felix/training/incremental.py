@@ -0,0 +1,142 @@
+"""
+Incremental fine-tuning for the ROI obstacle classifier.
+
+A full ``train.py`` run walks every image in ``settings.model_images`` and
+trains the whole network, even when a handful of snapshots were added since
+the last checkpoint. The pieces here let ROIObstacleTrainer.train_incremental
+do a much smaller job:
+
+- ``TrainingManifest`` (``<checkpoint>.manifest.json``) records which
+  samples (path, mtime and size, as in the ROI cache) a checkpoint has seen;
+  anything not in it is new.
+- ``split_model`` cuts the classifier into a frozen trunk and a trainable
+  tail (last block + head).
+- ``FeatureCache`` keeps the trunk's fp16 output per sample, keyed by a hash
+  of the trunk weights. Fine-tuning never changes the trunk, so features of
+  old samples are computed once and reused by later increments; a full
+  retrain changes the hash and starts a fresh cache.
+
+The tail is then trained on the new samples plus a random replay sample of
+old ones, without the image augmentations (they can't be applied to cached
+features).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+logger = logging.getLogger("trainer")
+
+
+class TrainingManifest:
+    def __init__(self, path, samples: dict[str, int] | None = None, history: list | None = None):
+        self.path = Path(path)
+        self.samples = samples or {}
+        self.history = history or []
+
+    @classmethod
+    def for_checkpoint(cls, model_file) -> "TrainingManifest":
+        return cls(f"{model_file}.manifest.json")
+
+    def load(self) -> bool:
+        """Read the manifest if it exists; False if there is none."""
+        if not self.path.exists():
+            return False
+        with open(self.path) as f:
+            data = json.load(f)
+        self.samples = data.get("samples", {})
+        self.history = data.get("history", [])
+        return True
+
+    def record(self, keys: dict[str, int], mode: str, accuracy: float | None, replace: bool = False):
+        """Mark ``keys`` ({sample key: label}) as seen by the checkpoint and save."""
+        if replace:
+            self.samples = {}
+        self.samples.update(keys)
+        self.history.append({
+            "time": int(time.time()),
+            "mode": mode,
+            "new_samples": len(keys),
+            "accuracy": accuracy,
+        })
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"samples": self.samples, "history": self.history}, f)
+        os.replace(tmp, self.path)
+
+
+def split_model(model) -> tuple[torch.nn.Module, torch.nn.Module]:
+    """
+    (trunk, tail) sharing ``model``'s modules, with tail(trunk(x)) == model(x):
+    resnet50 -> layer4 + fc, mobilenet_v3 -> last feature block + classifier,
+    alexnet -> classifier.
+    """
+    from torchvision.models import AlexNet, MobileNetV3, ResNet
+
+    if isinstance(model, ResNet):
+        trunk = torch.nn.Sequential(
+            model.conv1, model.bn1, model.relu, model.maxpool, model.layer1, model.layer2, model.layer3
+        )
+        tail = torch.nn.Sequential(model.layer4, model.avgpool, torch.nn.Flatten(1), model.fc)
+    elif isinstance(model, MobileNetV3):
+        trunk = model.features[:-1]
+        tail = torch.nn.Sequential(model.features[-1], model.avgpool, torch.nn.Flatten(1), model.classifier)
+    elif isinstance(model, AlexNet):
+        trunk = model.features
+        tail = torch.nn.Sequential(model.avgpool, torch.nn.Flatten(1), model.classifier)
+    else:
+        raise ValueError(f"don't know how to split {type(model).__name__}")
+    return trunk, tail
+
+
+def module_hash(module: torch.nn.Module) -> str:
+    digest = hashlib.sha1()
+    for name, tensor in module.state_dict().items():
+        digest.update(name.encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:12]
+
+
+class FeatureCache:
+    """fp16 trunk outputs per sample key, in a memory-mapped array + JSON index."""
+
+    def __init__(self, cache_dir, trunk_hash: str, source: str, shape: tuple[int, ...]):
+        self.cache_dir = Path(cache_dir)
+        self.shape = tuple(shape)
+        self.row_bytes = int(np.prod(self.shape)) * 2
+        key = hashlib.sha1(repr((trunk_hash, source, self.shape)).encode()).hexdigest()[:12]
+        self.data_path = self.cache_dir / f"features_{key}.f16"
+        self.index_path = self.cache_dir / f"features_{key}.json"
+        self.index: dict[str, int] = {}
+        if self.index_path.exists() and self.data_path.exists():
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    @property
+    def rows(self) -> int:
+        return os.path.getsize(self.data_path) // self.row_bytes if self.data_path.exists() else 0
+
+    def add(self, keys: list[str], features: np.ndarray):
+        """Append (n, *shape) features for ``keys``."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        start = self.rows
+        with open(self.data_path, "ab") as f:
+            f.truncate(start * self.row_bytes)  # drop a torn tail from an interrupted add
+            f.write(np.ascontiguousarray(features, dtype=np.float16).tobytes())
+        for n, key in enumerate(keys):
+            self.index[key] = start + n
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def get(self, keys: list[str]) -> np.ndarray:
+        """(n, *shape) fp16 features for ``keys`` (all must be cached)."""
+        data = np.memmap(self.data_path, dtype=np.float16, mode="r", shape=(self.rows, *self.shape))
+        return np.array(data[[self.index[key] for key in keys]])
@@ -58,12 +58,14 @@ class MecanumDriver:
         
         print("Model loaded successfully!")
         
-    def predict(self, image, tof_left_mm, tof_right_mm):
+    def predict(self, image, tof_left_mm, tof_right_mm, img_tensor=None):
         """
         Args:
             image: numpy array (H, W, 3) BGR
             tof_left_mm: left ToF reading in millimeters
             tof_right_mm: right ToF reading in millimeters
+            img_tensor: optional already-normalized (1, 3, 224, 224) RGB tensor
+                (e.g. shared by the InferenceServer); skips image preprocessing
             
         Returns:
             dict with linear_x, linear_y, angular_z in m/s and rad/s
@@ -71,8 +73,10 @@ class MecanumDriver:
         start_time = time.time()
         
         # Preprocess image
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        img_tensor = self.transform(image_rgb).unsqueeze(0).to(self.device)
+        if img_tensor is None:
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            img_tensor = self.transform(image_rgb).unsqueeze(0)
+        img_tensor = img_tensor.to(self.device)
         
         # Preprocess ToF
         tof_tensor = torch.tensor(
@@ -1,25 +1,35 @@
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import ConcatDataset, Dataset, DataLoader
 import cv2
+import numpy as np
 from torchvision import transforms
 from pathlib import Path
 from torch.amp import autocast
 from torch.cuda.amp import GradScaler
 from felix.settings import settings
 from felix.training.mecanum.model import MecanumSensorFusionNet
+from felix.training.nav_shards import NavShard, find_shards, parse_nav_filename
+from felix.training.transformations import BatchAugment, ResizeToUint8Tensor
 
 def _denormalize_velocity(value: int, scale: int = 1000) -> float:
     return float(value) / scale
 
 
+def _nav_key(filename):
+    """(values, timestamp) of a nav_*.jpg name, or None; matches MecanumShardDataset.keys()."""
+    parsed = parse_nav_filename(filename)
+    return None if parsed is None else (tuple(parsed[0]), parsed[1])
+
+
 class MecanumDataset(Dataset):
-    def __init__(self, data_dir=settings.TRAINING.navigation_path, transform=None, tof_max_range=1200): #2000
+    def __init__(self, data_dir=settings.TRAINING.navigation_path, transform=None, tof_max_range=1200, exclude=None): #2000
         """
         Args:
             data_dir: Directory containing nav_*.jpg images
             transform: Image transforms
             tof_max_range: Maximum ToF sensor range in mm (e.g., 2000mm = 2m)
+            exclude: (values, timestamp) keys to skip, e.g. MecanumShardDataset.keys()
         """
         self.data_dir = Path(data_dir)
         self.transform = transform
@@ -27,6 +37,8 @@ class MecanumDataset(Dataset):
         
         # Find all nav images
         self.image_files = sorted(self.data_dir.rglob("nav_*.jpg"))
+        if exclude:
+            self.image_files = [p for p in self.image_files if _nav_key(p.name) not in exclude]
         print(f"Found {len(self.image_files)} training images")
         
         # Parse filenames to get labels
@@ -54,38 +66,36 @@ class MecanumDataset(Dataset):
         """
         Parse filename: nav_prevL_prevR_prevX_prevY_prevZ_curL_curR_curX_curY_curZ_timestamp.jpg
         """
-        try:
-            # Remove 'nav_' prefix and '.jpg' suffix
-            parts = filename.replace('nav_', '').replace('.jpg', '').split('_')
-            
-            if len(parts) < 11:
-                return None
-            
-            return {
-                'prev_tof_left': int(parts[0]),
-                'prev_tof_right': int(parts[1]),
-                'prev_linear_x': _denormalize_velocity(int(parts[2])),
-                'prev_linear_y': _denormalize_velocity(int(parts[3])),
-                'prev_angular_z': _denormalize_velocity(int(parts[4])),
-                'tof_left': int(parts[5]),
-                'tof_right': int(parts[6]),
-                'linear_x': _denormalize_velocity(int(parts[7])),
-                'linear_y': _denormalize_velocity(int(parts[8])),
-                'angular_z': _denormalize_velocity(int(parts[9])),
-                # parts[10] is timestamp, ignore for now
-            }
-        except (ValueError, IndexError) as e:
-            print(f"Failed to parse {filename}: {e}")
+        parsed = parse_nav_filename(filename)
+        if parsed is None:
+            print(f"Failed to parse {filename}")
             return None
+        values, _ = parsed
+        return {
+            'prev_tof_left': values[0],
+            'prev_tof_right': values[1],
+            'prev_linear_x': _denormalize_velocity(values[2]),
+            'prev_linear_y': _denormalize_velocity(values[3]),
+            'prev_angular_z': _denormalize_velocity(values[4]),
+            'tof_left': values[5],
+            'tof_right': values[6],
+            'linear_x': _denormalize_velocity(values[7]),
+            'linear_y': _denormalize_velocity(values[8]),
+            'angular_z': _denormalize_velocity(values[9]),
+        }
     
     def __len__(self):
         return len(self.samples)
     
-    def __getitem__(self, idx):
+    def _load(self, idx):
+        """(BGR image, tof_left, tof_right, linear_x, linear_y, angular_z) of sample ``idx``."""
         sample = self.samples[idx]
-        
-        # Load image
         image = cv2.imread(str(sample['image_path']))
+        return (image, sample['tof_left'], sample['tof_right'],
+                sample['linear_x'], sample['linear_y'], sample['angular_z'])
+
+    def __getitem__(self, idx):
+        image, tof_left, tof_right, linear_x, linear_y, angular_z = self._load(idx)
         image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         
         if self.transform:
@@ -93,8 +103,8 @@ class MecanumDataset(Dataset):
         
         # Current ToF sensors - normalize to [0, 1]
         tof = torch.tensor([
-            sample['tof_left'] / self.tof_max,
-            sample['tof_right'] / self.tof_max
+            tof_left / self.tof_max,
+            tof_right / self.tof_max
         ], dtype=torch.float32)
         
         # Target command velocities - normalize to [-1, 1]
@@ -104,9 +114,9 @@ class MecanumDataset(Dataset):
         max_angular_z = settings.VEHICLE.max_angular_velocity #1.0
         
         cmd = torch.tensor([
-            sample['linear_x'] / max_linear_x,
-            sample['linear_y'] / max_linear_y,
-            sample['angular_z'] / max_angular_z
+            linear_x / max_linear_x,
+            linear_y / max_linear_y,
+            angular_z / max_angular_z
         ], dtype=torch.float32)
         
         # Clamp to [-1, 1]
@@ -115,6 +125,84 @@ class MecanumDataset(Dataset):
         return image, tof, cmd
 
 
+class MecanumShardDataset(MecanumDataset):
+    """
+    MecanumDataset over .navshard files (see felix.training.nav_shards): one
+    glob and one index read per shard instead of a filename parse per image,
+    with images sliced out of the memory-mapped shards.
+    """
+
+    def __init__(self, data_dir=settings.TRAINING.navigation_path, transform=None, tof_max_range=1200):
+        self.data_dir = Path(data_dir)
+        self.transform = transform
+        self.tof_max = tof_max_range
+
+        self.shards = [NavShard(path) for path in find_shards(self.data_dir)]
+        print(f"Found {len(self.shards)} shards")
+        # (shard, record) per sample
+        self.index = np.concatenate([
+            np.stack([np.full(len(shard), i), np.arange(len(shard))], axis=1)
+            for i, shard in enumerate(self.shards)
+        ]) if self.shards else np.zeros((0, 2), dtype=np.int64)
+        print(f"Loaded {len(self.index)} samples")
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self) -> set:
+        """(values, timestamp) of every sample, keyed like the nav_*.jpg it may have been converted from."""
+        keys = set()
+        for shard in self.shards:
+            r = shard.records
+            values = np.concatenate([r['prev_tof'], r['prev_cmd'], r['tof'], r['cmd']], axis=1)
+            keys.update(zip(map(tuple, values.tolist()), r['ts_ms'].tolist()))
+        return keys
+
+    def _load(self, idx):
+        shard_idx, record_idx = self.index[idx]
+        shard = self.shards[shard_idx]
+        record = shard.records[record_idx]
+        tof, cmd = record['tof'], record['cmd']
+        return (shard.image(record_idx), int(tof[0]), int(tof[1]),
+                _denormalize_velocity(cmd[0]), _denormalize_velocity(cmd[1]), _denormalize_velocity(cmd[2]))
+
+
+class MixedNavDataset(ConcatDataset):
+    """Shards plus legacy JPEGs; setting ``transform`` sets it on both, as train_model expects."""
+
+    @property
+    def transform(self):
+        return self.datasets[0].transform
+
+    @transform.setter
+    def transform(self, transform):
+        for dataset in self.datasets:
+            dataset.transform = transform
+
+
+def create_dataset(data_dir, transform=None, tof_max_range=1200) -> Dataset:
+    """
+    Every .navshard under ``data_dir`` plus the legacy nav_*.jpg files that
+    aren't already in one of them (convert_folder leaves the JPEGs in place),
+    so a tree that is only partly converted still trains on all of it.
+    """
+    if not find_shards(data_dir):
+        return MecanumDataset(data_dir, transform, tof_max_range)
+    shards = MecanumShardDataset(data_dir, transform, tof_max_range)
+    legacy = MecanumDataset(data_dir, transform, tof_max_range, exclude=shards.keys())
+    if not legacy.samples:
+        return shards
+    return MixedNavDataset([shards, legacy])
+
+
+def _flip_labels(tof, commands, flipped):
+    """Mirror labels for horizontally flipped samples: swap ToF left/right, negate linear_y and angular_z."""
+    mask = flipped.view(-1, 1)
+    tof = torch.where(mask, tof.flip(-1), tof)
+    commands = torch.where(mask, commands * commands.new_tensor([1.0, -1.0, -1.0]), commands)
+    return tof, commands
+
+
 def train_model(data_dir, 
                 epochs=100, 
                 batch_size=32, 
@@ -125,7 +213,9 @@ def train_model(data_dir,
                 max_linear_y=0.3,
                 max_angular_z=1.0,
                 use_amp=True,
-                save_path='mecanum_resnet50.pth'):
+                save_path='mecanum_resnet50.pth',
+                augment_on_device=True,
+                random_flip=False):
     
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     print(f"Training on: {device}")
@@ -149,9 +239,19 @@ def train_model(data_dir,
                            std=[0.229, 0.224, 0.225])
     ])
     
+    # On-device path: the loader only resizes to uint8 tensors and BatchAugment
+    # does the jitter (and optional mirrored flips) per batch on the device.
+    augment = None
+    if augment_on_device:
+        train_transform = val_transform = ResizeToUint8Tensor(224)
+        augment = BatchAugment(
+            p_low_light=0.0, brightness=0.2, contrast=0.2, saturation=0.2, hue=0.0,
+            p_noise=0.0, p_flip=0.5 if random_flip else 0.0,
+        ).to(device)
+    
     # Create dataset
     print("\nLoading dataset...")
-    full_dataset = MecanumDataset(data_dir, train_transform, tof_max_range)
+    full_dataset = create_dataset(data_dir, train_transform, tof_max_range)
     
     if len(full_dataset) == 0:
         raise ValueError("No valid samples found in dataset!")
@@ -209,11 +309,16 @@ def train_model(data_dir,
         # Training phase
         model.train()
         train_loss = 0
+        if augment is not None:
+            augment.train()
         
         for batch_idx, (images, tof, commands) in enumerate(train_loader):
             images = images.to(device, non_blocking=True)
             tof = tof.to(device, non_blocking=True)
             commands = commands.to(device, non_blocking=True)
+            if augment is not None:
+                images, _, flipped = augment(images)
+                tof, commands = _flip_labels(tof, commands, flipped)
             
             optimizer.zero_grad()
             
@@ -240,12 +345,16 @@ def train_model(data_dir,
         # Validation phase
         model.eval()
         val_loss = 0
+        if augment is not None:
+            augment.eval()
         
         with torch.no_grad():
             for images, tof, commands in val_loader:
                 images = images.to(device, non_blocking=True)
                 tof = tof.to(device, non_blocking=True)
                 commands = commands.to(device, non_blocking=True)
+                if augment is not None:
+                    images, _, _ = augment(images)
                 
                 if use_amp:
                     with autocast(device_type='cuda', dtype=torch.float16):  # FIXED
@@ -296,7 +405,7 @@ if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(description='Train Mecanum navigation model')
     parser.add_argument('--data_dir', type=str, default=settings.TRAINING.navigation_path,
-                       help='Directory containing nav_*.jpg images')
+                       help='Directory containing .navshard files or nav_*.jpg images')
     parser.add_argument('--epochs', type=int, default=100)
     parser.add_argument('--batch_size', type=int, default=32)
     parser.add_argument('--lr', type=float, default=0.001)
@@ -308,6 +417,10 @@ if __name__ == '__main__':
     parser.add_argument('--output', type=str, default=settings.TRAINING.mecanum_model_path)
     parser.add_argument('--no_amp', action='store_true',
                        help='Disable automatic mixed precision')
+    parser.add_argument('--cpu_augment', action='store_true',
+                       help='Augment per sample in the loader instead of per batch on the device')
+    parser.add_argument('--random_flip', action='store_true',
+                       help='Mirror half the samples (ToF swapped, linear_y/angular_z negated)')
     
     args = parser.parse_args()
 
@@ -322,7 +435,9 @@ if __name__ == '__main__':
         max_linear_y=args.max_linear_y,
         max_angular_z=args.max_angular_z,
         use_amp=not args.no_amp,
-        save_path=args.output
+        save_path=args.output,
+        augment_on_device=not args.cpu_augment,
+        random_flip=args.random_flip,
     )
 
 
@@ -0,0 +1,300 @@
+"""
+Append-only packed shards for navigation capture.
+
+Navigation samples used to be one JPEG each, named
+``nav_<prevL>_<prevR>_<prevX>_<prevY>_<prevZ>_<L>_<R>_<X>_<Y>_<Z>_<ts>.jpg``,
+so every training run started with an rglob over ~100k tiny files and a
+filename parse per sample. A capture session now writes a few ``.navshard``
+files instead:
+
+    header    b"NAVSHARD" u32 version
+    chunk*    b"NAVCHUNK" u32 n u64 blob_bytes
+              <blob_bytes of concatenated JPEGs>
+              <n RECORD_DTYPE records>
+    index     <m CHUNK_DTYPE entries: chunk offset, record count>
+    footer    b"NAVINDEX" u64 index offset u64 m
+
+Records are fixed-width structured numpy rows holding the same ten integers
+as the old filename (ToF in mm, velocities x1000) plus the capture time and
+the JPEG's offset/length in the file. Chunks are written whole, so a crash
+loses at most the unflushed chunk. The index footer is written on close; a
+shard without one (the session was killed) is recovered by walking the
+chunk headers from the start.
+
+Readers memory-map the file, so opening a shard costs one read of its index
+and record tables and an image is a slice of the map:
+
+    shard = NavShard(path)
+    shard.records["tof"][i], shard.image(i)
+
+Existing JPEG folders convert with one shard per session folder:
+
+    python -m felix.training.nav_shards SRC_DIR [DST_DIR]
+"""
+
+import logging
+import os
+import struct
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".navshard"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sI")
+_CHUNK = struct.Struct("<8sIQ")
+_FOOTER = struct.Struct("<8sQQ")
+_HEADER_MAGIC = b"NAVSHARD"
+_CHUNK_MAGIC = b"NAVCHUNK"
+_FOOTER_MAGIC = b"NAVINDEX"
+
+# Field order matches the old filename and ImageCollector.save_navigation_image's values.
+VALUE_FIELDS = ("prev_tof", "prev_cmd", "tof", "cmd")
+
+RECORD_DTYPE = np.dtype([
+    ("offset", "<u8"),          # JPEG start, absolute file offset
+    ("length", "<u4"),          # JPEG byte count
+    ("ts_ms", "<u8"),           # capture wall time, ms
+    ("prev_tof", "<i4", (2,)),  # left, right (mm)
+    ("prev_cmd", "<i4", (3,)),  # linear.x, linear.y, angular.z (x1000)
+    ("tof", "<i4", (2,)),
+    ("cmd", "<i4", (3,)),
+])
+
+CHUNK_DTYPE = np.dtype([("offset", "<u8"), ("count", "<u4")])
+
+
+def parse_nav_filename(filename: str) -> tuple[list[int], int] | None:
+    """``nav_<10 ints>_<ts>.jpg`` -> (values, ts_ms), or None if it doesn't parse."""
+    name = os.path.basename(filename)
+    if not name.startswith("nav_") or not name.endswith(".jpg"):
+        return None
+    parts = name[len("nav_"):-len(".jpg")].split("_")
+    if len(parts) < 11:
+        return None
+    try:
+        return [int(p) for p in parts[:10]], int(parts[10])
+    except ValueError:
+        return None
+
+
+class NavShardWriter:
+    """
+    Appends samples to ``<directory>/<name>-NNN.navshard``, starting a new
+    part once ``max_bytes`` is reached. Not thread safe; one writer per session.
+    """
+
+    def __init__(self, directory, name: str, chunk_size: int = 32, max_bytes: int = 1 << 30):
+        self.directory = Path(directory)
+        self.name = name
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.path: Path | None = None
+        self._file = None
+        self._part = 0
+        self._chunks: list[tuple[int, int]] = []
+        self._blobs: list[bytes] = []
+        self._values: list[tuple[list[int], int]] = []
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            self.path = self.directory / f"{self.name}-{self._part:03d}{SUFFIX}"
+            self._part += 1
+            if not self.path.exists():  # never append to (or clobber) a finished shard
+                break
+        self._file = open(self.path, "wb")
+        self._file.write(_HEADER.pack(_HEADER_MAGIC, VERSION))
+        self._chunks = []
+
+    def append(self, values: list[int], jpeg: bytes, ts_ms: int | None = None) -> str:
+        """Queue one sample; returns ``<shard path>#<index>``."""
+        if len(values) != 10:
+            raise ValueError(f"expected 10 navigation values, got {len(values)}")
+        if self._file is None:
+            self._open()
+        self._blobs.append(bytes(jpeg))
+        self._values.append((values, int(time.time() * 1000) if ts_ms is None else ts_ms))
+        ref = f"{self.path}#{sum(c for _, c in self._chunks) + len(self._blobs) - 1}"
+        self.count += 1
+        if len(self._blobs) >= self.chunk_size:
+            self.flush()
+        return ref
+
+    def flush(self):
+        """Write the queued samples as one chunk."""
+        if not self._blobs:
+            return
+        start = self._file.tell()
+        blob_bytes = sum(len(b) for b in self._blobs)
+        records = np.zeros(len(self._blobs), dtype=RECORD_DTYPE)
+        offset = start + _CHUNK.size
+        for i, (blob, (values, ts_ms)) in enumerate(zip(self._blobs, self._values)):
+            records[i]["offset"] = offset
+            records[i]["length"] = len(blob)
+            records[i]["ts_ms"] = ts_ms
+            records[i]["prev_tof"] = values[0:2]
+            records[i]["prev_cmd"] = values[2:5]
+            records[i]["tof"] = values[5:7]
+            records[i]["cmd"] = values[7:10]
+            offset += len(blob)
+        self._file.write(b"".join([_CHUNK.pack(_CHUNK_MAGIC, len(records), blob_bytes), *self._blobs, records.tobytes()]))
+        self._file.flush()
+        self._chunks.append((start, len(records)))
+        self._blobs, self._values = [], []
+        if self._file.tell() >= self.max_bytes:
+            self._finish()
+
+    def _finish(self):
+        index = np.array(self._chunks, dtype=CHUNK_DTYPE)
+        index_offset = self._file.tell()
+        self._file.write(index.tobytes())
+        self._file.write(_FOOTER.pack(_FOOTER_MAGIC, index_offset, len(index)))
+        self._file.close()
+        self._file = None
+
+    def close(self):
+        """Flush and write the index footer. The next append starts a new part."""
+        if self._file is None:
+            return
+        self.flush()
+        if self._file is not None:
+            self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NavShard:
+    """
+    Read-only view of one shard. The file is mapped lazily (and not pickled),
+    so a NavShard can be handed to DataLoader workers.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            data = f.read(_HEADER.size)
+            if len(data) < _HEADER.size:
+                raise ValueError(f"{self.path}: truncated header")
+            magic, version = _HEADER.unpack(data)
+            if magic != _HEADER_MAGIC or version != VERSION:
+                raise ValueError(f"{self.path}: not a version {VERSION} nav shard")
+            size = f.seek(0, os.SEEK_END)
+            chunks = self._read_index(f, size)
+            if chunks is None:
+                chunks = self._scan_chunks(f, size)
+            tables = []
+            for offset, count in chunks:
+                f.seek(offset)
+                _, n, blob_bytes = _CHUNK.unpack(f.read(_CHUNK.size))
+                f.seek(offset + _CHUNK.size + blob_bytes)
+                tables.append(np.frombuffer(f.read(n * RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE))
+        self.records = np.concatenate(tables) if tables else np.zeros(0, dtype=RECORD_DTYPE)
+        self._map = None
+
+    def _read_index(self, f, size):
+        if size < _HEADER.size + _FOOTER.size:
+            return None
+        f.seek(size - _FOOTER.size)
+        magic, index_offset, m = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic != _FOOTER_MAGIC or index_offset + m * CHUNK_DTYPE.itemsize + _FOOTER.size != size:
+            return None
+        f.seek(index_offset)
+        index = np.frombuffer(f.read(m * CHUNK_DTYPE.itemsize), dtype=CHUNK_DTYPE)
+        return [(int(o), int(c)) for o, c in index]
+
+    def _scan_chunks(self, f, size):
+        """Unclosed shard: walk chunk headers, stopping at a torn tail."""
+        logger.warning(f"{self.path}: no index footer, recovering chunks")
+        chunks, offset = [], _HEADER.size
+        while offset + _CHUNK.size <= size:
+            f.seek(offset)
+            magic, n, blob_bytes = _CHUNK.unpack(f.read(_CHUNK.size))
+            end = offset + _CHUNK.size + blob_bytes + n * RECORD_DTYPE.itemsize
+            if magic != _CHUNK_MAGIC or end > size:
+                break
+            chunks.append((offset, n))
+            offset = end
+        return chunks
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_map"] = None
+        return state
+
+    def jpeg(self, i: int) -> np.ndarray:
+        """Encoded JPEG of sample ``i`` (a view into the mapped file)."""
+        if self._map is None:
+            self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+        record = self.records[i]
+        return self._map[record["offset"]:record["offset"] + record["length"]]
+
+    def image(self, i: int) -> np.ndarray:
+        """Decoded BGR image of sample ``i``."""
+        return cv2.imdecode(self.jpeg(i), cv2.IMREAD_COLOR)
+
+
+def find_shards(directory) -> list[Path]:
+    """Every shard under ``directory``, in a stable order."""
+    return sorted(Path(directory).rglob(f"*{SUFFIX}"))
+
+
+def convert_folder(src, dst=None, chunk_size: int = 256) -> list[Path]:
+    """
+    Pack each folder of ``nav_*.jpg`` files under ``src`` into
+    ``<dst>/<folder path relative to src>/<folder name>-000.navshard``
+    (``dst`` defaults to ``src``). The JPEGs are left in place.
+    """
+    src = Path(src)
+    dst = Path(dst) if dst is not None else src
+    by_folder: dict[Path, list[tuple[int, str, list[int]]]] = {}
+    skipped = 0
+    for root, _, filenames in os.walk(src):
+        for filename in filenames:
+            parsed = parse_nav_filename(filename)
+            if parsed is None:
+                skipped += filename.endswith(".jpg")
+                continue
+            values, ts_ms = parsed
+            by_folder.setdefault(Path(root), []).append((ts_ms, filename, values))
+
+    written = []
+    for folder, samples in sorted(by_folder.items()):
+        relative = folder.relative_to(src)
+        name = folder.name if relative.parts else "nav"
+        with NavShardWriter(dst / relative, name, chunk_size=chunk_size) as writer:
+            for ts_ms, filename, values in sorted(samples):
+                with open(folder / filename, "rb") as f:
+                    writer.append(values, f.read(), ts_ms)
+            written.append(writer.path)
+        logger.info(f"{folder}: {len(samples)} samples -> {writer.path}")
+    if skipped:
+        logger.warning(f"skipped {skipped} .jpg files that aren't nav_<values>_<ts>.jpg")
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack nav_*.jpg capture folders into .navshard files")
+    parser.add_argument("src", help="Directory containing nav_*.jpg images (searched recursively)")
+    parser.add_argument("dst", nargs="?", default=None, help="Output directory (default: SRC)")
+    parser.add_argument("--chunk_size", type=int, default=256)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for path in convert_folder(args.src, args.dst, args.chunk_size):
+        print(path)
@@ -0,0 +1,169 @@
+"""
+Preprocessing cache for the ROI obstacle trainer.
+
+Every epoch used to decode each JPEG with PIL, ROI-crop it and resize it to
+224x224 before the random augmentations, so on the Jetson most of training
+was spent in JPEG decode. That part is deterministic: ``RoiImageCache``
+stores its uint8 RGB result once, in a memory-mapped array next to a JSON
+index keyed by file path, mtime and size, and ``CachedRoiImageFolder``
+serves rows from it so only the random augmentations run per epoch.
+
+One cache exists per image root, ROI settings and output size (hashed into
+the file names). Changed images are re-processed on the next run, and the
+cache is rewritten once rows for deleted or changed images outnumber live ones.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from torchvision.datasets.folder import default_loader
+
+from felix.training.datasets import CustomImageFolder
+
+logger = logging.getLogger("trainer")
+
+CACHE_VERSION = 1
+
+
+def file_key(path) -> str:
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+class _Preprocess(torch.utils.data.Dataset):
+    """Decode + ROI + resize for the cache misses, so DataLoader workers can share it."""
+
+    def __init__(self, paths, roi_transform, size):
+        self.paths = paths
+        self.roi_transform = roi_transform
+        self.resize = transforms.Resize(size)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        image = default_loader(self.paths[i])
+        if self.roi_transform is not None:
+            image = self.roi_transform(image)
+        return np.array(self.resize(image), dtype=np.uint8)
+
+
+class RoiImageCache:
+    def __init__(self, cache_dir, root, roi_transform=None, size: tuple[int, int] = (224, 224)):
+        self.cache_dir = Path(cache_dir)
+        self.roi_transform = roi_transform
+        self.size = tuple(size)
+        self.row_shape = (*self.size, 3)
+        self.row_bytes = int(np.prod(self.row_shape))
+
+        roi = (
+            None if roi_transform is None else
+            (roi_transform.roi_height_ratio, roi_transform.roi_width_ratio, roi_transform.roi_vertical_offset)
+        )
+        key = hashlib.sha1(
+            repr((CACHE_VERSION, os.path.abspath(root), roi, self.size)).encode()
+        ).hexdigest()[:12]
+        self.data_path = self.cache_dir / f"roi_{key}.u8"
+        self.index_path = self.cache_dir / f"roi_{key}.json"
+        self.index: dict[str, int] = {}
+        if self.index_path.exists() and self.data_path.exists():
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        self._map = None
+
+    @property
+    def rows(self) -> int:
+        return os.path.getsize(self.data_path) // self.row_bytes if self.data_path.exists() else 0
+
+    def fill(self, paths: list[str], num_workers: int = 0) -> np.ndarray:
+        """Cache any of ``paths`` not cached yet; returns each path's row."""
+        keys = [file_key(p) for p in paths]
+        live = set(keys)
+        if len(self.index) - len(live & self.index.keys()) > len(live):
+            self._compact(live)
+
+        missing = [i for i, key in enumerate(keys) if key not in self.index]
+        if missing:
+            logger.info(f"ROI cache: preprocessing {len(missing)} of {len(paths)} images")
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            start = self.rows
+            with open(self.data_path, "ab") as f:
+                f.truncate((start + len(missing)) * self.row_bytes)
+            data = np.memmap(self.data_path, dtype=np.uint8, mode="r+", shape=(start + len(missing), *self.row_shape))
+            loader = torch.utils.data.DataLoader(
+                _Preprocess([paths[i] for i in missing], self.roi_transform, self.size),
+                batch_size=None,
+                num_workers=num_workers,
+            )
+            for n, (i, row) in enumerate(zip(missing, loader)):
+                data[start + n] = row.numpy()
+                self.index[keys[i]] = start + n
+            data.flush()
+            del data
+            self._save_index()
+        self._map = None
+        return np.array([self.index[key] for key in keys], dtype=np.int64)
+
+    def _compact(self, live: set[str]):
+        keep = sorted((row, key) for key, row in self.index.items() if key in live)
+        logger.info(f"ROI cache: compacting {len(self.index)} rows to {len(keep)}")
+        old = np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=(self.rows, *self.row_shape))
+        tmp = self.data_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            for row, _ in keep:
+                f.write(old[row].tobytes())
+        del old
+        os.replace(tmp, self.data_path)
+        self.index = {key: i for i, (_, key) in enumerate(keep)}
+        self._save_index()
+
+    def _save_index(self):
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def __getitem__(self, row: int) -> np.ndarray:
+        """(H, W, 3) uint8 RGB view of a cached row."""
+        if self._map is None:
+            self._map = np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=(self.rows, *self.row_shape))
+        return self._map[row]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_map"] = None  # each DataLoader worker maps the file itself
+        return state
+
+
+class CachedRoiImageFolder(CustomImageFolder):
+    """
+    CustomImageFolder whose samples come from a RoiImageCache as uint8
+    (3, H, W) tensors; ``transform`` holds only the per-epoch augmentations.
+    The ROI crop is horizontally centred, so flipping the cached crop is the
+    same as cropping the flipped image.
+    """
+
+    def __init__(self, root, cache: RoiImageCache, transform=None, target_transform=None,
+                 random_flip=False, target_flips=None, num_workers: int = 0):
+        super().__init__(root, transform=transform, target_transform=target_transform,
+                         random_flip=random_flip, target_flips=target_flips)
+        self.cache = cache
+        self.rows = cache.fill([path for path, _ in self.samples], num_workers=num_workers)
+
+    def __getitem__(self, index: int):
+        _, target = self.samples[index]
+        sample = torch.from_numpy(np.array(self.cache[self.rows[index]])).permute(2, 0, 1)
+        if self.random_flip and torch.rand(1).item() > 0.5:
+            sample = sample.flip(-1)
+            target = self.target_flips[target] if self.target_flips is not None else target
+        if self.transform is not None:
+            sample = self.transform(sample)
+        if self.target_transform is not None:
+            target = self.target_transform(target)
+        return sample, target
@@ -1,4 +1,6 @@
 import os
+import random
+import time
 from felix.training.base import Trainer
 from felix.vision.roi_utils import ROITransform
 import torch
@@ -21,7 +23,9 @@ import logging
 # Assuming these imports from your existing code
 from felix.settings import settings, ModelType
 from felix.training.datasets import CustomImageFolder
-from felix.training.transformations import RandomLowLightTransform, AddGaussianNoise
+from felix.training.incremental import FeatureCache, TrainingManifest, module_hash, split_model
+from felix.training.roi_cache import CachedRoiImageFolder, RoiImageCache, file_key
+from felix.training.transformations import RandomLowLightTransform, AddGaussianNoise, BatchAugment
 from nav_trainer import NavImageFolder
 
 logger = logging.getLogger("trainer")
@@ -40,6 +44,12 @@ class ROIObstacleTrainer(Trainer):
         pct_low_light=0.2,
         pct_noise=0.2,
         early_stop_threshold=0.98,
+        batch_size=None,
+        num_workers=None,
+        use_cache=True,
+        augment_on_device=True,
+        performance=False,
+        accumulate_steps=1,
         *args,
         **kwargs,
     ):
@@ -51,6 +61,13 @@ class ROIObstacleTrainer(Trainer):
             roi_height_ratio: Fraction of image height to keep
             roi_width_ratio: Fraction of image width to keep
             roi_vertical_offset: Where to start vertical crop (0.0=top, 1.0=bottom)
+            batch_size / num_workers: DataLoader settings (default: training config)
+            use_cache: Serve ROI-cropped, resized images from the preprocessing cache
+            augment_on_device: Load uint8 batches and augment them with BatchAugment
+                on the training device instead of per sample in the loader
+            performance: Mixed precision (CUDA), torch.compile and channels_last
+            accumulate_steps: Batches per optimizer step (effective batch =
+                batch_size * accumulate_steps)
             Other args: Same as ObstacleTrainer
         """
         super().__init__(*args, **kwargs)
@@ -59,6 +76,12 @@ class ROIObstacleTrainer(Trainer):
         self.pct_low_light = pct_low_light
         self.pct_noise = pct_noise
         self.early_stop_threshold = early_stop_threshold
+        self.batch_size = batch_size or settings.TRAINING.batch_size
+        self.num_workers = settings.TRAINING.num_workers if num_workers is None else num_workers
+        self.use_cache = use_cache
+        self.augment_on_device = augment_on_device
+        self.performance = performance
+        self.accumulate_steps = max(1, accumulate_steps)
         self.model_file = settings.model_file
         self.num_targets = settings.model_num_targets
 
@@ -68,7 +91,13 @@ class ROIObstacleTrainer(Trainer):
             f"target_flips={self.target_flips}, "
             f"pct_low_light={self.pct_low_light}, "
             f"pct_noise={self.pct_noise}, "
-            f"early_stop_threshold={self.early_stop_threshold}"
+            f"early_stop_threshold={self.early_stop_threshold}, "
+            f"batch_size={self.batch_size}, "
+            f"num_workers={self.num_workers}, "
+            f"use_cache={self.use_cache}, "
+            f"augment_on_device={self.augment_on_device}, "
+            f"performance={self.performance}, "
+            f"accumulate_steps={self.accumulate_steps}"
         )
 
     def _get_roi_transform(self):
@@ -83,6 +112,26 @@ class ROIObstacleTrainer(Trainer):
         """
         Create dataset with ROI preprocessing integrated into transform pipeline
         """
+        if self.augment_on_device:
+            return self._get_uint8_dataset()
+        if self.use_cache:
+            return self._get_cached_dataset(
+                transforms.Compose(
+                    [
+                        RandomLowLightTransform(
+                            min_factor=0.3, max_factor=0.5, p=self.pct_low_light
+                        ),
+                        transforms.ColorJitter(0.1, 0.1, 0.1, 0.1),
+                        transforms.ConvertImageDtype(torch.float32),
+                        transforms.RandomApply(
+                            [AddGaussianNoise(0.0, 0.05, 0.08)], p=self.pct_noise
+                        ),
+                        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+                    ]
+                ),
+                random_flip=self.random_flip,
+            )
+
         # Start with ROI transform if enabled
         transform_list = []
 
@@ -117,6 +166,48 @@ class ROIObstacleTrainer(Trainer):
             random_flip=self.random_flip,
         )
 
+    def _get_cached_dataset(self, transform=None, random_flip=False):
+        """
+        ROI crop + resize come from the preprocessing cache; ``transform``
+        runs per sample on the uint8 (3, 224, 224) tensors.
+        """
+        cache = RoiImageCache(
+            settings.TRAINING.cache_path,
+            settings.model_images,
+            roi_transform=self._get_roi_transform(),
+            size=(224, 224),
+        )
+        return CachedRoiImageFolder(
+            settings.model_images,
+            cache,
+            transform,
+            target_flips=self.target_flips,
+            random_flip=random_flip,
+            num_workers=self.num_workers,
+        )
+
+    def _get_uint8_dataset(self):
+        """
+        ROI-cropped 224x224 uint8 tensors with no augmentation; flips and
+        colour/noise augmentation happen per batch in BatchAugment.
+        """
+        if self.use_cache:
+            return self._get_cached_dataset()
+        transform_list = []
+        roi_transform = self._get_roi_transform()
+        if roi_transform is not None:
+            transform_list.append(roi_transform)
+        transform_list.extend([transforms.Resize((224, 224)), transforms.PILToTensor()])
+        return CustomImageFolder(settings.model_images, transforms.Compose(transform_list))
+
+    def _get_augment(self):
+        return BatchAugment(
+            p_low_light=self.pct_low_light,
+            p_noise=self.pct_noise,
+            p_flip=0.5 if self.random_flip else 0.0,
+            target_flips=self.target_flips,
+        )
+
     def _get_model(self):
         """
         Create and configure the model based on model_type
@@ -149,6 +240,85 @@ class ROIObstacleTrainer(Trainer):
         logger.info(f"Created model: {settings.model_type}")
         return model
 
+    def _prepare_model(self, model, device):
+        """
+        Returns the module to run forward passes through: in performance mode
+        a channels_last, torch.compile'd wrapper (falling back to eager if
+        compile isn't available). ``model`` itself keeps the state_dict to save.
+        """
+        if not self.performance:
+            return model
+        model = model.to(memory_format=torch.channels_last)
+        if not hasattr(torch, "compile"):
+            return model
+        try:
+            compiled = torch.compile(model)
+            # compilation is lazy; fail over to eager here rather than mid-epoch
+            model.eval()
+            with torch.no_grad():
+                compiled(torch.zeros(1, 3, 224, 224, device=device).contiguous(memory_format=torch.channels_last))
+            return compiled
+        except Exception as ex:
+            logger.warning(f"torch.compile unavailable, running eager: {ex}")
+            return model
+
+    def _train_epoch(self, model, loader, optimizer, scaler, augment, device, use_amp):
+        """One pass over ``loader``; returns (mean loss, images/sec). Syncs once, at the end."""
+        model.train()
+        if augment is not None:
+            augment.train()
+        memory_format = torch.channels_last if self.performance else torch.contiguous_format
+        loss_sum = torch.zeros((), device=device)
+        seen = 0
+        start = time.perf_counter()
+
+        optimizer.zero_grad(set_to_none=True)
+        for batch_idx, (images, labels) in enumerate(loader):
+            images = images.to(device, non_blocking=True)
+            labels = labels.to(device, non_blocking=True)
+            if augment is not None:
+                images, labels, _ = augment(images, labels)
+            images = images.contiguous(memory_format=memory_format)
+
+            with torch.autocast(device_type=device.type, dtype=torch.float16, enabled=use_amp):
+                outputs = model(images)
+                loss = F.cross_entropy(outputs, labels)
+            scaler.scale(loss / self.accumulate_steps).backward()
+
+            if (batch_idx + 1) % self.accumulate_steps == 0 or batch_idx + 1 == len(loader):
+                scaler.step(optimizer)
+                scaler.update()
+                optimizer.zero_grad(set_to_none=True)
+
+            loss_sum += loss.detach()
+            seen += labels.size(0)
+
+        avg_loss = loss_sum.item() / max(1, len(loader))
+        return avg_loss, seen / (time.perf_counter() - start)
+
+    def _evaluate(self, model, loader, augment, device, use_amp):
+        """Test accuracy, counted on the device."""
+        model.eval()
+        if augment is not None:
+            augment.eval()
+        memory_format = torch.channels_last if self.performance else torch.contiguous_format
+        correct = torch.zeros((), dtype=torch.long, device=device)
+        total = 0
+
+        with torch.no_grad():
+            for images, labels in loader:
+                images = images.to(device, non_blocking=True)
+                labels = labels.to(device, non_blocking=True)
+                if augment is not None:
+                    images, labels, _ = augment(images, labels)
+                images = images.contiguous(memory_format=memory_format)
+                with torch.autocast(device_type=device.type, dtype=torch.float16, enabled=use_amp):
+                    outputs = model(images)
+                correct += (outputs.argmax(1) == labels).sum()
+                total += labels.size(0)
+
+        return correct.item() / max(1, total)
+
     def train(self):
         """
         Training loop with ROI-enhanced dataset
@@ -161,16 +331,20 @@ class ROIObstacleTrainer(Trainer):
 
         train_loader = torch.utils.data.DataLoader(
             train_dataset,
-            batch_size=8,
+            batch_size=self.batch_size,
             shuffle=True,
-            num_workers=0,
+            num_workers=self.num_workers,
+            pin_memory=torch.cuda.is_available(),
+            persistent_workers=self.num_workers > 0,
         )
 
         test_loader = torch.utils.data.DataLoader(
             test_dataset,
-            batch_size=8,
-            shuffle=True,
-            num_workers=0,
+            batch_size=self.batch_size,
+            shuffle=False,
+            num_workers=self.num_workers,
+            pin_memory=torch.cuda.is_available(),
+            persistent_workers=self.num_workers > 0,
         )
 
         model_exists = os.path.isfile(self.model_file)
@@ -182,10 +356,17 @@ class ROIObstacleTrainer(Trainer):
             model.load_state_dict(torch.load(self.model_file, weights_only=False))
             logger.info(f"Loaded existing model from {self.model_file}")
 
-        device = torch.device("cuda" if torch.backends.cuda.is_built() else "cpu")
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         model = model.to(device)
         logger.info(f"Using device: {device}")
 
+        augment = self._get_augment().to(device) if self.augment_on_device else None
+
+        # fp16 autocast + GradScaler on CUDA only; elsewhere the scaler is a passthrough
+        use_amp = self.performance and device.type == "cuda"
+        scaler = torch.amp.GradScaler(device.type, enabled=use_amp)
+        forward_model = self._prepare_model(model, device)
+
         best_accuracy = 0.0
         optimizer = optim.SGD(
             model.parameters(), lr=self.lr, momentum=self.momentum, weight_decay=1e-4
@@ -194,47 +375,19 @@ class ROIObstacleTrainer(Trainer):
         logger.info(f"Starting training for {self.epochs} epochs...")
 
         for epoch in range(self.epochs):
-            # Training phase
-            model.train()
-            running_loss = 0.0
-
-            for batch_idx, (images, labels) in enumerate(train_loader):
-                images = images.to(device)
-                labels = labels.to(device)
-
-                optimizer.zero_grad()
-                outputs = model(images)
-                loss = F.cross_entropy(outputs, labels)
-                loss.backward()
-                optimizer.step()
-
-                running_loss += loss.item()
-
-            # Evaluation phase
-            model.eval()
-            correct_predictions = 0
-            total_predictions = 0
-
-            with torch.no_grad():
-                for images, labels in test_loader:
-                    images = images.to(device)
-                    labels = labels.to(device)
-                    outputs = model(images)
-
-                    # Get predicted classes
-                    predicted = outputs.argmax(1)
-
-                    # Count correct predictions
-                    correct_predictions += (predicted == labels).sum().item()
-                    total_predictions += labels.size(0)
-
-            test_accuracy = correct_predictions / total_predictions
-            avg_loss = running_loss / len(train_loader)
+            avg_loss, images_per_sec = self._train_epoch(
+                forward_model, train_loader, optimizer, scaler, augment, device, use_amp
+            )
+            test_accuracy = self._evaluate(forward_model, test_loader, augment, device, use_amp)
 
             logger.info(
-                f"Epoch {epoch}: Accuracy={test_accuracy:.4f}, Loss={avg_loss:.4f}"
+                f"Epoch {epoch}: Accuracy={test_accuracy:.4f}, Loss={avg_loss:.4f}, "
+                f"Train={images_per_sec:.1f} img/s"
+            )
+            print(
+                f"Epoch {epoch}: Accuracy={test_accuracy:.4f}, Loss={avg_loss:.4f}, "
+                f"Train={images_per_sec:.1f} img/s"
             )
-            print(f"Epoch {epoch}: Accuracy={test_accuracy:.4f}, Loss={avg_loss:.4f}")
 
             # Save best model
             if test_accuracy >= best_accuracy:
@@ -249,6 +402,118 @@ class ROIObstacleTrainer(Trainer):
                 break
 
         logger.info(f"Training completed! Best accuracy: {best_accuracy:.4f}")
+        TrainingManifest.for_checkpoint(self.model_file).record(
+            self._sample_keys(dataset), "full", best_accuracy, replace=True
+        )
+        return best_accuracy
+
+    @staticmethod
+    def _sample_keys(dataset) -> dict[str, int]:
+        return {file_key(path): label for path, label in dataset.samples}
+
+    def _extract_features(self, trunk, dataset, indices, augment, device):
+        """Trunk outputs (fp16, CPU) for ``dataset[indices]``, unaugmented."""
+        loader = torch.utils.data.DataLoader(
+            torch.utils.data.Subset(dataset, indices),
+            batch_size=self.batch_size,
+            num_workers=self.num_workers,
+            pin_memory=torch.cuda.is_available(),
+        )
+        trunk.eval()
+        augment.eval()
+        features = []
+        with torch.no_grad():
+            for images, _ in loader:
+                images, _, _ = augment(images.to(device, non_blocking=True))
+                features.append(trunk(images).half().cpu())
+        return torch.cat(features).numpy()
+
+    def train_incremental(self, replay_ratio: float = 4.0, epochs: int | None = None):
+        """
+        Fine-tune the checkpoint's last block and head on samples its manifest
+        hasn't seen, mixed with ``replay_ratio`` times as many replayed old
+        samples. Trunk features come from a FeatureCache, so only samples new
+        to the cache go through the frozen layers. Falls back to a full
+        ``train()`` when there is no checkpoint or manifest.
+        """
+        manifest = TrainingManifest.for_checkpoint(self.model_file)
+        if not os.path.isfile(self.model_file) or not manifest.load():
+            logger.info("No checkpoint manifest, running full training")
+            return self.train()
+
+        dataset = self._get_uint8_dataset()
+        keys = [file_key(path) for path, _ in dataset.samples]
+        new = [i for i, key in enumerate(keys) if key not in manifest.samples]
+        if not new:
+            logger.info("No new samples since the last checkpoint")
+            return None
+        old = [i for i, key in enumerate(keys) if key in manifest.samples]
+        replay = random.sample(old, min(len(old), int(len(new) * replay_ratio)))
+        logger.info(f"Incremental training: {len(new)} new samples, {len(replay)} replayed")
+
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model = self._get_model()
+        model.load_state_dict(torch.load(self.model_file, weights_only=False))
+        model = model.to(device)
+        trunk, tail = split_model(model)
+        for p in trunk.parameters():
+            p.requires_grad_(False)
+        augment = self._get_augment().to(device)
+
+        # feature shape from one sample; the cache is tied to these trunk weights
+        pool = new + replay
+        probe = self._extract_features(trunk, dataset, pool[:1], augment, device)
+        roi = self._get_roi_transform()
+        cache = FeatureCache(
+            settings.TRAINING.cache_path,
+            module_hash(trunk),
+            repr((settings.model_images, vars(roi) if roi is not None else None)),
+            probe.shape[1:],
+        )
+        missing = [i for i in pool if keys[i] not in cache.index]
+        if missing:
+            logger.info(f"Computing trunk features for {len(missing)} samples")
+            cache.add([keys[i] for i in missing], self._extract_features(trunk, dataset, missing, augment, device))
+
+        features = torch.from_numpy(cache.get([keys[i] for i in pool])).to(device)
+        labels = torch.tensor([dataset.samples[i][1] for i in pool], device=device)
+        order = torch.randperm(len(pool), device=device)
+        test_size = int(len(pool) * self.test_pct / 100.0)
+        test_idx, train_idx = order[:test_size], order[test_size:]
+
+        optimizer = optim.SGD(
+            [p for p in tail.parameters() if p.requires_grad],
+            lr=self.lr, momentum=self.momentum, weight_decay=1e-4,
+        )
+        best_accuracy = 0.0
+        for epoch in range(epochs or self.epochs):
+            tail.train()
+            loss_sum = torch.zeros((), device=device)
+            shuffled = train_idx[torch.randperm(len(train_idx), device=device)]
+            for batch in shuffled.split(self.batch_size):
+                optimizer.zero_grad(set_to_none=True)
+                loss = F.cross_entropy(tail(features[batch].float()), labels[batch])
+                loss.backward()
+                optimizer.step()
+                loss_sum += loss.detach()
+
+            tail.eval()
+            with torch.no_grad():
+                eval_idx = test_idx if len(test_idx) else train_idx
+                predicted = torch.cat([tail(features[b].float()).argmax(1) for b in eval_idx.split(self.batch_size)])
+                accuracy = (predicted == labels[eval_idx]).float().mean().item()
+            avg_loss = loss_sum.item() / max(1, len(shuffled.split(self.batch_size)))
+            logger.info(f"Incremental epoch {epoch}: Accuracy={accuracy:.4f}, Loss={avg_loss:.4f}")
+            print(f"Incremental epoch {epoch}: Accuracy={accuracy:.4f}, Loss={avg_loss:.4f}")
+
+            if accuracy >= best_accuracy:
+                torch.save(model.state_dict(), self.model_file)
+                best_accuracy = accuracy
+            if best_accuracy >= self.early_stop_threshold:
+                break
+
+        manifest.record({keys[i]: dataset.samples[i][1] for i in new}, "incremental", best_accuracy)
+        logger.info(f"Incremental training completed! Best accuracy: {best_accuracy:.4f}")
         return best_accuracy
 
     def visualize_roi_samples(self, num_samples=5, save_path=None):
@@ -280,6 +545,8 @@ class ROIObstacleTrainer(Trainer):
 
                 # Apply full transform pipeline
                 transformed_tensor = dataset[i][0]
+                if self.augment_on_device:
+                    transformed_tensor = self._get_augment()(transformed_tensor[None])[0][0]
 
                 # Convert tensor back to displayable image
                 # Denormalize
@@ -1,3 +1,4 @@
+import math
 import random
 import torchvision.transforms.functional as F
 import torch
@@ -25,4 +26,140 @@ class AddGaussianNoise:
         noise = torch.randn(tensor.size()) * std + self.mean
         tensor = tensor + noise
         tensor = torch.clamp(tensor, 0., 1.)
-        return tensor
\ No newline at end of file
+        return tensor
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# RGB <-> YIQ, for rotating hue as a matrix multiply
+_RGB_TO_YIQ = torch.tensor([
+    [0.299, 0.587, 0.114],
+    [0.596, -0.274, -0.322],
+    [0.211, -0.523, 0.312],
+])
+_YIQ_TO_RGB = torch.linalg.inv(_RGB_TO_YIQ)
+
+
+class BatchAugment(torch.nn.Module):
+    """
+    Batch-level counterpart of RandomLowLightTransform + ColorJitter +
+    AddGaussianNoise + random flip + Normalize, run on the training device
+    as vectorized tensor ops with per-sample random parameters.
+
+    Takes a uint8 (B, 3, H, W) RGB batch straight from the DataLoader:
+
+        augment = BatchAugment(p_flip=0.5, target_flips=[0, 2, 1]).to(device)
+        images, labels, flipped = augment(images, labels)
+
+    In eval mode (``augment.eval()``) it only converts and normalizes.
+    ``flipped`` is the per-sample flip mask, for callers whose labels need
+    more than a class remap; ``targets`` are remapped through
+    ``target_flips`` when given.
+
+    Hue is rotated in YIQ space rather than HSV; for the 0.1 jitter used
+    here the two agree closely and the rotation is a single matmul.
+    """
+
+    def __init__(
+        self,
+        p_low_light: float = 0.2,
+        low_light: tuple[float, float] = (0.3, 0.5),
+        brightness: float = 0.1,
+        contrast: float = 0.1,
+        saturation: float = 0.1,
+        hue: float = 0.1,
+        p_noise: float = 0.2,
+        noise_std: tuple[float, float] = (0.05, 0.08),
+        p_flip: float = 0.0,
+        target_flips=None,
+        mean=IMAGENET_MEAN,
+        std=IMAGENET_STD,
+    ):
+        super().__init__()
+        self.p_low_light = p_low_light
+        self.low_light = low_light
+        self.brightness = brightness
+        self.contrast = contrast
+        self.saturation = saturation
+        self.hue = hue
+        self.p_noise = p_noise
+        self.noise_std = noise_std
+        self.p_flip = p_flip
+        self.register_buffer("mean", torch.tensor(mean).view(1, 3, 1, 1))
+        self.register_buffer("std", torch.tensor(std).view(1, 3, 1, 1))
+        self.register_buffer("rgb_to_yiq", _RGB_TO_YIQ.clone())
+        self.register_buffer("yiq_to_rgb", _YIQ_TO_RGB.clone())
+        self.register_buffer(
+            "target_flips",
+            torch.tensor(target_flips, dtype=torch.long) if target_flips is not None else None,
+        )
+
+    def _uniform(self, n, low, high, device):
+        return torch.empty(n, 1, 1, 1, device=device).uniform_(low, high)
+
+    def _chance(self, n, p, device):
+        return torch.rand(n, 1, 1, 1, device=device) < p
+
+    @staticmethod
+    def _gray(x):
+        return (0.299 * x[:, 0:1] + 0.587 * x[:, 1:2] + 0.114 * x[:, 2:3])
+
+    def _augment(self, x):
+        n, device = x.shape[0], x.device
+
+        factor = self._uniform(n, 1 - self.brightness, 1 + self.brightness, device)
+        dark = self._uniform(n, *self.low_light, device)
+        factor = torch.where(self._chance(n, self.p_low_light, device), factor * dark, factor)
+        x = (x * factor).clamp_(0, 1)
+
+        if self.contrast:
+            c = self._uniform(n, 1 - self.contrast, 1 + self.contrast, device)
+            mean = self._gray(x).mean(dim=(2, 3), keepdim=True)
+            x = (mean + c * (x - mean)).clamp_(0, 1)
+
+        if self.saturation:
+            s = self._uniform(n, 1 - self.saturation, 1 + self.saturation, device)
+            gray = self._gray(x)
+            x = (gray + s * (x - gray)).clamp_(0, 1)
+
+        if self.hue:
+            theta = torch.empty(n, device=device).uniform_(-self.hue, self.hue) * 2 * math.pi
+            cos, sin = torch.cos(theta), torch.sin(theta)
+            rotation = torch.zeros(n, 3, 3, device=device)
+            rotation[:, 0, 0] = 1
+            rotation[:, 1, 1], rotation[:, 1, 2] = cos, -sin
+            rotation[:, 2, 1], rotation[:, 2, 2] = sin, cos
+            m = self.yiq_to_rgb @ rotation @ self.rgb_to_yiq  # (n, 3, 3)
+            x = torch.einsum("nij,njhw->nihw", m, x).clamp_(0, 1)
+
+        if self.p_noise:
+            std = self._uniform(n, *self.noise_std, device)
+            noisy = self._chance(n, self.p_noise, device)
+            x = torch.where(noisy, (x + torch.randn_like(x) * std).clamp_(0, 1), x)
+
+        return x
+
+    def forward(self, images, targets=None):
+        x = images.float().div_(255) if images.dtype == torch.uint8 else images.float()
+        flipped = torch.zeros(x.shape[0], dtype=torch.bool, device=x.device)
+        if self.training:
+            x = self._augment(x)
+            if self.p_flip:
+                flipped = torch.rand(x.shape[0], device=x.device) < self.p_flip
+                x = torch.where(flipped.view(-1, 1, 1, 1), x.flip(-1), x)
+                if targets is not None and self.target_flips is not None:
+                    targets = torch.where(flipped, self.target_flips[targets], targets)
+        x = (x - self.mean) / self.std
+        return x, targets, flipped
+
+
+class ResizeToUint8Tensor:
+    """(H, W, 3) uint8 ndarray -> (3, size, size) uint8 tensor, for batches BatchAugment finishes."""
+
+    def __init__(self, size: int = 224):
+        self.size = size
+
+    def __call__(self, image):
+        import cv2  # only the mecanum trainer feeds ndarrays; keep cv2 off the PIL paths
+        image = cv2.resize(image, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        return torch.from_numpy(image).permute(2, 0, 1).contiguous()
@@ -0,0 +1,270 @@
+"""
+Named capture branches: the camera frame at each consumer's own size.
+
+The display frame (960x540 BGR, ``frame_ring``) was the only one the camera
+produced, so the classifier cropped and resized it to 224x224 and YOLO
+resized it to 640 on every inference. A ``BranchSpec`` describes one
+consumer's input -- size, colour order and ROI crop -- and every registered
+branch gets its own ``FrameRing`` in ``capture_branches``.
+
+On the Jetson the branches come off a ``tee`` in the capture pipeline
+(``build_tee_pipeline`` / ``GstBranchCapture``), so ``nvvidconv`` crops and
+scales them in hardware. Without nvargus (or the GStreamer Python bindings),
+``SoftwareBranches`` derives the same branches from the display frame with
+cv2. Either way a branch frame carries the display frame's seq, so
+consumers lease it with the seq announced on ``Topics.raw_image``:
+
+    entry = capture_branches.get("detector")
+    lease = entry.ring.lease(seq) if entry is not None else None
+
+``SharedFrame`` does this for the models run by the InferenceServer.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from felix.settings import settings
+from felix.vision.frame_ring import FrameRing, frame_ring
+from felix.vision.preprocess import roi_bounds
+
+# The GStreamer Python bindings are only present on the Jetson image. Import
+# defensively so the software branches work everywhere else.
+try:
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+except Exception as ex:  # noqa: BLE001
+    Gst = None
+    _IMPORT_ERROR = ex
+else:
+    _IMPORT_ERROR = None
+
+DISPLAY = "display"
+FORMATS = ("BGR", "RGB")
+
+
+@dataclass(frozen=True)
+class BranchSpec:
+    name: str
+    width: int
+    height: int
+    format: str = "BGR"
+    # (roi_height_ratio, roi_vertical_offset, roi_width_ratio), as RoiPreprocessor
+    roi: tuple[float, float, float] | None = None
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"branch {self.name!r}: format must be one of {FORMATS}, not {self.format!r}")
+        if self.roi is not None:
+            object.__setattr__(self, "roi", tuple(self.roi))
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (self.height, self.width, 3)
+
+    def bounds(self, height: int, width: int) -> tuple[int, int, int, int]:
+        """(top, bottom, left, right) of the crop in a ``height`` x ``width`` frame."""
+        if self.roi is None:
+            return 0, height, 0, width
+        return roi_bounds(height, width, *self.roi)
+
+    def serves(self, pre) -> bool:
+        """True if this branch is exactly ``pre.resize()`` of the display frame."""
+        return (
+            self.format == "BGR"
+            and self.width == self.height == pre.size
+            and self.roi == pre.roi
+            and pre.interpolation == cv2.INTER_LINEAR
+        )
+
+
+def default_branches() -> list[BranchSpec]:
+    """``camera.branches`` from the config, else one per camera model."""
+    if settings.CAMERA_BRANCHES is not None:
+        return [BranchSpec(**branch) for branch in settings.CAMERA_BRANCHES]
+    return [
+        # AutoDriver's RoiPreprocessor input.
+        BranchSpec(
+            "autodrive", 224, 224,
+            roi=(
+                (settings.model_roi_height_ratio, settings.model_roi_vertical_offset, 1.0)
+                if settings.model_use_roi else None
+            ),
+        ),
+        # YOLO letterboxes to 640: at 640x360 it only pads.
+        BranchSpec("detector", 640, 360),
+    ]
+
+
+class Branch(NamedTuple):
+    spec: BranchSpec
+    ring: FrameRing
+
+
+class CaptureBranches:
+    """Registry of the running capture's branches (the display branch is ``frame_ring``)."""
+
+    def __init__(self):
+        self._branches: dict[str, Branch] = {}
+
+    def register(self, spec: BranchSpec, ring: FrameRing | None = None) -> FrameRing:
+        ring = ring or FrameRing(slots=4)
+        self._branches[spec.name] = Branch(spec, ring)
+        return ring
+
+    def get(self, name: str) -> Branch | None:
+        return self._branches.get(name)
+
+    def serving(self, pre) -> Branch | None:
+        """The branch that already holds ``pre.resize()`` of each frame, if any."""
+        return next((b for b in self._branches.values() if b.spec.serves(pre)), None)
+
+    def clear(self):
+        self._branches.clear()
+
+    def __iter__(self):
+        return iter(self._branches.values())
+
+
+capture_branches = CaptureBranches()
+
+
+class SoftwareBranches:
+    """Derives the branches from the display frame with cv2 (no hardware tee)."""
+
+    def __init__(self, branches: list[Branch]):
+        self.branches = branches
+
+    def write(self, image: np.ndarray, seq: int, ts: float):
+        h, w = image.shape[:2]
+        for spec, ring in self.branches:
+            claimed = ring.claim(spec.shape)
+            if claimed is None:
+                continue
+            index, slot = claimed
+            top, bottom, left, right = spec.bounds(h, w)
+            cv2.resize(image[top:bottom, left:right], (spec.width, spec.height),
+                       dst=slot, interpolation=cv2.INTER_LINEAR)
+            if spec.format == "RGB":
+                cv2.cvtColor(slot, cv2.COLOR_BGR2RGB, dst=slot)
+            ring.commit(index, ts=ts, seq=seq)
+
+
+def hardware_available() -> bool:
+    """True if the tee pipeline can run: GStreamer bindings and nvarguscamerasrc."""
+    if Gst is None:
+        return False
+    Gst.init(None)
+    return Gst.ElementFactory.find("nvarguscamerasrc") is not None
+
+
+def build_tee_pipeline(sensor_id: int, in_w: int, in_h: int, fps: int, branches: list[BranchSpec]) -> str:
+    """
+    nvargus CSI -> flip -> tee, with one nvvidconv crop/scale -> appsink per
+    branch (named after it).
+
+    The 180deg flip happens once, before the tee, so every branch is upright;
+    ROI crops are in sensor pixels. Leaky single-buffer queues keep a slow
+    branch from stalling the others.
+    """
+    pipeline = [
+        f"nvarguscamerasrc sensor-id={sensor_id} ! "
+        f"video/x-raw(memory:NVMM), width={in_w}, height={in_h}, format=NV12, framerate={fps}/1 ! "
+        "nvvidconv flip-method=2 ! video/x-raw(memory:NVMM), format=NV12 ! tee name=t"
+    ]
+    for spec in branches:
+        top, bottom, left, right = spec.bounds(in_h, in_w)
+        crop = (
+            "" if spec.roi is None else
+            f" left={left} right={right} top={top} bottom={bottom}"
+        )
+        # nvvidconv only emits 4-channel RGB; videoconvert drops the pad byte.
+        hw_format = "BGRx" if spec.format == "BGR" else "RGBA"
+        pipeline.append(
+            f"t. ! queue leaky=downstream max-size-buffers=1 ! "
+            f"nvvidconv interpolation-method=1{crop} ! "
+            f"video/x-raw, width={spec.width}, height={spec.height}, format={hw_format} ! "
+            f"videoconvert ! video/x-raw, format={spec.format} ! "
+            f"appsink name={spec.name} drop=1 max-buffers=1 emit-signals=1 sync=0"
+        )
+    return " ".join(pipeline)
+
+
+class _PtsSequencer:
+    """Gives the tee's copies of one camera buffer (same PTS) the same seq."""
+
+    def __init__(self, keep: int = 32):
+        self._lock = threading.Lock()
+        self._seqs: OrderedDict[int, int] = OrderedDict()
+        self._next = 0
+        self._keep = keep
+
+    def __call__(self, pts: int) -> int:
+        with self._lock:
+            seq = self._seqs.get(pts)
+            if seq is None:
+                seq = self._seqs[pts] = self._next
+                self._next += 1
+                if len(self._seqs) > self._keep:
+                    self._seqs.popitem(last=False)
+            return seq
+
+
+class GstBranchCapture:
+    """
+    Runs a ``build_tee_pipeline`` pipeline, copying each appsink's buffers
+    into its branch ring on GStreamer's streaming threads. ``on_display(seq)``
+    is called once a display frame is published.
+    """
+
+    def __init__(self, pipeline: str, branches: list[Branch], on_display):
+        if Gst is None:
+            raise RuntimeError(f"GStreamer bindings not importable: {_IMPORT_ERROR}")
+        Gst.init(None)
+        self._pipeline = Gst.parse_launch(pipeline)
+        self._sequence = _PtsSequencer()
+        self._on_display = on_display
+        for branch in branches:
+            sink = self._pipeline.get_by_name(branch.spec.name)
+            sink.connect("new-sample", self._on_sample, branch)
+
+    def _on_sample(self, sink, branch: Branch):
+        spec, ring = branch
+        buffer = sink.emit("pull-sample").get_buffer()
+        seq = self._sequence(buffer.pts)
+        claimed = ring.claim(spec.shape)
+        if claimed is None:
+            return Gst.FlowReturn.OK
+        index, slot = claimed
+        ok, info = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            ring.abort(index)
+            return Gst.FlowReturn.OK
+        try:
+            data = np.frombuffer(info.data, dtype=np.uint8)
+            # Rows may be padded to the buffer's stride.
+            rows = data.reshape(spec.height, -1)[:, : spec.width * 3]
+            np.copyto(slot, rows.reshape(spec.shape))
+        finally:
+            buffer.unmap(info)
+        ring.commit(index, seq=seq)
+        if spec.name == DISPLAY:
+            self._on_display(seq)
+        return Gst.FlowReturn.OK
+
+    def start(self):
+        if self._pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+            raise RuntimeError("Could not start the GStreamer branch pipeline (camera held by another process?)")
+
+    def stop(self):
+        self._pipeline.set_state(Gst.State.NULL)
+
+
+def display_branch(width: int, height: int, ring: FrameRing | None = None) -> Branch:
+    return Branch(BranchSpec(DISPLAY, width, height), ring or frame_ring)
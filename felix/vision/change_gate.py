@@ -0,0 +1,69 @@
+"""
+Cheap scene-change gate for skipping redundant classifier passes.
+
+A stationary robot looking at an unchanged scene gets the same softmax from
+every forward pass. The gate reduces the (already cropped and resized) model
+ROI to a small grayscale thumbnail and compares it with the thumbnail of the
+frame the cached prediction was computed from. While the robot is idle and the
+mean absolute difference stays under ``threshold`` (gray levels, 0-255) the
+caller may reuse that prediction.
+
+The reference only moves on a miss, so slow drift (lighting, someone walking
+in) accumulates against the last inferred frame instead of slipping through
+one small step at a time.
+"""
+
+import cv2
+import numpy as np
+
+
+class ChangeGate:
+    def __init__(self, threshold: float = 2.0, size: int = 16):
+        """
+        Args:
+            threshold: max mean absolute gray-level difference still considered unchanged
+            size: side of the square thumbnail the frames are compared at
+        """
+        self.threshold = threshold
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._gray = None
+        self._thumb = np.empty((size, size), dtype=np.uint8)
+        self._ref = np.empty((size, size), dtype=np.uint8)
+        self._has_ref = False
+
+    def _thumbnail(self, bgr):
+        if self._gray is None or self._gray.shape != bgr.shape[:2]:
+            self._gray = np.empty(bgr.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.resize(self._gray, (self.size, self.size), dst=self._thumb, interpolation=cv2.INTER_AREA)
+        return self._thumb
+
+    def reuse(self, roi_bgr, idle: bool) -> bool:
+        """
+        True if the previous result may be reused for ``roi_bgr`` (counted as a
+        hit). Otherwise the frame becomes the new reference (a miss) and the
+        caller must run the model.
+        """
+        thumb = self._thumbnail(roi_bgr)
+        if idle and self._has_ref and float(cv2.absdiff(thumb, self._ref).mean()) <= self.threshold:
+            self.hits += 1
+            return True
+        self._ref[:] = thumb
+        self._has_ref = True
+        self.misses += 1
+        return False
+
+    def reset(self):
+        """Forget the reference; the next frame is always a miss."""
+        self._has_ref = False
+
+    @property
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
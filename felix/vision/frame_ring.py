@@ -0,0 +1,189 @@
+"""
+Preallocated, fixed-slot ring of camera frames shared by every consumer.
+
+The capture thread writes each frame into a slot exactly once (OpenCV decodes
+straight into the slot's buffer) and publishes it with a monotonically
+increasing sequence number. Consumers never copy: they take a *lease* on a
+published slot, read the read-only view, and release it. A leased slot is
+never handed back to the writer, so a reader can hold a frame across an
+inference call without it being overwritten underneath it.
+
+    lease = frame_ring.lease()          # latest frame, or None if none yet
+    if lease is not None:
+        with lease:
+            model(lease.image)          # zero-copy view of the slot
+
+With ``slots`` buffers the writer always has a free slot as long as fewer than
+``slots - 1`` leases are outstanding; otherwise the frame is dropped (counted
+in ``dropped``) rather than blocking the camera.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class FrameLease:
+    """Reference-counted read lease on one published slot."""
+
+    def __init__(self, ring: "FrameRing", index: int, seq: int, ts: float, image, generation: int = 0):
+        self._ring = ring
+        self._index = index
+        self._generation = generation
+        self.seq = seq
+        self.ts = ts
+        self.image = image
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._ring._release(self._index, self._generation)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def __del__(self):
+        # A forgotten lease must not pin its slot forever.
+        self.release()
+
+    def __repr__(self):
+        return f"FrameLease(seq={self.seq}, slot={self._index}, ts={self.ts:.3f})"
+
+
+class FrameRing:
+    def __init__(self, slots: int = 8):
+        if slots < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self.slots = slots
+        # Re-entrant: FrameLease.__del__ may release from inside a locked section.
+        self._lock = threading.RLock()
+        self._buffers: list[np.ndarray] = []
+        self._views: list[np.ndarray] = []
+        self._seqs = [-1] * slots
+        self._ts = [0.0] * slots
+        self._refs = [0] * slots
+        # Bumped on every reallocation: a lease from an older generation holds
+        # an old buffer, so its release must not touch the new slots' refs.
+        self._generation = 0
+        self._latest = -1
+        self._next = 0
+        self._seq = -1
+        self.dropped = 0
+
+    # ---- writer side ----------------------------------------------------
+
+    def allocate(self, shape, dtype=np.uint8):
+        """(Re)allocate every slot. Outstanding leases keep their old buffers alive."""
+        with self._lock:
+            self._allocate(tuple(shape), np.dtype(dtype))
+
+    def _allocate(self, shape, dtype):
+        self._buffers = [np.empty(shape, dtype=dtype) for _ in range(self.slots)]
+        self._views = []
+        for buf in self._buffers:
+            view = buf.view()
+            view.flags.writeable = False
+            self._views.append(view)
+        self._seqs = [-1] * self.slots
+        self._refs = [0] * self.slots
+        self._generation += 1
+        self._latest = -1
+        self._next = 0
+
+    def claim(self, shape, dtype=np.uint8):
+        """
+        Reserve a free slot for writing.
+
+        Returns ``(index, buffer)`` or ``None`` when every slot is leased, in
+        which case the caller should drop the frame.
+        """
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        with self._lock:
+            if not self._buffers or self._buffers[0].shape != shape or self._buffers[0].dtype != dtype:
+                self._allocate(shape, dtype)
+            for step in range(self.slots):
+                i = (self._next + step) % self.slots
+                if i == self._latest or self._refs[i] > 0 or self._seqs[i] == -2:
+                    continue
+                self._seqs[i] = -2  # being written: not leasable
+                self._next = (i + 1) % self.slots
+                return i, self._buffers[i]
+            self.dropped += 1
+            return None
+
+    def commit(self, index: int, ts: float | None = None, seq: int | None = None) -> int:
+        """
+        Publish a claimed slot and return its sequence number.
+
+        ``seq`` stamps the frame with another ring's number (capture branches
+        share the display frame's seq); a frame older than the latest is
+        leasable by seq but doesn't become the latest.
+        """
+        with self._lock:
+            if seq is None:
+                seq = self._seq + 1
+            self._seqs[index] = seq
+            self._ts[index] = time.monotonic() if ts is None else ts
+            if seq > self._seq:
+                self._seq = seq
+                self._latest = index
+            return seq
+
+    def abort(self, index: int):
+        """Give a claimed slot back without publishing it (e.g. a failed read)."""
+        with self._lock:
+            if self._seqs[index] == -2:
+                self._seqs[index] = -1
+
+    def write(self, frame, ts: float | None = None) -> int | None:
+        """Copy ``frame`` into a slot and publish it, for producers that don't own a buffer."""
+        claimed = self.claim(frame.shape, frame.dtype)
+        if claimed is None:
+            return None
+        index, buf = claimed
+        np.copyto(buf, frame)
+        return self.commit(index, ts)
+
+    # ---- reader side ----------------------------------------------------
+
+    @property
+    def latest_seq(self) -> int:
+        return self._seq
+
+    def lease(self, seq: int | None = None) -> FrameLease | None:
+        """
+        Lease the frame with sequence ``seq`` (default: the latest).
+
+        Returns ``None`` when nothing has been published yet or the requested
+        frame has already been overwritten.
+        """
+        with self._lock:
+            if seq is None:
+                index = self._latest
+            else:
+                index = next((i for i, s in enumerate(self._seqs) if s == seq), -1)
+            if index < 0 or self._seqs[index] < 0:
+                return None
+            self._refs[index] += 1
+            return FrameLease(
+                self, index, self._seqs[index], self._ts[index], self._views[index], self._generation,
+            )
+
+    def _release(self, index: int, generation: int):
+        with self._lock:
+            if generation == self._generation and self._refs[index] > 0:
+                self._refs[index] -= 1
+
+    @property
+    def leased(self) -> int:
+        return sum(self._refs)
+
+
+# Process-wide ring, the frame counterpart of the Topics singleton: the camera
+# writes into it and every node reads from it.
+frame_ring = FrameRing()
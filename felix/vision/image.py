@@ -1,12 +1,15 @@
 import cv2
 
+from felix.vision.jpeg import jpeg_encoder
+
 
 class ImageUtils:
 
     @staticmethod
-    def bgr8_to_jpeg(value, quality=75):
+    def bgr8_to_jpeg(value, quality=None):
+        # quality=None uses the configured jpeg.quality
         try:
-            return bytes(cv2.imencode('.jpg', value)[1])
+            return jpeg_encoder.encode(value, quality)
         except:  # noqa: E722
             return None
         
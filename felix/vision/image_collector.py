@@ -7,12 +7,14 @@ from felix.settings import settings
 from typing import Optional, Dict
 from glob import glob
 
+from felix.training.nav_shards import NavShardWriter
 from lib.interfaces import Twist
 
 
 class ImageCollector:
     def __init__(self):
         self.counts = {}
+        self._nav_writers: Dict[str, NavShardWriter] = {}
         self._make_folders()
         
 
@@ -123,17 +125,22 @@ class ImageCollector:
             self, 
             values: list[int],
             image, folder: str | None = None) -> bool | str:
-        
-        v = "_".join(str(val) for val in values)
-        name = f'nav_{v}_{self.filetime("jpg")}'
-        print(f"Saving navigation image with values: name={name}")
+        """
+        Append a navigation sample to the session's .navshard file (see
+        felix.training.nav_shards); returns ``<shard path>#<index>``.
+        """
         save_path = os.path.join(settings.TRAINING.navigation_path, folder) if folder else settings.TRAINING.navigation_path
-        os.makedirs(save_path, exist_ok=True)
-        return self.save_image(
-            image=image,
-            path=save_path,
-            filename=name
-        )
+        writer = self._nav_writers.get(save_path)
+        if writer is None:
+            writer = self._nav_writers[save_path] = NavShardWriter(save_path, folder or "nav")
+        print(f"Saving navigation sample with values: {values}")
+        return writer.append(values, image)
+
+    def close_navigation(self):
+        """Flush and finalize open navigation shards (end of a capture session)."""
+        for writer in self._nav_writers.values():
+            writer.close()
+        self._nav_writers.clear()
 
 
     def get_images(self, category):
@@ -0,0 +1,294 @@
+"""
+JPEG encoding for snapshots, tags, nav capture and the MJPEG stream.
+
+``jpeg_encoder`` (configured by the ``jpeg:`` section of config.yml) encodes
+BGR frames with one of:
+
+- ``opencv``:    cv2.imencode (always available)
+- ``turbojpeg``: libjpeg-turbo through PyTurboJPEG, typically ~2x faster
+- ``nvjpeg``:    the Jetson hardware encoder via a GStreamer
+                 ``appsrc ! nvvidconv ! nvjpegenc ! appsink`` pipeline
+
+``auto`` picks the first available of nvjpeg, turbojpeg, opencv. Like the
+inference backends, an optional backend that can't be imported or started is
+logged and replaced by OpenCV.
+
+Quality (1-100) and chroma subsampling (420 / 422 / 444) are honoured by
+every backend. ``encode`` runs on the calling thread; ``submit`` hands the
+frame to a bounded worker pool and returns a Future of the JPEG bytes. Pass
+a FrameLease to ``submit`` and the pool releases it once the frame is
+encoded, so callers don't copy the frame or wait for the encode:
+
+    future = jpeg_encoder.submit(frame_ring.lease())
+    future.add_done_callback(lambda f: save(f.result()))
+
+    python -m benchmarks.bench_jpeg
+"""
+
+import concurrent.futures
+import logging
+import threading
+from abc import ABC, abstractmethod
+from enum import Enum
+
+import cv2
+import numpy as np
+
+from felix.settings import settings
+from felix.vision.frame_ring import FrameLease
+
+# Optional encoders, only present on some installs.
+try:
+    import turbojpeg
+except Exception:  # noqa: BLE001
+    turbojpeg = None
+
+try:
+    import gi
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+except Exception:  # noqa: BLE001
+    Gst = None
+
+logger = logging.getLogger(__name__)
+
+
+class JpegBackendType(str, Enum):
+    auto = "auto"
+    opencv = "opencv"
+    turbojpeg = "turbojpeg"
+    nvjpeg = "nvjpeg"
+
+
+class Chroma(str, Enum):
+    c420 = "420"
+    c422 = "422"
+    c444 = "444"
+
+
+class JpegBackend(ABC):
+    name: str = ""
+
+    def __init__(self, quality: int = 75, chroma: Chroma = Chroma.c420):
+        self.quality = int(quality)
+        self.chroma = Chroma(str(getattr(chroma, "value", chroma)))
+
+    @abstractmethod
+    def encode(self, image: np.ndarray, quality: int | None = None) -> bytes:
+        """(H, W, 3) uint8 BGR -> JPEG bytes."""
+
+    def __repr__(self):
+        return f"{type(self).__name__}(quality={self.quality}, chroma={self.chroma.value})"
+
+
+class OpenCVJpegBackend(JpegBackend):
+    name = "opencv"
+
+    # IMWRITE_JPEG_SAMPLING_FACTOR arrived in OpenCV 4.5.5; older builds encode 4:2:0.
+    _SAMPLING = {
+        Chroma.c420: getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_420", None),
+        Chroma.c422: getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_422", None),
+        Chroma.c444: getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_444", None),
+    }
+
+    def _params(self, quality):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        sampling = self._SAMPLING[self.chroma]
+        if sampling is not None:
+            params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, sampling]
+        return params
+
+    def encode(self, image, quality=None):
+        ok, buf = cv2.imencode(".jpg", image, self._params(quality or self.quality))
+        if not ok:
+            raise RuntimeError("cv2.imencode failed")
+        return buf.tobytes()
+
+
+class TurboJpegBackend(JpegBackend):
+    name = "turbojpeg"
+
+    def __init__(self, quality=75, chroma=Chroma.c420):
+        super().__init__(quality, chroma)
+        if turbojpeg is None:
+            raise RuntimeError("PyTurboJPEG is not installed")
+        self._jpeg = turbojpeg.TurboJPEG()
+        self._subsample = {
+            Chroma.c420: turbojpeg.TJSAMP_420,
+            Chroma.c422: turbojpeg.TJSAMP_422,
+            Chroma.c444: turbojpeg.TJSAMP_444,
+        }[self.chroma]
+
+    def encode(self, image, quality=None):
+        return self._jpeg.encode(
+            image,
+            quality=int(quality or self.quality),
+            pixel_format=turbojpeg.TJPF_BGR,
+            jpeg_subsample=self._subsample,
+        )
+
+
+class NvJpegBackend(JpegBackend):
+    """
+    Jetson hardware JPEG encoder. nvjpegenc takes I420 only (4:2:0), so
+    ``chroma`` other than 420 is rejected. The pipeline is rebuilt when the
+    frame size or quality changes.
+    """
+
+    name = "nvjpeg"
+
+    def __init__(self, quality=75, chroma=Chroma.c420):
+        super().__init__(quality, chroma)
+        if Gst is None:
+            raise RuntimeError("GStreamer Python bindings (gi) are not installed")
+        Gst.init(None)
+        if Gst.ElementFactory.find("nvjpegenc") is None:
+            raise RuntimeError("GStreamer element nvjpegenc not found")
+        if self.chroma is not Chroma.c420:
+            raise RuntimeError(f"nvjpegenc only encodes 4:2:0, not {self.chroma.value}")
+        self._pipeline = None
+        self._key = None
+
+    def _build(self, width, height, quality):
+        if self._pipeline is not None:
+            self._pipeline.set_state(Gst.State.NULL)
+        self._pipeline = Gst.parse_launch(
+            f"appsrc name=src is-live=false format=time "
+            f"caps=video/x-raw,format=BGR,width={width},height={height},framerate=0/1 "
+            f"! videoconvert ! video/x-raw,format=BGRx ! nvvidconv "
+            f"! video/x-raw(memory:NVMM),format=I420 ! nvjpegenc quality={quality} "
+            f"! appsink name=sink sync=false max-buffers=1"
+        )
+        self._src = self._pipeline.get_by_name("src")
+        self._sink = self._pipeline.get_by_name("sink")
+        self._pipeline.set_state(Gst.State.PLAYING)
+        self._key = (width, height, quality)
+
+    def encode(self, image, quality=None):
+        quality = int(quality or self.quality)
+        height, width = image.shape[:2]
+        if self._key != (width, height, quality):
+            self._build(width, height, quality)
+        self._src.emit("push-buffer", Gst.Buffer.new_wrapped(np.ascontiguousarray(image).tobytes()))
+        sample = self._sink.emit("try-pull-sample", Gst.SECOND)
+        if sample is None:
+            raise RuntimeError("nvjpegenc produced no output")
+        buffer = sample.get_buffer()
+        return buffer.extract_dup(0, buffer.get_size())
+
+    def __del__(self):
+        if getattr(self, "_pipeline", None) is not None:
+            self._pipeline.set_state(Gst.State.NULL)
+
+
+_BACKENDS = {
+    JpegBackendType.opencv: OpenCVJpegBackend,
+    JpegBackendType.turbojpeg: TurboJpegBackend,
+    JpegBackendType.nvjpeg: NvJpegBackend,
+}
+
+
+def create_jpeg_backend(
+    backend: JpegBackendType = JpegBackendType.auto,
+    quality: int = 75,
+    chroma: Chroma = Chroma.c420,
+) -> JpegBackend:
+    """Instantiate the requested encoder; anything unavailable falls back to OpenCV."""
+    backend = JpegBackendType(backend)
+    candidates = (
+        [JpegBackendType.nvjpeg, JpegBackendType.turbojpeg]
+        if backend is JpegBackendType.auto else [backend]
+    )
+    for candidate in candidates:
+        if candidate is JpegBackendType.opencv:
+            break
+        try:
+            return _BACKENDS[candidate](quality, chroma)
+        except Exception as ex:  # noqa: BLE001
+            level = logging.DEBUG if backend is JpegBackendType.auto else logging.WARNING
+            logger.log(level, f"{candidate.value} JPEG backend unavailable ({ex})")
+    return OpenCVJpegBackend(quality, chroma)
+
+
+class JpegEncoder:
+    """
+    Encoder service: a backend per thread (TurboJPEG handles and GStreamer
+    pipelines aren't shared across threads) and a bounded worker pool.
+
+    At most ``max_pending`` frames are queued or encoding; ``submit`` blocks
+    once that many are outstanding, so a slow encoder throttles its producers
+    instead of piling up frames.
+    """
+
+    def __init__(
+        self,
+        backend: JpegBackendType = JpegBackendType.auto,
+        quality: int = 75,
+        chroma: Chroma = Chroma.c420,
+        workers: int = 2,
+        max_pending: int = 8,
+    ):
+        self.backend = JpegBackendType(backend)
+        self.quality = int(quality)
+        self.chroma = Chroma(str(getattr(chroma, "value", chroma)))
+        self.workers = workers
+        self._local = threading.local()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: concurrent.futures.ThreadPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def _backend(self) -> JpegBackend:
+        backend = getattr(self._local, "backend", None)
+        if backend is None:
+            backend = self._local.backend = create_jpeg_backend(self.backend, self.quality, self.chroma)
+        return backend
+
+    @property
+    def backend_name(self) -> str:
+        return self._backend().name
+
+    def encode(self, image, quality: int | None = None) -> bytes:
+        """Encode on the calling thread."""
+        return self._backend().encode(image, quality)
+
+    def _encode_job(self, frame, quality):
+        try:
+            image = frame.image if isinstance(frame, FrameLease) else frame
+            return self.encode(image, quality)
+        finally:
+            if isinstance(frame, FrameLease):
+                frame.release()
+            self._slots.release()
+
+    def submit(self, frame, quality: int | None = None) -> concurrent.futures.Future:
+        """
+        Encode ``frame`` (an ndarray, or a FrameLease the pool takes ownership
+        of and releases) on a worker. An ndarray must not change until the
+        Future completes.
+        """
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="jpeg"
+                    )
+        self._slots.acquire()
+        try:
+            return self._pool.submit(self._encode_job, frame, quality)
+        except Exception:
+            self._slots.release()
+            if isinstance(frame, FrameLease):
+                frame.release()
+            raise
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+
+jpeg_encoder = JpegEncoder(
+    backend=settings.jpeg_backend,
+    quality=settings.jpeg_quality,
+    chroma=settings.jpeg_chroma,
+    workers=settings.jpeg_workers,
+)
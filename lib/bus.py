@@ -0,0 +1,270 @@
+"""
+Pub/sub bus with per-subscriber bounded queues.
+
+Drop-in for the blinker signals ``felix.signals.Topics`` used to expose:
+``connect(receiver)`` / ``disconnect(receiver)`` / ``send(sender, **kwargs)``
+with receivers called as ``receiver(sender, **kwargs)``, held weakly by
+default. What changes is *where* receivers run.
+
+Each topic has a delivery ``Policy``:
+
+- ``SYNC``:        receivers run inline on the sender's thread (blinker
+                   semantics). Used for control toggles whose effect the
+                   sender relies on immediately.
+- ``LATEST``:      each subscriber holds only the newest message; older
+                   undelivered ones are replaced. For frames and commands
+                   where only the current value matters.
+- ``DROP_OLDEST``: bounded FIFO; when full the oldest message is discarded.
+- ``BLOCK``:       bounded FIFO; the sender waits for room.
+
+For every non-``SYNC`` topic each subscriber gets its own queue and is
+delivered either on the asyncio loop that was running when it connected (or
+the ``loop=`` it passed), or on a dedicated daemon thread. A slow receiver
+therefore only ever backs up its own queue, never the sender.
+"""
+
+import asyncio
+import collections
+import logging
+import threading
+import time
+import weakref
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class Policy(str, Enum):
+    SYNC = "sync"
+    LATEST = "latest"
+    DROP_OLDEST = "drop_oldest"
+    BLOCK = "block"
+
+
+def _make_ref(receiver, weak, on_dead):
+    if not weak:
+        return lambda: receiver
+    if hasattr(receiver, "__self__") and hasattr(receiver, "__func__"):
+        return weakref.WeakMethod(receiver, on_dead)
+    try:
+        return weakref.ref(receiver, on_dead)
+    except TypeError:
+        return lambda: receiver
+
+
+def _receiver_name(receiver) -> str:
+    owner = getattr(receiver, "__self__", None)
+    name = getattr(receiver, "__name__", repr(receiver))
+    return f"{type(owner).__name__}.{name}" if owner is not None else name
+
+
+class _Subscription:
+    def __init__(self, topic: "Topic", receiver, weak, policy, maxsize, loop, stamp=False):
+        self.topic = topic
+        self.name = _receiver_name(receiver)
+        self.ref = _make_ref(receiver, weak, self._on_dead)
+        self.policy = policy
+        self.maxsize = 1 if policy is Policy.LATEST else max(1, maxsize)
+        self.loop = loop
+        self.stamp = stamp
+        self.queue: collections.deque = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.busy = False
+        self.delivered = 0
+        self.dropped = 0
+        self._scheduled = False
+        self._thread: threading.Thread | None = None
+        self._delivery_thread_id: int | None = None
+
+    # ---- producer side --------------------------------------------------
+
+    def offer(self, sender, kwargs):
+        if self.stamp:
+            kwargs = {**kwargs, "sent_at": time.monotonic()}
+        with self.cond:
+            if self.closed:
+                return
+            if len(self.queue) >= self.maxsize:
+                if self.policy is Policy.BLOCK and not self._on_delivery_thread():
+                    while len(self.queue) >= self.maxsize and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        return
+                else:
+                    # LATEST / DROP_OLDEST (and BLOCK sent from its own delivery
+                    # thread or loop, which would otherwise deadlock).
+                    self.queue.popleft()
+                    self.dropped += 1
+            self.queue.append((sender, kwargs))
+            if self.loop is not None and not self._scheduled:
+                self._scheduled = self._schedule_on_loop()
+            if self.loop is None:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=f"bus:{self.topic.name}:{self.name}", daemon=True
+                    )
+                    self._thread.start()
+                self.cond.notify_all()
+
+    def _on_delivery_thread(self) -> bool:
+        """True if the caller is the thread (or on the loop) that drains this queue."""
+        if self.loop is not None:
+            # Waiting here would hold the loop that has to make room, even
+            # before its first drain.
+            try:
+                return asyncio.get_running_loop() is self.loop
+            except RuntimeError:
+                return False
+        return threading.get_ident() == self._delivery_thread_id
+
+    def _schedule_on_loop(self) -> bool:
+        try:
+            self.loop.call_soon_threadsafe(self._drain_on_loop)
+            return True
+        except RuntimeError:
+            # Loop closed: fall back to a thread so messages aren't lost.
+            self.loop = None
+            return False
+
+    # ---- consumer side --------------------------------------------------
+
+    def _take(self):
+        item = self.queue.popleft()
+        self.busy = True
+        self.cond.notify_all()  # wake a BLOCKed sender
+        return item
+
+    def _deliver(self, sender, kwargs):
+        receiver = self.ref()
+        if receiver is None:
+            self.close()
+            return
+        try:
+            receiver(sender, **kwargs)
+        except Exception:  # noqa: BLE001
+            logger.exception(f"{self.topic.name}: receiver {self.name} raised")
+        finally:
+            with self.cond:
+                self.delivered += 1
+                self.busy = False
+                self.cond.notify_all()
+
+    def _drain_on_loop(self):
+        while True:
+            with self.cond:
+                if not self.queue or self.closed:
+                    self._scheduled = False
+                    return
+                sender, kwargs = self._take()
+            self._deliver(sender, kwargs)
+
+    def _run(self):
+        self._delivery_thread_id = threading.get_ident()
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                sender, kwargs = self._take()
+            self._deliver(sender, kwargs)
+
+    def idle(self) -> bool:
+        return not self.queue and not self.busy
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.queue.clear()
+            self.cond.notify_all()
+        self.topic._remove(self)
+
+    def _on_dead(self, _ref):
+        self.close()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "receiver": self.name,
+            "policy": self.policy.value,
+            "queued": len(self.queue),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class Topic:
+    def __init__(self, name: str, policy: Policy = Policy.SYNC, maxsize: int = 8):
+        self.name = name
+        self.policy = policy
+        self.maxsize = maxsize
+        self._subs: list[_Subscription] = []
+        # Re-entrant: a weakref callback may remove a dead subscriber mid-connect.
+        self._lock = threading.RLock()
+
+    def connect(self, receiver, weak: bool = True, loop: asyncio.AbstractEventLoop | None = None,
+                policy: Policy | None = None, maxsize: int | None = None, stamp: bool = False):
+        """
+        Subscribe ``receiver(sender, **kwargs)``.
+
+        ``loop`` pins delivery to an asyncio loop; by default the loop running
+        at connect time is used, else a dedicated thread. ``policy`` and
+        ``maxsize`` override the topic defaults for this subscriber only.
+        ``stamp`` adds a ``sent_at`` kwarg (time.monotonic() at send), so a
+        receiver can order a queued message against something that happened
+        on another topic meanwhile.
+        """
+        policy = policy or self.policy
+        if loop is None and policy is not Policy.SYNC:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+        sub = _Subscription(self, receiver, weak, policy, maxsize or self.maxsize, loop, stamp)
+        with self._lock:
+            self._subs.append(sub)
+        return receiver
+
+    def disconnect(self, receiver):
+        for sub in list(self._subs):
+            if sub.ref() == receiver:
+                sub.close()
+
+    def _remove(self, sub):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    @property
+    def receivers(self) -> list:
+        return [r for r in (s.ref() for s in list(self._subs)) if r is not None]
+
+    def send(self, sender=None, /, **kwargs):
+        for sub in list(self._subs):
+            if sub.policy is Policy.SYNC:
+                receiver = sub.ref()
+                if receiver is None:
+                    sub.close()
+                    continue
+                if sub.stamp:
+                    receiver(sender, **kwargs, sent_at=time.monotonic())
+                else:
+                    receiver(sender, **kwargs)
+                sub.delivered += 1
+            else:
+                sub.offer(sender, kwargs)
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every subscriber queue has been delivered (tests, benchmarks)."""
+        for sub in list(self._subs):
+            with sub.cond:
+                if not sub.cond.wait_for(sub.idle, timeout):
+                    return False
+        return True
+
+    def stats(self) -> list[dict]:
+        return [s.stats for s in list(self._subs)]
+
+    def __repr__(self):
+        return f"Topic({self.name!r}, policy={self.policy.value}, receivers={len(self._subs)})"
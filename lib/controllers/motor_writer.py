@@ -0,0 +1,133 @@
+"""
+Dedicated writer thread for motor commands.
+
+Rosmaster.set_motor is a blocking serial write plus a settle sleep. Called
+inline from cmd_vel receivers it blocks whichever thread sent the twist (the
+NiceGUI loop for the joystick), and a joystick drag turns into dozens of
+writes per second that the board can't act on any faster than its control
+loop anyway.
+
+Callers ``submit`` motor powers into a single latest-value slot and return
+immediately. The writer thread writes at most one frame per ``period``; every
+command submitted in between overwrites the slot (counted as coalesced), so a
+burst becomes one write of the newest value. A stop (all zero) is written
+without waiting out the period, and always written even if it repeats the
+previous frame; other repeats of the previous frame are skipped.
+
+Latency is measured from the ``received_at`` timestamp (time.monotonic) the
+caller passes, normally when the cmd_vel was sent, to the write returning.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MotorCommandWriter:
+    def __init__(self, write, frequency: float = 50.0, history: int = 512):
+        """
+        Args:
+            write: callable(m1, m2, m3, m4) doing the blocking write, e.g. Rosmaster.set_motor
+            frequency: max motor frames per second
+            history: number of recent write latencies kept for percentiles
+        """
+        self._write = write
+        self.period = 1.0 / frequency
+        self._cond = threading.Condition()
+        self._pending: tuple | None = None
+        self._pending_at = 0.0
+        self._last_written: tuple | None = None
+        self._last_write_time = 0.0
+        self._running = True
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.duplicates = 0
+        self.written = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=history)
+
+        self._thread = threading.Thread(target=self._run, name="MotorCommandWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, powers, received_at: float | None = None):
+        """Queue motor powers (m1, m2, m3, m4); replaces any command not yet written."""
+        received_at = time.monotonic() if received_at is None else received_at
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+                # keep the oldest receipt time: the write answers all of them
+                received_at = min(received_at, self._pending_at)
+            self._pending = tuple(powers)
+            self._pending_at = received_at
+            self.submitted += 1
+            self._cond.notify()
+
+    def _take(self):
+        """Block until a command is due; returns (powers, received_at) or None on close."""
+        with self._cond:
+            while self._running:
+                if self._pending is not None:
+                    wait = self._last_write_time + self.period - time.monotonic()
+                    if wait <= 0 or not any(self._pending):
+                        item = (self._pending, self._pending_at)
+                        self._pending = None
+                        return item
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _run(self):
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            self._perform(*item)
+
+    def _perform(self, powers, received_at):
+        if powers == self._last_written and any(powers):
+            self.duplicates += 1
+            return
+        try:
+            self._write(*powers)
+        except Exception as ex:  # noqa: BLE001
+            self.errors += 1
+            logger.warning(f"motor write failed: {ex}")
+            return
+        now = time.monotonic()
+        self._last_written = powers
+        self._last_write_time = now
+        self.written += 1
+        self._latencies.append(now - received_at)
+
+    def close(self, timeout: float = 1.0):
+        """Stop the thread, then write any command still pending (e.g. the final stop)."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+        with self._cond:
+            item = (self._pending, self._pending_at) if self._pending is not None else None
+            self._pending = None
+        if item is not None:
+            self._perform(*item)
+
+    @property
+    def stats(self) -> dict:
+        latencies = np.array(self._latencies) * 1000.0
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "latency_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "latency_ms_max": float(latencies.max()) if len(latencies) else 0.0,
+        }
@@ -0,0 +1,170 @@
+"""
+Binary sensor framing between pico-sensors-app and the host.
+
+One frame carries every sensor read in one pass of the firmware loop:
+
+    SYNC(0xA5) COUNT(u8) TS(u32 ms, Pico clock) COUNT x [ID(u8) TYPE(u8) RANGE(u16)] CRC8
+
+little-endian, CRC-8 (poly 0x07, init 0) over everything between SYNC and
+CRC. Text never contains 0xA5, so frames and the JSON lines older firmware
+prints can share the port: ``PicoFrameDecoder`` accepts both, one line per
+reading (``{"id": 0, "type": "ir", "value": 123}``, also the Python-repr form
+``print(dict)`` produces), and skips anything else, e.g. tracebacks.
+
+The firmware carries its own copy of ``encode_frame``/``crc8``
+(pico-sensors-app/main.py); keep the two in sync.
+"""
+
+import ast
+import json
+import logging
+import struct
+import time
+
+from lib.interfaces import SensorReading
+
+logger = logging.getLogger(__name__)
+
+SYNC = 0xA5
+MAX_READINGS = 16
+MAX_LINE = 256
+
+TYPE_TOF = 0
+TYPE_IR = 1
+TYPE_NAMES = {TYPE_TOF: "tof", TYPE_IR: "ir"}
+TYPE_CODES = {name: code for code, name in TYPE_NAMES.items()}
+
+_HEADER = struct.Struct('<BBI')
+_READING = struct.Struct('<BBH')
+
+
+def _crc8_table():
+    table = []
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+_CRC8 = _crc8_table()
+
+
+def crc8(data) -> int:
+    crc = 0
+    for b in data:
+        crc = _CRC8[crc ^ b]
+    return crc
+
+
+def encode_frame(readings, ts_ms: int) -> bytes:
+    """readings: [(id, type name or code, range mm), ...] -> one frame."""
+    body = bytearray(_HEADER.pack(SYNC, len(readings), ts_ms & 0xFFFFFFFF))
+    for sensor_id, sensor_type, value in readings:
+        code = TYPE_CODES.get(sensor_type, sensor_type)
+        body += _READING.pack(sensor_id, code, min(max(int(value), 0), 0xFFFF))
+    body.append(crc8(body[1:]))
+    return bytes(body)
+
+
+def frame_size(count: int) -> int:
+    return _HEADER.size + count * _READING.size + 1
+
+
+class PicoFrameDecoder:
+    """
+    Incremental decoder: ``feed`` whatever the serial port returned and get
+    back the SensorReadings completed by it. Partial frames and lines are kept
+    until the rest arrives.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.json_lines = 0
+        self.crc_errors = 0
+        self.discarded = 0
+
+    def feed(self, data) -> list[SensorReading]:
+        buf = self.buffer
+        buf += data
+        readings: list[SensorReading] = []
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            b = buf[pos]
+            if b == SYNC:
+                if end - pos < 2:
+                    break
+                count = buf[pos + 1]
+                if count == 0 or count > MAX_READINGS:
+                    self.discarded += 1
+                    pos += 1
+                    continue
+                size = frame_size(count)
+                if end - pos < size:
+                    break
+                if crc8(buf[pos + 1:pos + size - 1]) != buf[pos + size - 1]:
+                    self.crc_errors += 1
+                    self.discarded += 1
+                    pos += 1
+                    continue
+                self._decode_frame(buf, pos, count, readings)
+                pos += size
+            elif b == 0x7B:  # '{'
+                nl = buf.find(b'\n', pos, pos + MAX_LINE)
+                if nl < 0:
+                    if end - pos < MAX_LINE:
+                        break
+                    self.discarded += 1
+                    pos += 1
+                    continue
+                reading = self._decode_line(bytes(buf[pos:nl]))
+                if reading is not None:
+                    readings.append(reading)
+                pos = nl + 1
+            else:
+                self.discarded += 1
+                pos += 1
+        del buf[:pos]
+        return readings
+
+    def _decode_frame(self, buf, pos, count, readings):
+        _, _, ts_ms = _HEADER.unpack_from(buf, pos)
+        now = int(time.time())
+        offset = pos + _HEADER.size
+        for _ in range(count):
+            sensor_id, code, value = _READING.unpack_from(buf, offset)
+            offset += _READING.size
+            readings.append(SensorReading(
+                id=sensor_id, type=TYPE_NAMES.get(code, str(code)),
+                value=value, ts=now, device_ts=ts_ms,
+            ))
+        self.frames += 1
+
+    def _decode_line(self, line: bytes) -> SensorReading | None:
+        try:
+            text = line.decode('utf-8').strip()
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError:
+                # print(dict) on the Pico gives the Python repr, not JSON
+                data = ast.literal_eval(text)
+            if not isinstance(data, dict):
+                raise ValueError(f"not a reading: {text!r}")
+        except (UnicodeDecodeError, ValueError, SyntaxError) as ex:
+            logger.error(f"Pico line decode error: {ex}")
+            self.discarded += len(line)
+            return None
+        self.json_lines += 1
+        return SensorReading.from_json(data)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "json_lines": self.json_lines,
+            "crc_errors": self.crc_errors,
+            "discarded_bytes": self.discarded,
+        }
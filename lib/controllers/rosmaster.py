@@ -7,6 +7,65 @@ import serial
 import threading
 
 
+# Auto-report payloads, decoded in one call each (little-endian, as sent by the board)
+_REPORT_SPEED = struct.Struct('<hhhB')      # vx, vy, vz (mm/s), battery (0.1 V)
+_REPORT_RAW = struct.Struct('<9h')          # gyro xyz, accel xyz, mag xyz
+_REPORT_ATT = struct.Struct('<3h')          # roll, pitch, yaw (1e-4 rad)
+_REPORT_ENCODER = struct.Struct('<4i')      # m1..m4
+
+
+class ReportFrameParser(object):
+    """
+    Incremental parser for frames sent by the expansion board.
+
+    Frame layout: HEAD(0xFF) RX_ID(0xFB) LEN TYPE DATA... CHECKSUM, where LEN
+    counts itself, TYPE, DATA and CHECKSUM, and CHECKSUM = (LEN + TYPE + sum(DATA)) & 0xFF.
+    Bytes are appended as they arrive; complete frames are returned and partial
+    ones stay buffered until the rest arrives. Garbage and frames with a bad
+    checksum are skipped by resynchronizing on the next header.
+    """
+
+    HEAD = 0xFF
+    RX_ID = 0xFB
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.checksum_errors = 0
+
+    def feed(self, data):
+        """Append received bytes; returns [(ext_type, payload bytes), ...] of complete frames."""
+        buf = self.buffer
+        buf += data
+        frames = []
+        pos = 0
+        end = len(buf)
+        while True:
+            pos = buf.find(b'\xff\xfb', pos)
+            if pos < 0:
+                # keep a trailing HEAD byte, it may start the next frame
+                pos = end - 1 if end and buf[-1] == self.HEAD else end
+                break
+            if end - pos < 4:
+                break
+            ext_len = buf[pos + 2]
+            if ext_len < 3:
+                pos += 1
+                continue
+            frame_end = pos + ext_len + 2
+            if frame_end > end:
+                break
+            ext_type = buf[pos + 3]
+            checksum = (ext_len + ext_type + sum(buf[pos + 4:frame_end - 1])) & 0xFF
+            if checksum == buf[frame_end - 1]:
+                frames.append((ext_type, bytes(buf[pos + 4:frame_end - 1])))
+                pos = frame_end
+            else:
+                self.checksum_errors += 1
+                pos += 1
+        del buf[:pos]
+        return frames
+
+
 # V3.3.9
 class Rosmaster(object):
     __uart_state = 0
@@ -141,58 +200,57 @@ class Rosmaster(object):
         # print("parse_data:", ext_data, ext_type)
         if ext_type == self.FUNC_REPORT_SPEED:
             # print(ext_data)
-            self.__vx = int(struct.unpack('h', bytearray(ext_data[0:2]))[0]) / 1000.0
-            self.__vy = int(struct.unpack('h', bytearray(ext_data[2:4]))[0]) / 1000.0
-            self.__vz = int(struct.unpack('h', bytearray(ext_data[4:6]))[0]) / 1000.0
-            self.__battery_voltage = struct.unpack('B', bytearray(ext_data[6:7]))[0]
+            vx, vy, vz, self.__battery_voltage = _REPORT_SPEED.unpack_from(ext_data)
+            self.__vx = vx / 1000.0
+            self.__vy = vy / 1000.0
+            self.__vz = vz / 1000.0
         # 解析MPU9250原始陀螺仪、加速度计、磁力计数据
         # (MPU9250)the original gyroscope, accelerometer, magnetometer data
         elif ext_type == self.FUNC_REPORT_MPU_RAW:
             # 陀螺仪传感器:±500dps=±500°/s ±32768 (gyro/32768*500)*PI/180(rad/s)=gyro/3754.9(rad/s)
             gyro_ratio = 1 / 3754.9 # ±500dps
-            self.__gx = struct.unpack('h', bytearray(ext_data[0:2]))[0]*gyro_ratio
-            self.__gy = struct.unpack('h', bytearray(ext_data[2:4]))[0]*-gyro_ratio
-            self.__gz = struct.unpack('h', bytearray(ext_data[4:6]))[0]*-gyro_ratio
             # 加速度传感器:±2g=±2*9.8m/s^2 ±32768 accel/32768*19.6=accel/1671.84
             accel_ratio = 1 / 1671.84
-            self.__ax = struct.unpack('h', bytearray(ext_data[6:8]))[0]*accel_ratio
-            self.__ay = struct.unpack('h', bytearray(ext_data[8:10]))[0]*accel_ratio
-            self.__az = struct.unpack('h', bytearray(ext_data[10:12]))[0]*accel_ratio
             # 磁力计传感器
             mag_ratio = 1.0
-            self.__mx = struct.unpack('h', bytearray(ext_data[12:14]))[0]*mag_ratio
-            self.__my = struct.unpack('h', bytearray(ext_data[14:16]))[0]*mag_ratio
-            self.__mz = struct.unpack('h', bytearray(ext_data[16:18]))[0]*mag_ratio
+            gx, gy, gz, ax, ay, az, mx, my, mz = _REPORT_RAW.unpack_from(ext_data)
+            self.__gx = gx*gyro_ratio
+            self.__gy = gy*-gyro_ratio
+            self.__gz = gz*-gyro_ratio
+            self.__ax = ax*accel_ratio
+            self.__ay = ay*accel_ratio
+            self.__az = az*accel_ratio
+            self.__mx = mx*mag_ratio
+            self.__my = my*mag_ratio
+            self.__mz = mz*mag_ratio
         # 解析ICM20948原始陀螺仪、加速度计、磁力计数据
         # (ICM20948)the original gyroscope, accelerometer, magnetometer data
         elif ext_type == self.FUNC_REPORT_ICM_RAW:
             gyro_ratio = 1 / 1000.0
-            self.__gx = struct.unpack('h', bytearray(ext_data[0:2]))[0]*gyro_ratio
-            self.__gy = struct.unpack('h', bytearray(ext_data[2:4]))[0]*gyro_ratio
-            self.__gz = struct.unpack('h', bytearray(ext_data[4:6]))[0]*gyro_ratio
-
             accel_ratio = 1 / 1000.0
-            self.__ax = struct.unpack('h', bytearray(ext_data[6:8]))[0]*accel_ratio
-            self.__ay = struct.unpack('h', bytearray(ext_data[8:10]))[0]*accel_ratio
-            self.__az = struct.unpack('h', bytearray(ext_data[10:12]))[0]*accel_ratio
-
             mag_ratio = 1 / 1000.0
-            self.__mx = struct.unpack('h', bytearray(ext_data[12:14]))[0]*mag_ratio
-            self.__my = struct.unpack('h', bytearray(ext_data[14:16]))[0]*mag_ratio
-            self.__mz = struct.unpack('h', bytearray(ext_data[16:18]))[0]*mag_ratio
+            gx, gy, gz, ax, ay, az, mx, my, mz = _REPORT_RAW.unpack_from(ext_data)
+            self.__gx = gx*gyro_ratio
+            self.__gy = gy*gyro_ratio
+            self.__gz = gz*gyro_ratio
+            self.__ax = ax*accel_ratio
+            self.__ay = ay*accel_ratio
+            self.__az = az*accel_ratio
+            self.__mx = mx*mag_ratio
+            self.__my = my*mag_ratio
+            self.__mz = mz*mag_ratio
         # 解析板子的姿态角
         # the attitude Angle of the board
         elif ext_type == self.FUNC_REPORT_IMU_ATT:
-            self.__roll = struct.unpack('h', bytearray(ext_data[0:2]))[0] / 10000.0
-            self.__pitch = struct.unpack('h', bytearray(ext_data[2:4]))[0] / 10000.0
-            self.__yaw = struct.unpack('h', bytearray(ext_data[4:6]))[0] / 10000.0
+            roll, pitch, yaw = _REPORT_ATT.unpack_from(ext_data)
+            self.__roll = roll / 10000.0
+            self.__pitch = pitch / 10000.0
+            self.__yaw = yaw / 10000.0
         # 解析四个轮子的编码器数据
         # Encoder data on all four wheels
         elif ext_type == self.FUNC_REPORT_ENCODER:
-            self.__encoder_m1 = struct.unpack('i', bytearray(ext_data[0:4]))[0]
-            self.__encoder_m2 = struct.unpack('i', bytearray(ext_data[4:8]))[0]
-            self.__encoder_m3 = struct.unpack('i', bytearray(ext_data[8:12]))[0]
-            self.__encoder_m4 = struct.unpack('i', bytearray(ext_data[12:16]))[0]
+            (self.__encoder_m1, self.__encoder_m2,
+             self.__encoder_m3, self.__encoder_m4) = _REPORT_ENCODER.unpack_from(ext_data)
 
         else:
             if ext_type == self.FUNC_UART_SERVO:
@@ -253,33 +311,19 @@ class Rosmaster(object):
             
 
     # 接收数据 receive data
+    # Block for the first byte, then take everything the driver has buffered, so
+    # one 10 ms auto-report burst costs one read() instead of one per byte.
     def __receive_data(self):
         # 清空缓冲区
         self.ser.flushInput()
+        parser = ReportFrameParser()
         while True:
-            head1 = bytearray(self.ser.read())[0]
-            if head1 == self.__HEAD:
-                head2 = bytearray(self.ser.read())[0]
-                check_sum = 0
-                rx_check_num = 0
-                if head2 == self.__DEVICE_ID - 1:
-                    ext_len = bytearray(self.ser.read())[0]
-                    ext_type = bytearray(self.ser.read())[0]
-                    ext_data = []
-                    check_sum = ext_len + ext_type
-                    data_len = ext_len - 2
-                    while len(ext_data) < data_len:
-                        value = bytearray(self.ser.read())[0]
-                        ext_data.append(value)
-                        if len(ext_data) == data_len:
-                            rx_check_num = value
-                        else:
-                            check_sum = check_sum + value
-                    if check_sum % 256 == rx_check_num:
-                        self.__parse_data(ext_type, ext_data)
-                    else:
-                        if self.__debug:
-                            print("check sum error:", ext_len, ext_type, ext_data)
+            data = self.ser.read(max(1, self.ser.in_waiting))
+            errors = parser.checksum_errors
+            for ext_type, ext_data in parser.feed(data):
+                self.__parse_data(ext_type, ext_data)
+            if self.__debug and parser.checksum_errors != errors:
+                print("check sum error:", parser.checksum_errors)
 
     # 请求数据， function：对应要返回数据的功能字，parm：传入的参数。
     # Request data, function: corresponding function word to return data, parm: parameter passed in
@@ -135,9 +135,9 @@ class Quarternion(Vector4):
 
 
 class Twist(DataModel):
-    def __init__(self, linear=Vector3(0, 0, 0), angular=Vector3(0, 0, 0)):
-        self.linear = linear
-        self.angular = angular
+    def __init__(self, linear=None, angular=None):
+        self.linear = linear if linear is not None else Vector3(0, 0, 0)
+        self.angular = angular if angular is not None else Vector3(0, 0, 0)
 
     def copy(self):
         return Twist(linear=self.linear.copy(), angular=self.angular.copy())
@@ -234,6 +234,8 @@ class SensorReading:
     type: str
     value: float
     ts: int
+    device_ts: int | None = None  # Pico clock (ms) for binary frames
+    received_at: float | None = None  # host time.monotonic() when the bytes arrived
 
     @staticmethod
     def from_json(data) -> "SensorReading":
@@ -246,7 +248,7 @@ class SensorReading:
     
     def __str__(self):
         return (f"SensorReading(id={self.id}, type={self.type}, "
-                f"value={self.value}, ts={self.ts})")
+                f"value={self.value}, ts={self.ts}, device_ts={self.device_ts})")
     
 @dataclass
 class Prediction:
@@ -255,10 +257,11 @@ class Prediction:
     right: float
     forward: float
     ts: int = lambda: int(time.time())
+    seq: int = -1  # frame_ring sequence number of the frame this came from
 
     def __str__(self):
         return (f"Prediction(source={self.source}, left={self.left}, "
-                f"right={self.right}, forward={self.forward}, ts={self.ts})")
+                f"right={self.right}, forward={self.forward}, ts={self.ts}, seq={self.seq})")
 
 
 @dataclass
@@ -306,6 +309,7 @@ class DetectionFrame:
     width: int
     height: int
     ts: int
+    seq: int = -1  # frame_ring sequence number of the frame this came from
 
     @property
     def dict(self):
@@ -314,4 +318,5 @@ class DetectionFrame:
             "width": self.width,
             "height": self.height,
             "ts": self.ts,
+            "seq": self.seq,
         }
@@ -1,10 +1,17 @@
 import asyncio
 from abc import ABC
 import atexit
+import concurrent.futures
 import logging
 
+from lib.nodes.scheduler import DeadlineSchedule, SpinStats
+
 class BaseNode(ABC):
 
+    # Nodes whose spinner blocks (model inference, serial I/O) set this so spin()
+    # runs the spinner on the node's own worker thread instead of the event
+    # loop, where it would freeze every other node.
+    blocking_spinner: bool = False
 
     def __init__(self, **kwargs):
         """
@@ -15,6 +22,8 @@ class BaseNode(ABC):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.frequency = kwargs.get('frequency', 10)
         self.debug: bool = kwargs.get('debug', False)
+        self.spin_stats: SpinStats | None = None
+        self._spin_executor: concurrent.futures.ThreadPoolExecutor | None = None
 
         atexit.register(self._shutdown)
 
@@ -33,6 +42,10 @@ class BaseNode(ABC):
         """
         Starts the spinner task.
 
+        Ticks are released on absolute deadlines, so the rate holds as long as
+        the spinner fits in its period; overruns skip the missed deadlines and
+        are recorded, with wake-up jitter, in ``self.spin_stats``.
+
         :param frequency: Frequency at which to run the spinner in Hz.
         """
         if frequency is not None:
@@ -41,9 +54,25 @@ class BaseNode(ABC):
 
         self.logger.info(f"*\t{self.__class__.__name__} is spinning at {self.frequency} Hz")
 
+        loop = asyncio.get_running_loop()
+        self.spin_stats = SpinStats(self.frequency)
+        schedule = DeadlineSchedule(self.frequency, loop.time())
+        if self.blocking_spinner and self._spin_executor is None:
+            self._spin_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"{self.__class__.__name__}.spin"
+            )
+
         while self._running:
-            self.spinner()
-            await asyncio.sleep(1/self.frequency)
+            start = loop.time()
+            jitter = max(0.0, start - schedule.deadline)
+            if self.blocking_spinner:
+                await loop.run_in_executor(self._spin_executor, self.spinner)
+            else:
+                self.spinner()
+            end = loop.time()
+            missed = schedule.advance(end)
+            self.spin_stats.record(jitter, end - start, missed)
+            await asyncio.sleep(schedule.delay(loop.time()))
 
     def spin_once(self):
         """
@@ -60,8 +89,13 @@ class BaseNode(ABC):
         self._running = False
 
         self.logger.info(f'{self.__class__.__name__} shutting down')
+        if self.spin_stats is not None:
+            self.logger.info(f'{self.__class__.__name__} {self.spin_stats}')
 
         self.shutdown()
+
+        if self._spin_executor is not None:
+            self._spin_executor.shutdown(wait=False)
         
 
     def stop(self):
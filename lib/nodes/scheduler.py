@@ -0,0 +1,98 @@
+"""
+Deadline bookkeeping for BaseNode.spin.
+
+The spinner is released on absolute deadlines ``t0 + k * period`` rather than
+sleeping a full period after the work, so the achieved rate is the requested
+rate as long as the work fits in the period. When a tick overruns, the missed
+deadlines are skipped (counted, not replayed in a burst) and the schedule
+keeps its original phase.
+"""
+
+import bisect
+import time
+
+# Upper edges, in milliseconds, of the wake-up jitter histogram buckets.
+JITTER_BUCKETS_MS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, float("inf"))
+
+
+class SpinStats:
+    """Per-node tick, overrun and jitter accounting."""
+
+    def __init__(self, frequency: float):
+        self.frequency = frequency
+        self.period = 1.0 / frequency
+        self.ticks = 0
+        self.overruns = 0
+        self.missed_deadlines = 0
+        self.max_jitter = 0.0
+        self.max_work = 0.0
+        self.total_work = 0.0
+        self.jitter_histogram = [0] * len(JITTER_BUCKETS_MS)
+        self._started = time.monotonic()
+
+    def record(self, jitter: float, work: float, missed: int):
+        """
+        jitter: how late (s) the tick woke up relative to its deadline
+        work:   time (s) the spinner took
+        missed: deadlines skipped because this tick overran
+        """
+        self.ticks += 1
+        self.total_work += work
+        self.max_work = max(self.max_work, work)
+        self.max_jitter = max(self.max_jitter, jitter)
+        self.jitter_histogram[bisect.bisect_left(JITTER_BUCKETS_MS, jitter * 1000.0)] += 1
+        if missed:
+            self.overruns += 1
+            self.missed_deadlines += missed
+
+    @property
+    def achieved_hz(self) -> float:
+        elapsed = time.monotonic() - self._started
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def dict(self):
+        return {
+            "frequency": self.frequency,
+            "achieved_hz": self.achieved_hz,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "missed_deadlines": self.missed_deadlines,
+            "mean_work_ms": 1000.0 * self.total_work / self.ticks if self.ticks else 0.0,
+            "max_work_ms": 1000.0 * self.max_work,
+            "max_jitter_ms": 1000.0 * self.max_jitter,
+            "jitter_histogram_ms": {
+                ("inf" if edge == float("inf") else edge): count
+                for edge, count in zip(JITTER_BUCKETS_MS, self.jitter_histogram)
+            },
+        }
+
+    def __repr__(self):
+        return (f"SpinStats({self.achieved_hz:.1f}/{self.frequency:g} Hz, ticks={self.ticks}, "
+                f"overruns={self.overruns}, missed={self.missed_deadlines}, "
+                f"max_jitter={1000.0 * self.max_jitter:.1f}ms, max_work={1000.0 * self.max_work:.1f}ms)")
+
+
+class DeadlineSchedule:
+    """Absolute-deadline clock for one spinning node."""
+
+    def __init__(self, frequency: float, now: float):
+        self.period = 1.0 / frequency
+        self.deadline = now
+
+    def advance(self, now: float) -> int:
+        """
+        Move to the next deadline after a tick that finished at ``now``.
+
+        Returns how many deadlines were missed; those are skipped so an
+        overrunning node doesn't fire a burst of catch-up ticks.
+        """
+        self.deadline += self.period
+        if now <= self.deadline:
+            return 0
+        missed = int((now - self.deadline) // self.period) + 1
+        self.deadline += missed * self.period
+        return missed
+
+    def delay(self, now: float) -> float:
+        return max(0.0, self.deadline - now)
@@ -0,0 +1,120 @@
+"""
+Fixed-capacity, timestamp-ordered ring buffer with time lookups.
+
+One writer appends ``(t, value)`` samples with non-decreasing ``t``
+(time.monotonic); any number of readers query without taking a lock:
+
+    series = TimeSeries(capacity=256, dim=3)
+    series.append(time.monotonic(), (vx, vy, wz))
+    series.at(t)            # sample-and-hold: value of the last sample at or before t
+    series.at(t, back=1)    # ... and the one before it
+    series.interpolate(t)   # linear between the samples around t
+
+Lookups are a binary search over the (at most two) sorted runs of the ring,
+O(log capacity). Appends are bracketed by a generation counter (a seqlock):
+it is odd while a slot is being written, and a lookup that started during
+an append, or overlapped one, is retried. Readers therefore only ever see
+complete samples, even when the append is recycling the oldest slot the
+lookup is searching.
+"""
+
+import time
+
+import numpy as np
+
+
+class TimeSeries:
+    def __init__(self, capacity: int = 1024, dim: int = 1, dtype=np.float64):
+        if capacity < 2:
+            raise ValueError("TimeSeries needs a capacity of at least 2")
+        self.capacity = capacity
+        self.dim = dim
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._v = np.zeros((capacity, dim), dtype=dtype)
+        self.count = 0  # samples ever appended
+        self._generation = 0  # odd while append() is writing a slot
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, t: float, value):
+        """Writer only. ``t`` earlier than the newest sample is clamped to it."""
+        n = self.count
+        if n and t < self._t[(n - 1) % self.capacity]:
+            t = self._t[(n - 1) % self.capacity]
+        i = n % self.capacity
+        self._generation += 1
+        self._t[i] = t
+        self._v[i] = value
+        self.count = n + 1
+        self._generation += 1
+
+    def _find(self, t: float, n: int) -> int:
+        """Logical index of the last sample with timestamp <= t (-1 if none) among the first n."""
+        cap = self.capacity
+        oldest = max(0, n - cap)
+        if n <= cap:
+            return int(np.searchsorted(self._t[:n], t, side="right")) - 1
+        # Physical layout: [start:] holds the older run, [:start] the newer one.
+        start = n % cap
+        if start and t >= self._t[0]:
+            return n - start + int(np.searchsorted(self._t[:start], t, side="right")) - 1
+        k = int(np.searchsorted(self._t[start:], t, side="right")) - 1
+        return oldest + k if k >= 0 else -1
+
+    def _read(self, fn):
+        while True:
+            generation = self._generation
+            if generation & 1:
+                time.sleep(0)  # let the writer finish its slot
+                continue
+            n = self.count
+            if n == 0:
+                return None
+            result = fn(n)
+            if self._generation == generation:
+                return result
+
+    def _sample(self, k: int):
+        i = k % self.capacity
+        return float(self._t[i]), self._v[i].copy()
+
+    def latest(self):
+        """(t, value) of the newest sample, or None."""
+        return self._read(lambda n: self._sample(n - 1))
+
+    def at(self, t: float, back: int = 0):
+        """Value of the last sample at or before ``t`` (``back`` samples earlier), or None."""
+        def lookup(n):
+            k = self._find(t, n) - back
+            if k < max(0, n - self.capacity):
+                return None
+            return self._sample(k)[1]
+        return self._read(lookup)
+
+    def interpolate(self, t: float):
+        """Value at ``t``, linear between neighbours; held at the ends, None if empty."""
+        def lookup(n):
+            oldest = max(0, n - self.capacity)
+            k = self._find(t, n)
+            if k < oldest:
+                return self._sample(oldest)[1]
+            if k == n - 1:
+                return self._sample(k)[1]
+            t0, v0 = self._sample(k)
+            t1, v1 = self._sample(k + 1)
+            if t1 <= t0:
+                return v1
+            w = (t - t0) / (t1 - t0)
+            return v0 + (v1 - v0) * w
+        return self._read(lookup)
+
+    def window(self, t0: float, t1: float):
+        """(timestamps, values) of samples with t0 < t <= t1, oldest first."""
+        def lookup(n):
+            oldest = max(0, n - self.capacity)
+            first = max(self._find(t0, n) + 1, oldest)
+            last = self._find(t1, n)
+            ks = np.arange(first, last + 1) % self.capacity
+            return self._t[ks].copy(), self._v[ks].copy()
+        return self._read(lookup)
@@ -1,7 +1,10 @@
 import atexit
 import board
 import busio
+import json
+import struct
 import time
+import usb_cdc
 from microcontroller import Pin
 from adafruit_vl53l0x import VL53L0X
 import digitalio
@@ -11,6 +14,32 @@ import digitalio
 # Default is 33ms. Higher values mean more accuracy, but slower readings.
 # vl53.measurement_timing_budget = 20000  # Example: 20ms
 
+# Binary framing, see lib/controllers/pico_protocol.py on the host (keep in sync):
+# SYNC(0xA5) COUNT TS(u32 ms) COUNT x [ID TYPE RANGE(u16)] CRC8, little-endian.
+# Set BINARY = False to print one JSON line per reading instead.
+BINARY = True
+SYNC = 0xA5
+TYPE_TOF = 0
+TYPE_IR = 1
+
+
+def crc8(data):
+    crc = 0
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_frame(readings, ts_ms):
+    frame = bytearray(struct.pack('<BBI', SYNC, len(readings), ts_ms & 0xFFFFFFFF))
+    for sensor_id, sensor_type, value in readings:
+        frame += struct.pack('<BBH', sensor_id, sensor_type, min(max(int(value), 0), 0xFFFF))
+    frame.append(crc8(frame[1:]))
+    return frame
+
+
 class TOF:
     def __init__(self, sda = None, scl = None, xshuts: list[Pin] = None):
         self.sensors: list[VL53L0X] = []
@@ -47,11 +76,17 @@ class TOF:
             sensor.start_continuous()
 
 
-    def run(self, frequency_hz = 10):
+    def run(self, frequency_hz = None):
+        # In continuous mode sensor.range waits for the next measurement, so with
+        # no frequency_hz the loop runs at the sensors' own rate (~33 ms budget).
         while True:
             try:
-                for index, sensor in enumerate(self.sensors):
-                    print({"id": index, "type": "ir", "value": sensor.range})
+                if BINARY:
+                    readings = [(index, TYPE_IR, sensor.range) for index, sensor in enumerate(self.sensors)]
+                    usb_cdc.console.write(encode_frame(readings, time.monotonic_ns() // 1000000))
+                else:
+                    for index, sensor in enumerate(self.sensors):
+                        print(json.dumps({"id": index, "type": "ir", "value": sensor.range}))
                 
             except Exception as e:
                 print(f"Error reading sensor: {e}")
@@ -59,7 +94,8 @@ class TOF:
                 print("Exiting...")
                 break
             finally:
-                time.sleep(1.0/frequency_hz)
+                if frequency_hz:
+                    time.sleep(1.0/frequency_hz)
 
     def deinit(self):
         for sensor in self.sensors:
@@ -0,0 +1,71 @@
+"""
+Augmentation moved from per-sample PIL/torch transforms in the loader to
+one vectorized pass over each uint8 batch on the training device; these pin
+its per-sample randomness, flip label remapping and eval passthrough.
+"""
+
+import torch
+import torchvision.transforms.functional as TF
+
+from felix.training.mecanum.train import _flip_labels
+from felix.training.transformations import BatchAugment, IMAGENET_MEAN, IMAGENET_STD
+
+
+def _batch(n=8, size=16):
+    torch.manual_seed(0)
+    return torch.randint(0, 256, (n, 3, size, size), dtype=torch.uint8)
+
+
+def test_eval_mode_only_normalizes():
+    images = _batch()
+    augment = BatchAugment(p_flip=1.0, target_flips=[0, 2, 1]).eval()
+    out, targets, flipped = augment(images, torch.tensor([1] * 8))
+
+    expected = TF.normalize(images.float() / 255, IMAGENET_MEAN, IMAGENET_STD)
+    assert torch.allclose(out, expected, atol=1e-6)
+    assert targets.tolist() == [1] * 8
+    assert not flipped.any()
+
+
+def test_parameters_are_drawn_per_sample():
+    images = _batch(n=64).clamp(64, 192)
+    augment = BatchAugment(p_low_light=1.0, low_light=(0.3, 0.5), brightness=0, contrast=0,
+                           saturation=0, hue=0, p_noise=0, mean=(0, 0, 0), std=(1, 1, 1))
+    out, _, _ = augment(images)
+
+    ratio = (out.mean(dim=(1, 2, 3)) / (images.float() / 255).mean(dim=(1, 2, 3)))
+    assert ((ratio > 0.29) & (ratio < 0.51)).all()
+    assert ratio.std() > 0.02  # not one factor for the whole batch
+
+
+def test_zero_hue_and_jitter_is_identity():
+    images = _batch()
+    augment = BatchAugment(p_low_light=0, brightness=0, contrast=0, saturation=0, hue=1e-9,
+                           p_noise=0, mean=(0, 0, 0), std=(1, 1, 1))
+    out, _, _ = augment(images)
+    assert torch.allclose(out, images.float() / 255, atol=1e-4)
+
+
+def test_flip_remaps_targets_and_mirrors_images():
+    images = _batch()
+    targets = torch.tensor([0, 1, 2, 1, 2, 0, 1, 2])
+    augment = BatchAugment(p_low_light=0, brightness=0, contrast=0, saturation=0, hue=0,
+                           p_noise=0, p_flip=0.5, target_flips=[0, 2, 1])
+    torch.manual_seed(3)
+    out, remapped, flipped = augment(images, targets)
+    assert flipped.any() and not flipped.all()
+
+    plain, _, _ = augment.eval()(images)
+    assert torch.allclose(out[flipped], plain[flipped].flip(-1))
+    assert torch.allclose(out[~flipped], plain[~flipped])
+    assert remapped.tolist() == [
+        [0, 2, 1][t] if f else t for t, f in zip(targets.tolist(), flipped.tolist())
+    ]
+
+
+def test_mecanum_flip_mirrors_tof_and_lateral_commands():
+    tof = torch.tensor([[0.25, 0.75], [0.5, 0.125]])
+    commands = torch.tensor([[0.5, 0.25, -0.5], [0.5, 0.25, -0.5]])
+    tof, commands = _flip_labels(tof, commands, torch.tensor([True, False]))
+    assert tof.tolist() == [[0.75, 0.25], [0.5, 0.125]]
+    assert commands.tolist() == [[0.5, -0.25, 0.5], [0.5, 0.25, -0.5]]
@@ -0,0 +1,144 @@
+"""
+Delivery guarantees of lib.bus, which replaced blinker behind felix.signals.Topics.
+
+The point of the bus is that a slow receiver only ever backs up its own queue:
+the sender (camera thread, 30 Hz controller, NiceGUI loop) must return
+immediately for every non-SYNC topic, while SYNC topics keep blinker's inline
+semantics that app.py and test_object_seeker_signal.py depend on.
+"""
+
+import asyncio
+import threading
+import time
+
+from lib.bus import Policy, Topic
+
+
+class _Recorder:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.payloads = []
+        self.threads = set()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def on_message(self, sender, payload=None):
+        self.gate.wait()
+        time.sleep(self.delay)
+        self.threads.add(threading.get_ident())
+        self.payloads.append(payload)
+
+
+def test_sync_topic_delivers_inline():
+    topic = Topic("t")
+    rec = _Recorder()
+    topic.connect(rec.on_message)
+    topic.send("me", payload=1)
+    assert rec.payloads == [1]
+    assert rec.threads == {threading.get_ident()}
+
+
+def test_slow_receiver_does_not_stall_sender():
+    topic = Topic("t", Policy.LATEST)
+    rec = _Recorder(delay=0.2)
+    topic.connect(rec.on_message)
+    start = time.monotonic()
+    for i in range(5):
+        topic.send("me", payload=i)
+    assert time.monotonic() - start < 0.1
+    assert topic.join(timeout=2)
+    assert threading.get_ident() not in rec.threads
+    # the newest message always survives
+    assert rec.payloads[-1] == 4
+
+
+def test_latest_keeps_only_newest_undelivered_message():
+    topic = Topic("t", Policy.LATEST)
+    rec = _Recorder()
+    rec.gate.clear()
+    topic.connect(rec.on_message)
+    topic.send(payload=0)
+    time.sleep(0.05)  # 0 is now being delivered (blocked on the gate)
+    for i in range(1, 10):
+        topic.send(payload=i)
+    rec.gate.set()
+    assert topic.join(timeout=2)
+    assert rec.payloads == [0, 9]
+    assert topic.stats()[0]["dropped"] == 8
+
+
+def test_drop_oldest_keeps_a_bounded_fifo():
+    topic = Topic("t", Policy.DROP_OLDEST, maxsize=3)
+    rec = _Recorder()
+    rec.gate.clear()
+    topic.connect(rec.on_message)
+    topic.send(payload=0)
+    time.sleep(0.05)
+    for i in range(1, 10):
+        topic.send(payload=i)
+    rec.gate.set()
+    assert topic.join(timeout=2)
+    assert rec.payloads == [0, 7, 8, 9]
+
+
+def test_block_loses_nothing():
+    topic = Topic("t", Policy.BLOCK, maxsize=2)
+    rec = _Recorder(delay=0.005)
+    topic.connect(rec.on_message)
+    for i in range(20):
+        topic.send(payload=i)
+    assert topic.join(timeout=2)
+    assert rec.payloads == list(range(20))
+
+
+def test_block_on_a_loop_does_not_deadlock_sends_from_that_loop():
+    topic = Topic("t", Policy.BLOCK, maxsize=2)
+    rec = _Recorder()
+
+    async def main():
+        topic.connect(rec.on_message)
+        # Fills the queue before the loop has drained it once: waiting for
+        # room here would hold the very loop that has to make it.
+        for i in range(5):
+            topic.send(payload=i)
+        for _ in range(100):
+            if len(rec.payloads) == 2:
+                break
+            await asyncio.sleep(0.01)
+
+    runner = threading.Thread(target=asyncio.run, args=(main(),), daemon=True)
+    runner.start()
+    runner.join(timeout=5)
+    assert not runner.is_alive()
+    assert rec.payloads == [3, 4]
+
+
+def test_delivery_on_the_subscribers_event_loop():
+    topic = Topic("t", Policy.LATEST)
+    rec = _Recorder()
+
+    async def main():
+        topic.connect(rec.on_message)  # picks up the running loop
+        loop_thread = threading.get_ident()
+        sender = threading.Thread(target=lambda: topic.send(payload="x"))
+        sender.start()
+        sender.join()
+        for _ in range(100):
+            if rec.payloads:
+                break
+            await asyncio.sleep(0.01)
+        return loop_thread
+
+    loop_thread = asyncio.run(main())
+    assert rec.payloads == ["x"]
+    assert rec.threads == {loop_thread}
+
+
+def test_receivers_are_held_weakly():
+    topic = Topic("t", Policy.LATEST)
+    rec = _Recorder()
+    topic.connect(rec.on_message)
+    assert len(topic.receivers) == 1
+    del rec
+    assert topic.receivers == []
+    topic.send(payload=1)  # must not raise
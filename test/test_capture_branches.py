@@ -0,0 +1,153 @@
+"""
+The camera only produced the 960x540 display frame, so every model resized it
+again. Capture branches deliver each model's input directly; these check the
+software fallback matches the old resize exactly, branches share the display
+frame's seq, SharedFrame picks them up, and the hardware pipeline is laid out
+one nvvidconv + appsink per branch.
+"""
+
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from felix.agents.video_agent import CameraCapture
+from felix.nodes.inference_server import SharedFrame
+from felix.vision import capture_branches as branches_module
+from felix.vision.capture_branches import (
+    BranchSpec,
+    SoftwareBranches,
+    _PtsSequencer,
+    build_tee_pipeline,
+    capture_branches,
+)
+from felix.vision.frame_ring import FrameRing
+from felix.vision.preprocess import RoiPreprocessor
+
+ROI = (0.6, 0.4, 1.0)
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    capture_branches.clear()
+    yield
+    capture_branches.clear()
+
+
+def _frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (540, 960, 3), dtype=np.uint8)
+
+
+def test_software_branches_match_the_preprocessor_and_share_seq():
+    display = FrameRing(slots=4)
+    spec = BranchSpec("autodrive", 224, 224, roi=ROI)
+    rgb = BranchSpec("rgb", 64, 36, format="RGB")
+    software = SoftwareBranches([
+        (spec, capture_branches.register(spec)),
+        (rgb, capture_branches.register(rgb)),
+    ])
+    display.write(_frame(1))  # seq 0: never branched
+    seq = display.write(_frame(2))
+    with display.lease(seq) as lease:
+        software.write(lease.image, seq, lease.ts)
+
+        pre = RoiPreprocessor(roi=ROI)
+        with SharedFrame(lease) as shared:
+            resized = shared.resized(pre)
+            assert resized is shared.branch("autodrive")
+            assert np.array_equal(resized, pre.resize(lease.image))
+            assert not resized.flags.writeable
+            assert shared.branch("missing") is None
+            assert capture_branches.get("autodrive").ring.leased == 1
+        assert capture_branches.get("autodrive").ring.leased == 0
+
+    rgb_ring = capture_branches.get("rgb").ring
+    assert rgb_ring.latest_seq == seq
+    with rgb_ring.lease(seq) as branch:
+        expected = cv2.cvtColor(cv2.resize(_frame(2), (64, 36), interpolation=cv2.INTER_LINEAR), cv2.COLOR_BGR2RGB)
+        assert np.array_equal(branch.image, expected)
+
+
+def test_shared_frame_falls_back_when_the_branch_lags():
+    display = FrameRing(slots=4)
+    spec = BranchSpec("autodrive", 224, 224, roi=ROI)
+    capture_branches.register(spec)
+    seq = display.write(_frame())
+    pre = RoiPreprocessor(roi=ROI)
+    with display.lease(seq) as lease, SharedFrame(lease) as shared:
+        assert shared.branch("autodrive") is None
+        assert np.array_equal(shared.resized(pre), pre.resize(lease.image))
+
+
+def test_commit_with_an_older_seq_is_leasable_but_not_latest():
+    ring = FrameRing(slots=4)
+    index, buf = ring.claim((2, 2, 3))
+    assert ring.commit(index, seq=5) == 5
+    index, buf = ring.claim((2, 2, 3))
+    ring.commit(index, seq=3)
+    assert ring.latest_seq == 5
+    assert ring.lease().seq == 5
+    assert ring.lease(3).seq == 3
+
+
+def test_tee_pipeline_has_one_crop_and_sink_per_branch():
+    pipeline = build_tee_pipeline(0, 1640, 1232, 30, [
+        BranchSpec("display", 960, 540),
+        BranchSpec("autodrive", 224, 224, roi=ROI),
+        BranchSpec("rgb", 320, 180, format="RGB"),
+    ])
+    assert pipeline.count("nvarguscamerasrc") == 1 and pipeline.count("flip-method=2") == 1
+    assert pipeline.count("appsink") == 3
+    autodrive = pipeline.split("t. ! ")[2]
+    # ROI in sensor pixels, with roi_bounds' arithmetic
+    assert "left=0 right=1640 top=492 bottom=1231" in autodrive
+    assert "width=224, height=224, format=BGRx" in autodrive and "appsink name=autodrive" in autodrive
+    assert "format=RGBA" in pipeline.split("t. ! ")[3]
+
+
+def test_tee_copies_of_a_buffer_get_one_seq():
+    sequence = _PtsSequencer(keep=2)
+    assert [sequence(100), sequence(100), sequence(200), sequence(100), sequence(300)] == [0, 0, 1, 0, 2]
+
+
+def test_camera_capture_software_fallback(monkeypatch):
+    frames = [_frame(i) for i in range(3)]
+
+    class _Capture:
+        def __init__(self, source, *args):
+            self.source = source
+            self.n = 0
+
+        def isOpened(self):
+            return True
+
+        def read(self, buf=None):
+            frame = frames[self.n % len(frames)]
+            self.n += 1
+            time.sleep(0.005)
+            return True, frame[::2, ::2]  # a 480x270 webcam
+
+        def grab(self):
+            return True
+
+        def release(self):
+            pass
+
+    monkeypatch.setattr(branches_module, "Gst", None)
+    monkeypatch.setattr("felix.agents.video_agent.cv2.VideoCapture", _Capture)
+    ring = FrameRing(slots=4)
+    camera = CameraCapture(ring=ring, source="0", branches=[BranchSpec("autodrive", 224, 224, roi=ROI)])
+    camera.start(attempts=1)
+    try:
+        deadline = time.monotonic() + 5
+        while ring.latest_seq < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        camera.stop()
+    assert camera._cap.source == 0
+    branch = capture_branches.get("autodrive")
+    seq = branch.ring.latest_seq
+    with ring.lease(seq) as display, branch.ring.lease(seq) as leased:
+        assert display.image.shape == (540, 960, 3)
+        assert np.array_equal(leased.image, RoiPreprocessor(roi=ROI).resize(display.image))
@@ -0,0 +1,92 @@
+"""
+An idle robot staring at an unchanged scene must not pay for a classifier
+pass per tick: AutoDriver reuses the last softmax while cmd_vel is zero and
+the ROI's thumbnail hasn't moved, and runs the model again as soon as either
+changes -- including when the motion is autodrive's own.
+"""
+
+import numpy as np
+import torch
+
+from felix.nodes import inference_server as server_module
+from felix.nodes.autodriver import TernaryObstacleAvoider
+from felix.nodes.inference_server import InferenceServer
+from felix.signals import Topics
+from felix.vision.change_gate import ChangeGate
+from felix.vision.frame_ring import FrameRing
+from felix.vision.preprocess import RoiPreprocessor
+from lib.interfaces import Twist
+
+
+def _frame(value, noise=0, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = np.full((540, 960, 3), value, dtype=np.int16)
+    if noise:
+        frame += rng.integers(-noise, noise + 1, size=frame.shape, dtype=np.int16)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def test_gate_ignores_sensor_noise_but_not_scene_changes():
+    gate = ChangeGate(threshold=2.0)
+    assert not gate.reuse(_frame(100), idle=True)  # no reference yet
+    assert gate.reuse(_frame(100, noise=3, seed=1), idle=True)
+    assert not gate.reuse(_frame(100), idle=False)  # moving: always infer
+    assert not gate.reuse(_frame(140), idle=True)
+    assert gate.stats == {"hits": 1, "misses": 3, "hit_rate": 0.25}
+
+
+def test_autodriver_reuses_softmax_only_while_idle_and_unchanged():
+    driver = TernaryObstacleAvoider()
+    calls = []
+
+    def backend(x):
+        calls.append(x.shape)
+        return torch.tensor([[2.0, 1.0, 0.0]])
+
+    driver.model_loaded = True
+    driver.backend = backend
+    driver.change_gate = ChangeGate(threshold=2.0)
+    driver._preprocessor = RoiPreprocessor(roi=driver._preprocessor.roi)  # CPU
+
+    driver._on_cmd_vel("test", payload=Twist())
+    first = driver.get_predictions(_frame(100))
+    assert driver.get_predictions(_frame(100, noise=3, seed=1)) is first
+    assert len(calls) == 1
+
+    moving = Twist()
+    moving.linear.x = 0.2
+    driver._on_cmd_vel("test", payload=moving)
+    driver.get_predictions(_frame(100))
+    assert len(calls) == 2
+
+    driver._on_cmd_vel("test", payload=Twist())
+    driver.get_predictions(_frame(180))
+    assert len(calls) == 3
+    assert driver.change_gate.hits == 1
+
+
+def test_no_reuse_through_the_inference_server_while_autodrive_drives(monkeypatch):
+    ring = FrameRing(slots=4)
+    monkeypatch.setattr(server_module, "frame_ring", ring)
+    driver = TernaryObstacleAvoider()
+    calls = []
+
+    def backend(x):
+        calls.append(x.shape)
+        return torch.tensor([[2.0, 1.0, 0.0]])  # forward: autodrive publishes a non-zero twist
+
+    driver.model_loaded = True
+    driver.backend = backend
+    driver.change_gate = ChangeGate(threshold=2.0)
+    driver._preprocessor = RoiPreprocessor(roi=driver._preprocessor.roi)  # CPU
+    driver._on_autodrive("test")
+    server = InferenceServer(frequency=20)
+    server.register(driver)
+
+    for seed in range(4):
+        # Same scene every frame: only the robot's own motion forbids reuse.
+        ring.write(_frame(100, noise=3, seed=seed))
+        server.spinner()
+        assert Topics.cmd_vel.join(timeout=2)  # autodrive's own twists delivered
+    assert len(calls) == 4
+    assert driver.change_gate.hits == 0
@@ -0,0 +1,81 @@
+"""
+cmd_vel is queued (LATEST) while stop is synchronous, so a twist sent just
+before a stop could be delivered after it and restart the motors the stop had
+zeroed. The Controller drops twists sent before its last stop; these check a
+queued one can't override a later stop, while twists sent after it still apply,
+and that motor latency is counted from the send, queueing included.
+"""
+
+import asyncio
+import time
+
+from felix.nodes import controller as controller_module
+from felix.signals import Topics
+from lib.interfaces import Twist, Vector3
+
+
+class _Board:
+    def __init__(self, *args, **kwargs):
+        self.frames = []
+
+    def create_receive_threading(self):
+        pass
+
+    def set_motor(self, *powers):
+        self.frames.append(powers)
+
+    def get_motion_data(self):
+        return (0.0, 0.0, 0.0)
+
+
+class _Collector:
+    def close_navigation(self):
+        pass
+
+
+def _forward():
+    return Twist(linear=Vector3(0.5, 0, 0), angular=Vector3(0, 0, 0))
+
+
+def test_queued_cmd_vel_cannot_override_a_later_stop(monkeypatch):
+    monkeypatch.setattr(controller_module, "Rosmaster", _Board)
+    monkeypatch.setattr(controller_module, "ImageCollector", _Collector)
+
+    async def main():
+        controller = controller_module.Controller(frequency=30)
+        # Both sent without yielding: the twist is still queued for this loop
+        # when the stop runs inline.
+        Topics.cmd_vel.send("autodrive", payload=_forward())
+        Topics.stop.send("app")
+        await asyncio.sleep(0.05)
+        stopped = controller.cmd_vel.is_zero
+
+        Topics.cmd_vel.send("joystick", payload=_forward())
+        await asyncio.sleep(0.05)
+        moving = controller.cmd_vel.linear.x
+        controller.shutdown()
+        return stopped, moving, controller._bot.frames
+
+    stopped, moving, frames = asyncio.run(main())
+    assert stopped
+    assert moving == 0.5
+    assert frames[-1] == (0, 0, 0, 0)  # shutdown
+    assert any(frame != (0, 0, 0, 0) for frame in frames)
+
+
+def test_motor_latency_includes_time_queued_on_the_bus(monkeypatch):
+    monkeypatch.setattr(controller_module, "Rosmaster", _Board)
+    monkeypatch.setattr(controller_module, "ImageCollector", _Collector)
+
+    async def main():
+        controller = controller_module.Controller(frequency=30)
+        Topics.cmd_vel.send("joystick", payload=_forward())
+        time.sleep(0.1)  # the loop is busy: the twist waits in its queue
+        await asyncio.sleep(0.05)
+        stats = controller._motor_writer.stats
+        controller.shutdown()
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["written"] >= 1
+    assert stats["latency_ms_max"] >= 100
@@ -0,0 +1,88 @@
+"""
+FrameRing invariants the capture thread and the nodes rely on.
+
+Every consumer (Robot, Controller, AutoDriver, Detector, CameraTrack) reads the
+camera through leases instead of private copies, so the ring must (a) never
+hand a leased slot back to the writer, (b) never let a reader see a slot that
+is mid-write, and (c) drop frames instead of blocking when readers hold every
+slot.
+"""
+
+import numpy as np
+import pytest
+
+from felix.vision.frame_ring import FrameRing
+
+
+def _frame(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_lease_is_a_read_only_view_of_the_latest_frame():
+    ring = FrameRing(slots=3)
+    assert ring.lease() is None
+
+    seq = ring.write(_frame(7))
+    with ring.lease() as lease:
+        assert lease.seq == seq == 0
+        assert lease.image[0, 0, 0] == 7
+        with pytest.raises(ValueError):
+            lease.image[0, 0, 0] = 1
+
+
+def test_leased_slot_is_never_overwritten():
+    ring = FrameRing(slots=3)
+    ring.write(_frame(1))
+    held = ring.lease()
+    for v in range(2, 20):
+        ring.write(_frame(v))
+    assert held.image[0, 0, 0] == 1
+    assert ring.lease().image[0, 0, 0] == 19
+    held.release()
+    assert ring.leased == 0
+
+
+def test_writer_drops_when_every_free_slot_is_leased():
+    ring = FrameRing(slots=2)
+    ring.write(_frame(1))
+    held = ring.lease()
+    # slot 0 is leased and is the latest; slot 1 is free
+    assert ring.write(_frame(2)) is not None
+    held2 = ring.lease()
+    assert ring.write(_frame(3)) is None
+    assert ring.dropped == 1
+    held.release()
+    held2.release()
+
+
+def test_slot_being_written_is_not_leasable():
+    ring = FrameRing(slots=3)
+    index, buf = ring.claim((4, 6, 3))
+    assert ring.lease() is None
+    buf[:] = 5
+    seq = ring.commit(index)
+    assert ring.lease(seq).image[0, 0, 0] == 5
+
+
+def test_lease_by_sequence_returns_none_once_recycled():
+    ring = FrameRing(slots=2)
+    first = ring.write(_frame(1))
+    ring.write(_frame(2))
+    ring.write(_frame(3))
+    assert ring.lease(first) is None
+
+
+def test_release_of_a_lease_from_before_a_reallocation_is_ignored():
+    ring = FrameRing(slots=3)
+    ring.write(_frame(1))
+    stale = ring.lease()
+    ring.write(_frame(2, shape=(8, 6, 3)))  # new shape: every slot reallocated
+    held = ring.lease()
+    stale.release()
+    assert ring.leased == 1
+    assert stale.image[0, 0, 0] == 1  # the old buffer outlives the reallocation
+    for v in range(3, 10):
+        ring.write(_frame(v, shape=(8, 6, 3)))
+    assert held.image[0, 0, 0] == 2
+    held.release()
+    assert ring.leased == 0
@@ -0,0 +1,78 @@
+"""
+Incremental fine-tuning trains only the last block and head on samples the
+checkpoint's manifest hasn't seen (plus replayed old ones), reusing cached
+trunk features, instead of retraining on every image.
+"""
+
+import json
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from torchvision.models import alexnet, mobilenet_v3_small, resnet50
+
+from felix.settings import settings
+from felix.training import incremental
+from felix.training.incremental import FeatureCache, TrainingManifest, split_model
+from felix.training.roi_trainer import ROIObstacleTrainer
+
+
+@pytest.mark.parametrize("build", [resnet50, mobilenet_v3_small, alexnet])
+def test_split_model_composes_to_the_full_model(build):
+    torch.manual_seed(0)
+    model = build(weights=None, num_classes=3).eval()
+    trunk, tail = split_model(model)
+    x = torch.randn(2, 3, 96, 96)
+    with torch.no_grad():
+        assert torch.allclose(tail(trunk(x)), model(x), atol=1e-5)
+
+
+def test_feature_cache_round_trip(tmp_path):
+    cache = FeatureCache(tmp_path, "abc", "images", (4, 2))
+    features = np.arange(24, dtype=np.float32).reshape(3, 4, 2)
+    cache.add(["a", "b", "c"], features)
+
+    reopened = FeatureCache(tmp_path, "abc", "images", (4, 2))
+    assert np.array_equal(reopened.get(["c", "a"]), features[[2, 0]])
+    assert FeatureCache(tmp_path, "other-trunk", "images", (4, 2)).index == {}
+
+
+def _save_images(root, label, names, seed):
+    rng = np.random.default_rng(seed)
+    (root / label).mkdir(parents=True, exist_ok=True)
+    for name in names:
+        Image.fromarray(rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)).save(root / label / f"{name}.jpg")
+
+
+def test_incremental_trains_on_new_samples_and_updates_manifest(tmp_path, monkeypatch):
+    images = tmp_path / "images"
+    for seed, label in enumerate(("forward", "left", "right")):
+        _save_images(images, label, range(4), seed)
+    monkeypatch.setattr(settings, "model_images", str(images))
+    monkeypatch.setattr(settings.TRAINING, "cache_path", str(tmp_path / "cache"))
+
+    trainer = ROIObstacleTrainer(epochs=1, test_pct=30, batch_size=4, num_workers=0)
+    trainer.model_file = str(tmp_path / "model.pth")
+    monkeypatch.setattr(trainer, "_get_model", lambda: mobilenet_v3_small(weights=None, num_classes=3))
+
+    trainer.train_incremental()  # no checkpoint yet: full training
+    manifest = json.loads((tmp_path / "model.pth.manifest.json").read_text())
+    assert len(manifest["samples"]) == 12
+    assert [h["mode"] for h in manifest["history"]] == ["full"]
+
+    _save_images(images, "left", ["new1", "new2"], seed=9)
+    extracted = []
+    original = ROIObstacleTrainer._extract_features
+    monkeypatch.setattr(
+        ROIObstacleTrainer, "_extract_features",
+        lambda self, trunk, dataset, indices, *a: extracted.append(len(indices)) or original(self, trunk, dataset, indices, *a),
+    )
+    accuracy = trainer.train_incremental(replay_ratio=2.0)
+    assert accuracy is not None
+    assert extracted == [1, 6]  # shape probe, then 2 new + 4 replayed
+    manifest = TrainingManifest.for_checkpoint(trainer.model_file)
+    assert manifest.load() and len(manifest.samples) == 14
+    assert manifest.history[-1]["new_samples"] == 2
+
+    assert trainer.train_incremental() is None  # nothing new
@@ -0,0 +1,68 @@
+"""
+Backend parity for the autodrive classifier.
+
+Every backend must accept the tensor AutoDriver.preprocess produces and return
+logits that agree with the eager PyTorch model, and create_backend must fall
+back to torch instead of leaving autodrive without a model.
+"""
+
+import pytest
+import torch
+from torchvision.models import mobilenet_v3_small
+
+from felix.inference.backends import (
+    OnnxRuntimeBackend,
+    TorchBackend,
+    check_parity,
+    create_backend,
+)
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    torch.manual_seed(0)
+    model = mobilenet_v3_small(weights=None, num_classes=3).eval()
+    path = tmp_path / "roi_ternary_obstacle_avoidance.pth"
+    torch.save(model.state_dict(), path)
+    return model, path
+
+
+def _inputs():
+    g = torch.Generator().manual_seed(1)
+    return [torch.randn(2, 3, 224, 224, generator=g) for _ in range(2)]
+
+
+def test_torch_backend_is_eval_mode_and_matches_module(checkpoint):
+    model, _ = checkpoint
+    backend = TorchBackend(model, torch.device("cpu"))
+    assert not backend.model.training
+    x = _inputs()[0]
+    with torch.no_grad():
+        expected = model(x)
+    assert torch.allclose(backend(x), expected)
+
+
+def test_torch_backend_leaves_the_callers_model_alone(checkpoint):
+    model, _ = checkpoint
+    model.train()
+    backend = TorchBackend(model, torch.device("cpu"), precision="fp16")
+    assert backend.model is not model
+    assert model.training and not backend.model.training
+    assert next(model.parameters()).dtype == torch.float32
+
+
+def test_unavailable_backend_falls_back_to_torch(checkpoint):
+    model, path = checkpoint
+    backend = create_backend(model, path, backend="tensorrt", precision="fp16")
+    assert isinstance(backend, TorchBackend)
+
+
+def test_onnxruntime_backend_matches_torch(checkpoint):
+    pytest.importorskip("onnxruntime")
+    model, path = checkpoint
+    backend = create_backend(model, path, backend="onnxruntime", precision="fp32")
+    assert isinstance(backend, OnnxRuntimeBackend)
+    assert path.with_suffix(".onnx").is_file()
+    report = check_parity(TorchBackend(model, torch.device("cpu")), backend, _inputs())
+    assert report.samples == 4
+    assert report.passed(max_abs_diff=1e-3, min_top1_agreement=1.0), report
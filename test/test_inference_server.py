@@ -0,0 +1,69 @@
+"""
+InferenceServer runs every camera model off one frame lease per tick.
+
+Models that ask for the same crop/resize/normalize must share it instead of
+each redoing it, a frame already inferred on must not be inferred on again,
+and a model registered at a lower frequency must be skipped between its slots.
+"""
+
+import numpy as np
+
+from felix.nodes import inference_server as server_module
+from felix.nodes.inference_server import InferenceServer, SharedFrame
+from felix.vision.frame_ring import FrameRing
+from felix.vision.preprocess import RoiPreprocessor
+
+ROI = (0.6, 0.4, 1.0)
+
+
+class FakeModel:
+    model_loaded = True
+
+    def __init__(self, pre):
+        self.pre = pre
+        self.seqs = []
+        self.tensors = []
+
+    def infer(self, shared: SharedFrame):
+        self.seqs.append(shared.seq)
+        self.tensors.append(shared.tensor(self.pre))
+
+
+def test_shared_frame_memoizes_resize_and_tensor():
+    ring = FrameRing(slots=2)
+    seq = ring.write(np.random.default_rng(0).integers(0, 256, (540, 960, 3), dtype=np.uint8))
+    with ring.lease(seq) as lease:
+        shared = SharedFrame(lease)
+        a, b = RoiPreprocessor(roi=ROI), RoiPreprocessor(roi=ROI)
+        full = RoiPreprocessor(roi=None)
+
+        assert shared.resized(a) is shared.resized(b)
+        assert shared.tensor(a) is shared.tensor(b)
+        assert shared.resized(full) is not shared.resized(a)
+        assert np.allclose(shared.tensor(full).numpy(), full(lease.image).numpy())
+
+
+def test_server_skips_seen_frames_and_honours_model_frequency(monkeypatch):
+    ring = FrameRing(slots=4)
+    monkeypatch.setattr(server_module, "frame_ring", ring)
+    clock = [100.0]
+    monkeypatch.setattr(server_module.time, "monotonic", lambda: clock[0])
+
+    server = InferenceServer(frequency=8)
+    fast = server.register(FakeModel(RoiPreprocessor(roi=ROI)))
+    slow = server.register(FakeModel(RoiPreprocessor(roi=ROI)), frequency=4)
+
+    server.spinner()  # nothing captured yet
+    assert fast.seqs == []
+
+    for _ in range(4):
+        seq = ring.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        server.spinner()
+        server.spinner()  # same frame again: skipped
+        clock[0] += 0.125
+
+    assert fast.seqs == [0, 1, 2, 3]
+    assert slow.seqs == [0, 2]  # 4 Hz model, frames every 125 ms
+    assert fast.tensors[0] is slow.tensors[0]
+    assert server.stats["frames"] == 4
+    assert server.stats["skipped"] == 5
@@ -0,0 +1,62 @@
+"""
+JPEG encoding goes through one configurable encoder service. The quality
+argument used to be silently ignored; quality and chroma subsampling must
+now change the output, unavailable backends must fall back to OpenCV, and
+the worker pool must release the frame lease it was handed.
+"""
+
+import cv2
+import numpy as np
+
+from felix.vision.frame_ring import FrameRing
+from felix.vision.image import ImageUtils
+from felix.vision.jpeg import (
+    Chroma, JpegBackendType, JpegEncoder, OpenCVJpegBackend, create_jpeg_backend,
+)
+
+
+def _frame():
+    # smooth gradient + detail: compresses like a real scene, not like noise
+    y, x = np.mgrid[0:540, 0:960]
+    frame = np.dstack([(x // 4) % 256, (y // 2) % 256, ((x + y) // 8) % 256]).astype(np.uint8)
+    cv2.putText(frame, "felix", (100, 300), cv2.FONT_HERSHEY_SIMPLEX, 6, (255, 255, 255), 12)
+    return frame
+
+
+def test_quality_and_chroma_change_the_output():
+    frame = _frame()
+    low = ImageUtils.bgr8_to_jpeg(frame, quality=30)
+    high = ImageUtils.bgr8_to_jpeg(frame, quality=95)
+    assert low[:2] == high[:2] == b"\xff\xd8"
+    assert len(high) > len(low)
+
+    if OpenCVJpegBackend._SAMPLING[Chroma.c444] is not None:
+        full = OpenCVJpegBackend(quality=90, chroma="444").encode(frame)
+        sub = OpenCVJpegBackend(quality=90, chroma="420").encode(frame)
+        assert len(full) > len(sub)
+
+    decoded = cv2.imdecode(np.frombuffer(high, np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == frame.shape
+
+
+def test_unavailable_backend_falls_back_to_opencv(monkeypatch):
+    from felix.vision import jpeg as jpeg_module
+
+    monkeypatch.setattr(jpeg_module, "turbojpeg", None)
+    monkeypatch.setattr(jpeg_module, "Gst", None)
+    assert isinstance(create_jpeg_backend(JpegBackendType.turbojpeg), OpenCVJpegBackend)
+    assert isinstance(create_jpeg_backend(JpegBackendType.auto), OpenCVJpegBackend)
+
+
+def test_pool_encodes_leases_and_releases_them():
+    ring = FrameRing(slots=3)
+    encoder = JpegEncoder(backend="opencv", workers=2, max_pending=2)
+    futures = []
+    for v in range(6):
+        ring.write(np.full((540, 960, 3), v * 40, dtype=np.uint8))
+        futures.append(encoder.submit(ring.lease()))
+    jpegs = [f.result(timeout=5) for f in futures]
+    encoder.shutdown()
+
+    assert all(j[:2] == b"\xff\xd8" for j in jpegs)
+    assert ring.leased == 0
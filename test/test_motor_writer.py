@@ -0,0 +1,75 @@
+"""
+Motor commands are written from a dedicated thread, one frame per control
+period, so a burst of cmd_vel twists (a joystick drag) neither blocks the
+publisher on serial I/O nor floods the board: the burst collapses into the
+newest command, and a stop goes out without waiting for the next period.
+"""
+
+import threading
+import time
+
+from lib.controllers.motor_writer import MotorCommandWriter
+
+
+class SlowMotors:
+    def __init__(self, delay=0.002):
+        self.delay = delay
+        self.frames = []
+        self.written = threading.Event()
+
+    def __call__(self, *powers):
+        time.sleep(self.delay)
+        self.frames.append(powers)
+        self.written.set()
+
+
+def _wait_idle(writer, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while writer._pending is not None and time.monotonic() < deadline:
+        time.sleep(0.005)
+    time.sleep(0.02)
+
+
+def test_burst_is_coalesced_without_blocking_the_sender():
+    motors = SlowMotors()
+    writer = MotorCommandWriter(motors, frequency=20)
+
+    start = time.monotonic()
+    for i in range(1, 101):
+        writer.submit((i, i, i, i))
+    assert time.monotonic() - start < 0.05  # 100 writes inline would take >= 200 ms
+
+    _wait_idle(writer)
+    assert motors.frames[-1] == (100, 100, 100, 100)
+    assert len(motors.frames) <= 3
+    stats = writer.stats
+    assert stats["submitted"] == 100
+    assert stats["written"] + stats["coalesced"] == 100
+    assert stats["latency_ms_max"] > 0
+    writer.close()
+
+
+def test_stop_is_not_rate_limited_and_never_deduplicated():
+    motors = SlowMotors(delay=0.0)
+    writer = MotorCommandWriter(motors, frequency=1)  # one moving frame per second
+
+    writer.submit((50, 50, 50, 50))
+    assert motors.written.wait(1.0)
+    motors.written.clear()
+    writer.submit((0, 0, 0, 0))
+    assert motors.written.wait(0.5)  # well inside the 1 s period
+    motors.written.clear()
+    writer.submit((0, 0, 0, 0))
+    assert motors.written.wait(0.5)
+    assert motors.frames == [(50, 50, 50, 50), (0, 0, 0, 0), (0, 0, 0, 0)]
+    writer.close()
+
+
+def test_close_writes_the_pending_command():
+    motors = SlowMotors(delay=0.0)
+    writer = MotorCommandWriter(motors, frequency=1)
+    writer.submit((30, 30, 30, 30))
+    assert motors.written.wait(1.0)
+    writer.submit((40, 40, 40, 40))  # held back by the 1 s period
+    writer.close()
+    assert motors.frames[-1] == (40, 40, 40, 40)
@@ -0,0 +1,105 @@
+"""
+Navigation capture is packed into append-only .navshard files instead of one
+JPEG per sample with its labels in the filename, so a 100k-sample training
+set opens with a handful of index reads rather than a directory walk and a
+filename parse per image. Training reads shards and any JPEGs not yet packed
+into one together.
+"""
+
+import cv2
+import numpy as np
+
+from felix.training.nav_shards import NavShard, NavShardWriter, convert_folder, find_shards
+
+
+def _jpeg(value):
+    image = np.full((24, 32, 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _values(i):
+    return [100 + i, 200 + i, 10, -20, 30, 110 + i, 210 + i, 40 + i, -50, 60]
+
+
+def test_round_trip_through_index_footer(tmp_path):
+    with NavShardWriter(tmp_path, "session", chunk_size=3) as writer:
+        refs = [writer.append(_values(i), _jpeg(i * 20), ts_ms=1000 + i) for i in range(7)]
+    assert refs[-1] == f"{writer.path}#6"
+
+    shard = NavShard(writer.path)
+    assert len(shard) == 7
+    assert shard.records["ts_ms"].tolist() == list(range(1000, 1007))
+    assert shard.records["tof"][4].tolist() == [114, 214]
+    assert shard.records["cmd"][4].tolist() == [44, -50, 60]
+    assert shard.records["prev_cmd"][0].tolist() == [10, -20, 30]
+    assert bytes(shard.jpeg(5)) == _jpeg(100)
+    assert abs(int(shard.image(5).mean()) - 100) <= 2
+
+
+def test_unclosed_shard_recovers_flushed_chunks(tmp_path):
+    writer = NavShardWriter(tmp_path, "crashed", chunk_size=2)
+    for i in range(5):  # two chunks written, one sample still queued
+        writer.append(_values(i), _jpeg(i))
+    with open(writer.path, "ab") as f:
+        f.write(b"NAVCHUNK torn")  # a chunk cut off mid-write
+
+    shard = NavShard(writer.path)
+    assert len(shard) == 4
+    assert shard.records["tof"][:, 0].tolist() == [110, 111, 112, 113]
+
+
+def test_writer_rolls_over_and_never_reuses_a_part(tmp_path):
+    with NavShardWriter(tmp_path, "s", chunk_size=1, max_bytes=1) as writer:
+        for i in range(3):
+            writer.append(_values(i), _jpeg(i))
+    with NavShardWriter(tmp_path, "s") as writer:
+        writer.append(_values(3), _jpeg(3))
+
+    paths = find_shards(tmp_path)
+    assert [p.name for p in paths] == [f"s-{i:03d}.navshard" for i in range(4)]
+    assert [len(NavShard(p)) for p in paths] == [1, 1, 1, 1]
+
+
+def test_convert_folder_packs_each_session(tmp_path):
+    src = tmp_path / "nav"
+    for session, count in (("a", 3), ("b", 2)):
+        (src / session).mkdir(parents=True)
+        for i in range(count):
+            values = "_".join(str(v) for v in _values(i))
+            (src / session / f"nav_{values}_{5000 - i}.jpg").write_bytes(_jpeg(i))
+    (src / "a" / "notes.jpg").write_bytes(b"")
+
+    written = convert_folder(src, tmp_path / "packed")
+
+    assert [p.relative_to(tmp_path / "packed").as_posix() for p in written] == [
+        "a/a-000.navshard", "b/b-000.navshard",
+    ]
+    shard = NavShard(written[0])
+    assert shard.records["ts_ms"].tolist() == [4998, 4999, 5000]  # capture order
+    assert shard.records["tof"][0].tolist() == [112, 212]
+
+
+def test_create_dataset_keeps_legacy_jpegs_next_to_shards(tmp_path):
+    from felix.training.mecanum.train import create_dataset
+
+    old = tmp_path / "old"
+    old.mkdir()
+
+    def legacy(i, ts_ms):
+        values = "_".join(str(v) for v in _values(i))
+        (old / f"nav_{values}_{ts_ms}.jpg").write_bytes(_jpeg(i))
+
+    for i in range(3):
+        legacy(i, 5000 + i)
+    convert_folder(old)  # the JPEGs stay, and must not be counted twice
+    legacy(9, 6000)
+    with NavShardWriter(tmp_path / "new", "session") as writer:
+        for i in range(4):
+            writer.append(_values(i), _jpeg(i), ts_ms=7000 + i)
+
+    dataset = create_dataset(tmp_path)
+    assert len(dataset) == 3 + 1 + 4
+    dataset.transform = str  # train_model swaps in the validation transform this way
+    assert all(d.transform is str for d in dataset.datasets)
+    tofs = sorted(int(dataset[i][1][0] * 1200) for i in range(len(dataset)))
+    assert tofs == [110, 110, 111, 111, 112, 112, 113, 119]
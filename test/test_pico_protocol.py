@@ -0,0 +1,58 @@
+"""
+PicoSensors decodes the firmware's binary sensor frames incrementally: frames
+split across serial reads, several sensors per frame, corrupt frames, and the
+JSON lines older firmware prints must all come out as the same SensorReadings.
+"""
+
+import importlib.util
+import pathlib
+import sys
+import types
+
+from lib.controllers.pico_protocol import (
+    TYPE_IR, PicoFrameDecoder, crc8, encode_frame,
+)
+
+
+def _load_firmware(monkeypatch):
+    # main.py imports CircuitPython modules; stub them, it only needs them at runtime
+    for name in ("board", "busio", "digitalio", "usb_cdc", "microcontroller", "adafruit_vl53l0x"):
+        module = types.ModuleType(name)
+        module.Pin = module.VL53L0X = object
+        monkeypatch.setitem(sys.modules, name, module)
+    path = pathlib.Path(__file__).parent.parent / "pico-sensors-app" / "main.py"
+    spec = importlib.util.spec_from_file_location("pico_firmware", path)
+    firmware = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(firmware)
+    return firmware
+
+
+def test_decodes_split_batched_corrupt_and_legacy_input():
+    good = encode_frame([(0, "ir", 312), (1, "ir", 8190)], ts_ms=123456)
+    corrupt = bytearray(encode_frame([(0, "ir", 99)], ts_ms=1))
+    corrupt[-2] ^= 0xFF
+    legacy = b'{"id": 1, "type": "tof", "value": 250}\r\n' + b"{'id': 0, 'type': 'ir', 'value': 77}\r\n"
+    stream = b"Error reading sensor: x\r\n" + good + bytes(corrupt) + legacy + good
+
+    decoder = PicoFrameDecoder()
+    readings = []
+    for i in range(0, len(stream), 3):
+        readings += decoder.feed(stream[i:i + 3])
+
+    assert [(r.id, r.type, r.value) for r in readings] == [
+        (0, "ir", 312), (1, "ir", 8190),
+        (1, "tof", 250), (0, "ir", 77),
+        (0, "ir", 312), (1, "ir", 8190),
+    ]
+    assert readings[0].device_ts == 123456
+    assert decoder.stats["frames"] == 2
+    assert decoder.stats["json_lines"] == 2
+    assert decoder.stats["crc_errors"] == 1
+    assert decoder.buffer == bytearray()
+
+
+def test_firmware_encoder_matches_host_protocol(monkeypatch):
+    firmware = _load_firmware(monkeypatch)
+    readings = [(0, TYPE_IR, 312), (1, TYPE_IR, 65535)]
+    assert bytes(firmware.encode_frame(readings, 42)) == encode_frame(readings, 42)
+    assert firmware.crc8(b"123456789") == crc8(b"123456789") == 0xF4
@@ -0,0 +1,75 @@
+"""
+PicoSensors publishes each reading from its own serial reader thread as soon
+as the bytes arrive, instead of the UI event loop draining the port every
+100 ms, and stamps it with the monotonic receipt time so consumers and the
+node's latency stats can see how stale it is.
+"""
+
+import threading
+import time
+
+from felix.nodes import pico as pico_module
+from felix.nodes.pico import PicoSensors
+from felix.signals import Topics
+from lib.controllers.pico_protocol import encode_frame
+
+
+class FakePort:
+    def __init__(self, *args, **kwargs):
+        self.chunks = []
+        self.ready = threading.Condition()
+        self.is_open = True
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def push(self, data):
+        with self.ready:
+            self.chunks.append(data)
+            self.ready.notify()
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        with self.ready:
+            self.ready.wait_for(lambda: self.chunks, timeout=0.1)
+            return self.chunks.pop(0) if self.chunks else b""
+
+    def close(self):
+        self.is_open = False
+
+
+def test_readings_are_published_from_the_reader_thread(monkeypatch):
+    monkeypatch.setattr(pico_module.serial, "Serial", FakePort)
+    node = PicoSensors()
+    received = []
+    done = threading.Event()
+
+    def on_reading(sender, payload):
+        received.append(payload)
+        if len(received) == 4:
+            done.set()
+
+    Topics.pico_sensors.connect(on_reading)
+    try:
+        node.start()
+        for ts in (1000, 1030):
+            node.ser.push(encode_frame([(0, "ir", 300), (1, "ir", 420)], ts_ms=ts))
+            time.sleep(0.01)
+        assert done.wait(2.0)
+        Topics.pico_sensors.join(1.0)
+    finally:
+        Topics.pico_sensors.disconnect(on_reading)
+        node.shutdown()
+
+    readings = received
+    assert [(r.id, r.value) for r in readings] == [(0, 300), (1, 420), (0, 300), (1, 420)]
+    assert all(r.received_at is not None and r.received_at <= time.monotonic() for r in readings)
+    assert node.latency["transport"]["n"] == 4
+    assert node.latency["delivery"]["n"] == 4
+    assert not node._reader.is_alive()
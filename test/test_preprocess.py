@@ -0,0 +1,52 @@
+"""
+The fused RoiPreprocessor must be numerically interchangeable with the
+original AutoDriver.preprocess (cvtColor -> ROI crop -> resize -> Normalize),
+which is what the ROI checkpoints were trained against.
+"""
+
+import cv2
+import numpy as np
+import torch
+import torchvision
+
+from felix.vision.preprocess import RoiPreprocessor
+from felix.vision.roi_utils import apply_roi_crop
+
+ROI = (0.6, 0.4, 1.0)
+
+
+def _reference(bgr, roi):
+    x = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    if roi is not None:
+        x = apply_roi_crop(x, roi_height_ratio=roi[0], roi_vertical_offset=roi[1], roi_width_ratio=roi[2])
+    x = cv2.resize(x, (224, 224), interpolation=cv2.INTER_LINEAR)
+    x = torch.from_numpy(x.transpose((2, 0, 1))).float()
+    mean = 255.0 * np.array([0.485, 0.456, 0.406])
+    std = 255.0 * np.array([0.229, 0.224, 0.225])
+    return torchvision.transforms.Normalize(mean, std)(x)[None, ...]
+
+
+def test_matches_reference_path_with_and_without_roi():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(540, 960, 3), dtype=np.uint8)
+    for roi in (ROI, None):
+        out = RoiPreprocessor(roi=roi)(frame)
+        assert out.shape == (1, 3, 224, 224)
+        assert out.dtype == torch.float32
+        assert torch.allclose(out, _reference(frame, roi), atol=1e-5)
+
+
+def test_buffers_are_reused_across_frames_and_resolutions():
+    pre = RoiPreprocessor(roi=ROI)
+    a = pre(np.zeros((540, 960, 3), dtype=np.uint8))
+    ptr = a.data_ptr()
+    b = pre(np.full((720, 1280, 3), 255, dtype=np.uint8))
+    assert b.data_ptr() == ptr
+    assert torch.allclose(b, _reference(np.full((720, 1280, 3), 255, dtype=np.uint8), ROI), atol=1e-5)
+
+
+def test_accepts_read_only_ring_views():
+    frame = np.random.default_rng(1).integers(0, 256, size=(540, 960, 3), dtype=np.uint8)
+    view = frame.view()
+    view.flags.writeable = False
+    assert torch.allclose(RoiPreprocessor(roi=ROI)(view), _reference(frame, ROI), atol=1e-5)
@@ -0,0 +1,71 @@
+"""
+Robot must not JPEG-encode camera frames it never serves.
+
+Robot used to encode every frame published on Topics.raw_image (up to 59/s)
+even though JPEGs are only consumed by snapshots, tags and the MJPEG stream.
+It now encodes the latest frame_ring frame on demand, once per frame
+sequence number.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from felix.nodes import robot as robot_module
+from felix.nodes.robot import Robot
+from felix.vision.frame_ring import frame_ring
+
+
+def test_jpeg_is_encoded_on_demand_once_per_frame(monkeypatch):
+    calls = []
+    real = robot_module.ImageUtils.bgr8_to_jpeg
+
+    def counting(frame, quality=75):
+        calls.append(frame[0, 0, 0])
+        return real(frame, quality)
+
+    monkeypatch.setattr(robot_module.ImageUtils, "bgr8_to_jpeg", staticmethod(counting))
+    robot = Robot()
+
+    for v in range(10):
+        frame_ring.write(np.full((48, 64, 3), v, dtype=np.uint8))
+    assert calls == []  # publishing frames costs nothing
+
+    first = robot.get_image()
+    assert first[:2] == b"\xff\xd8"
+    assert robot.get_image() is first
+    assert calls == [9]
+
+    frame_ring.write(np.full((48, 64, 3), 42, dtype=np.uint8))
+    assert robot.get_image() is not first
+    assert calls == [9, 42]
+
+
+def test_stream_does_not_spin_on_a_frame_that_fails_to_encode(monkeypatch):
+    calls = []
+
+    def failing(frame, quality=75):
+        calls.append(frame[0, 0, 0])
+        raise ValueError("encoder gone")
+
+    monkeypatch.setattr(robot_module.ImageUtils, "bgr8_to_jpeg", staticmethod(failing))
+    robot = Robot()
+    frame_ring.write(np.full((48, 64, 3), 7, dtype=np.uint8))
+    stream = robot.get_stream(poll_seconds=0.005)
+
+    def pull():
+        try:
+            next(stream)
+        except StopIteration:
+            pass
+
+    thread = threading.Thread(target=pull, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    assert calls == [7]  # tried once, then waits for a new frame
+
+    monkeypatch.setattr(robot_module.ImageUtils, "bgr8_to_jpeg", staticmethod(lambda frame, quality=75: b"jpeg"))
+    frame_ring.write(np.full((48, 64, 3), 8, dtype=np.uint8))
+    thread.join(2)
+    assert not thread.is_alive()
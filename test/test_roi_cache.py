@@ -0,0 +1,82 @@
+"""
+The ROI trainer decoded, cropped and resized every JPEG on every epoch. The
+deterministic part is now cached once in a memory-mapped array, so these
+check the cache reproduces the old PIL pipeline and only redoes changed files.
+"""
+
+import os
+
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+
+from felix.training.roi_cache import CachedRoiImageFolder, RoiImageCache
+from felix.vision.roi_utils import ROITransform
+
+
+def _make_folder(root, per_class=3):
+    rng = np.random.default_rng(0)
+    for label in ("forward", "left", "right"):
+        (root / label).mkdir(parents=True)
+        for i in range(per_class):
+            pixels = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(root / label / f"{i}_image.jpg")
+
+
+def _roi():
+    return ROITransform(roi_height_ratio=0.6, roi_width_ratio=1.0, roi_vertical_offset=0.4)
+
+
+def test_rows_match_the_uncached_pipeline(tmp_path):
+    images = tmp_path / "images"
+    _make_folder(images)
+    cache = RoiImageCache(tmp_path / "cache", images, _roi(), size=(32, 32))
+    dataset = CachedRoiImageFolder(images, cache)
+
+    path, target = dataset.samples[4]
+    expected = np.asarray(transforms.Resize((32, 32))(_roi()(Image.open(path).convert("RGB"))))
+    sample, label = dataset[4]
+    assert label == target
+    assert sample.dtype == torch.uint8 and sample.shape == (3, 32, 32)
+    assert np.array_equal(sample.permute(1, 2, 0).numpy(), expected)
+
+
+def test_cache_is_reused_and_changed_files_are_redone(tmp_path, monkeypatch):
+    images = tmp_path / "images"
+    _make_folder(images)
+    CachedRoiImageFolder(images, RoiImageCache(tmp_path / "cache", images, _roi(), size=(32, 32)))
+
+    decoded = []
+    from felix.training import roi_cache
+    original = roi_cache._Preprocess.__getitem__
+    monkeypatch.setattr(roi_cache._Preprocess, "__getitem__", lambda self, i: decoded.append(i) or original(self, i))
+
+    cache = RoiImageCache(tmp_path / "cache", images, _roi(), size=(32, 32))
+    CachedRoiImageFolder(images, cache)
+    assert decoded == []
+
+    changed = images / "left" / "1_image.jpg"
+    Image.fromarray(np.zeros((60, 80, 3), dtype=np.uint8)).save(changed)
+    os.utime(changed, ns=(0, 10**18))
+    dataset = CachedRoiImageFolder(images, RoiImageCache(tmp_path / "cache", images, _roi(), size=(32, 32)))
+    assert len(decoded) == 1
+    index = [str(p) for p, _ in dataset.samples].index(str(changed))
+    assert int(dataset[index][0].max()) < 8
+    # a different ROI is a different cache
+    other = RoiImageCache(tmp_path / "cache", images, None, size=(32, 32))
+    assert other.data_path != cache.data_path
+
+
+def test_flip_swaps_targets(tmp_path, monkeypatch):
+    images = tmp_path / "images"
+    _make_folder(images, per_class=1)
+    cache = RoiImageCache(tmp_path / "cache", images, _roi(), size=(16, 16))
+    dataset = CachedRoiImageFolder(images, cache, random_flip=True, target_flips=[0, 2, 1])
+    monkeypatch.setattr(torch, "rand", lambda n: torch.ones(n))
+
+    left = dataset.class_to_idx["left"]
+    index = [t for _, t in dataset.samples].index(left)
+    sample, target = dataset[index]
+    assert target == dataset.class_to_idx["right"]
+    assert torch.equal(sample, torch.from_numpy(np.array(cache[dataset.rows[index]])).permute(2, 0, 1).flip(-1))
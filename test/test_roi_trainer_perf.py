@@ -0,0 +1,68 @@
+"""
+ROIObstacleTrainer's performance mode (AMP on CUDA, torch.compile,
+channels_last, gradient accumulation) and its once-per-epoch metric sync
+must still train and count accuracy the same way as the plain loop.
+"""
+
+import torch
+
+from felix.training.roi_trainer import ROIObstacleTrainer
+
+
+class _Tiny(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 4, 3, stride=4)
+        self.fc = torch.nn.Linear(4, 3)
+
+    def forward(self, x):
+        return self.fc(self.conv(x).mean(dim=(2, 3)))
+
+
+def _loader(n=12, batch_size=4):
+    torch.manual_seed(0)
+    images = torch.randint(0, 256, (n, 3, 32, 32), dtype=torch.uint8)
+    labels = torch.randint(0, 3, (n,))
+    return torch.utils.data.DataLoader(list(zip(images, labels)), batch_size=batch_size)
+
+
+def _trainer(**kwargs):
+    return ROIObstacleTrainer(epochs=1, num_workers=0, batch_size=4, **kwargs)
+
+
+def test_accumulation_steps_the_optimizer_every_n_batches():
+    trainer = _trainer(accumulate_steps=2, pct_low_light=0, pct_noise=0)
+    model = _Tiny()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    steps = []
+    optimizer.register_step_post_hook(lambda *args: steps.append(1))
+    scaler = torch.amp.GradScaler("cpu", enabled=False)
+
+    loss, images_per_sec = trainer._train_epoch(
+        model, _loader(n=12), optimizer, scaler, trainer._get_augment(), torch.device("cpu"), False
+    )
+    assert len(steps) == 2  # 3 batches: a step after batch 2 and one for the remainder
+    assert loss > 0 and images_per_sec > 0
+
+
+def test_performance_mode_falls_back_to_eager_and_matches_accuracy(monkeypatch):
+    def broken_compile(model):
+        raise RuntimeError("no compiler")
+    monkeypatch.setattr(torch, "compile", broken_compile)
+
+    trainer = _trainer(performance=True)
+    model = _Tiny()
+    device = torch.device("cpu")
+    prepared = trainer._prepare_model(model, device)
+    assert prepared is model
+    assert model.conv.weight.is_contiguous(memory_format=torch.channels_last)
+
+    augment = trainer._get_augment()
+    loader = _loader()
+    accuracy = trainer._evaluate(prepared, loader, augment, device, False)
+
+    augment.eval()
+    model.eval()
+    with torch.no_grad():
+        correct = sum(int((model(augment(x)[0]).argmax(1) == y).sum()) for x, y in loader)
+    assert accuracy == correct / 12
@@ -0,0 +1,132 @@
+"""
+The viewer used to receive only video, with the boxes burned into it. Detections
+plus cmd_vel and ToF now go to each peer over a pre-negotiated data channel;
+these check the binary messages round-trip, a backed-up channel is skipped
+rather than queued, and a browser-like peer gets a detection over the channel
+from VideoStream._offer.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from aiortc import RTCPeerConnection, RTCSessionDescription
+
+from felix.agents.telemetry import (
+    DETECTIONS,
+    TELEMETRY,
+    TelemetryFanout,
+    decode,
+    encode_detections,
+    encode_telemetry,
+)
+from felix.settings import settings
+from felix.signals import Topics
+from felix.vision.frame_ring import FrameRing
+from lib.interfaces import Detection, DetectionFrame
+
+
+def _frame(seq=7):
+    return DetectionFrame(
+        detections=[
+            Detection("person", 0.91, 0.1, 0.3, 0.4, 0.9),
+            Detection("café", 0.5, 0.6, 0.0, 1.2, 0.5),  # clamped to the frame
+        ],
+        width=960, height=540, ts=0, seq=seq,
+    )
+
+
+def test_detections_round_trip():
+    data = encode_detections(_frame())
+    assert len(data) == 6 + 2 * 10 + len("person") + len("café".encode())
+    kind, payload = decode(data)
+    assert kind == DETECTIONS and payload["seq"] == 7
+    person, cafe = payload["detections"]
+    assert person.label == "person" and cafe.label == "café"
+    assert person.confidence == pytest.approx(0.91, abs=1 / 255)
+    assert (person.x1, person.y1, person.x2, person.y2) == pytest.approx((0.1, 0.3, 0.4, 0.9), abs=1e-4)
+    assert cafe.x2 == 1.0
+
+
+def test_telemetry_round_trip():
+    kind, payload = decode(encode_telemetry((0.5, 0.0, -1.25), {1: 310.0, 0: 120.5}))
+    assert kind == TELEMETRY
+    assert payload["cmd_vel"] == (0.5, 0.0, -1.25)
+    assert payload["tof"] == {0: 120.5, 1: 310.0}
+
+
+class _Channel:
+    def __init__(self, state="open", buffered=0):
+        self.readyState = state
+        self.bufferedAmount = buffered
+        self.sent = []
+
+    def on(self, event, handler):
+        pass
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+def test_fanout_skips_closed_and_backed_up_channels():
+    async def main():
+        fanout = TelemetryFanout(rate=1000, max_buffered=100)
+        channels = [_Channel(), _Channel(buffered=1000), _Channel(state="connecting")]
+        for channel in channels:
+            fanout.attach(channel)
+        fanout.broadcast(b"\x02")
+        for channel in channels:
+            fanout.detach(channel)
+        return fanout, channels
+
+    fanout, (ok, backed_up, connecting) = asyncio.run(main())
+    assert ok.sent and ok.sent[0] == b"\x02"
+    assert not backed_up.sent and not connecting.sent
+    assert fanout.skipped >= 1 and fanout.channels == 0
+
+
+def test_offer_with_a_data_channel_streams_detections(monkeypatch):
+    from felix.agents.video_agent import VideoStream
+
+    monkeypatch.setattr(settings, "webrtc_client_overlay", True)
+
+    class _Request:
+        def __init__(self, offer):
+            self._offer = offer
+
+        async def json(self):
+            return {"sdp": self._offer.sdp, "type": self._offer.type}
+
+    async def main():
+        stream = VideoStream(shared_encoder=True)
+        stream.camera = FrameRing(slots=4)
+        stream.camera.write(np.zeros((120, 200, 3), dtype=np.uint8))
+        client = RTCPeerConnection()
+        client.addTransceiver("video", direction="recvonly")
+        channel = client.createDataChannel("telemetry", negotiated=True, id=0, ordered=False, maxRetransmits=0)
+        messages = asyncio.Queue()
+        channel.on("message", messages.put_nowait)
+        await client.setLocalDescription(await client.createOffer())
+        response = await stream._offer(_Request(client.localDescription))
+        await client.setRemoteDescription(RTCSessionDescription(**json.loads(response.body)))
+
+        received = {}
+        deadline = asyncio.get_running_loop().time() + 20
+        while DETECTIONS not in received:
+            if TELEMETRY in received:
+                Topics.detections.send(None, payload=_frame(seq=42))
+            data = await asyncio.wait_for(messages.get(), deadline - asyncio.get_running_loop().time())
+            kind, payload = decode(data)
+            received[kind] = payload
+        overlay = stream._overlay
+        await client.close()
+        for pc in list(stream._pcs):
+            await pc.close()
+        return received, overlay
+
+    received, overlay = asyncio.run(main())
+    assert received[DETECTIONS]["seq"] == 42
+    assert [d.label for d in received[DETECTIONS]["detections"]] == ["person", "café"]
+    assert "cmd_vel" in received[TELEMETRY]
+    assert overlay is None  # drawn by the viewer, not burned into the video
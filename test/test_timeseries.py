@@ -0,0 +1,151 @@
+"""
+The shared state store answers "what was this signal at time t" from a
+fixed-size ring, so a frame can be paired with the ToF reading that was
+current when it was captured rather than whatever arrived last.
+"""
+
+import sys
+import threading
+
+import numpy as np
+
+from felix.state import StateStore
+from lib.interfaces import SensorReading
+from lib.timeseries import TimeSeries
+
+
+def test_lookups_across_the_ring_wrap():
+    series = TimeSeries(capacity=8)
+    for i in range(20):  # wraps twice; samples 12..19 remain
+        series.append(float(i), i * 10.0)
+
+    assert len(series) == 8
+    t, value = series.latest()
+    assert (t, value[0]) == (19.0, 190.0)
+    assert series.at(15.5)[0] == 150.0
+    assert series.at(15.0)[0] == 150.0
+    assert series.at(15.5, back=2)[0] == 130.0
+    assert series.at(11.9) is None  # older than the retained history
+    assert series.at(13.0, back=2) is None
+    assert series.interpolate(16.25)[0] == 162.5
+    assert series.interpolate(100.0)[0] == 190.0
+    ts, values = series.window(13.0, 16.0)
+    assert ts.tolist() == [14.0, 15.0, 16.0]
+    assert values[:, 0].tolist() == [140.0, 150.0, 160.0]
+
+
+def test_readers_never_see_torn_samples_while_writer_wraps():
+    series = TimeSeries(capacity=64, dim=2)
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            series.append(float(i), (i, -i))
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            latest = series.latest()
+            if latest is None:
+                continue
+            t, value = latest
+            older = series.at(t - 10)
+            assert value[0] == -value[1] == t
+            assert older is None or older[0] == -older[1] == t - 10
+    finally:
+        stop.set()
+        thread.join()
+
+
+class _PausedValues(np.ndarray):
+    """Value storage whose writes wait for ``go``: the writer is parked mid-append."""
+
+    def __setitem__(self, index, value):
+        self.parked.set()
+        self.go.wait(2)
+        super().__setitem__(index, value)
+
+
+def test_reader_never_returns_a_slot_the_writer_is_recycling():
+    series = TimeSeries(capacity=4)
+    for i in range(6):
+        series.append(float(i), i)
+    values = series._v.view(_PausedValues)
+    values.parked, values.go = threading.Event(), threading.Event()
+    series._v = values
+
+    # Recycles the slot holding t=2: its new timestamp lands before its value.
+    writer = threading.Thread(target=series.append, args=(6.0, 6))
+    writer.start()
+    assert values.parked.wait(2)
+    result = []
+    reader = threading.Thread(target=lambda: result.append(series.window(-1.0, 100.0)))
+    reader.start()
+    reader.join(0.2)
+    values.go.set()
+    writer.join()
+    reader.join()
+
+    ts, vs = result[0]
+    assert np.all(np.diff(ts) > 0)
+    assert np.array_equal(vs[:, 0], ts)
+
+
+def test_lookups_racing_the_writer_see_consistent_sorted_samples():
+    # A tiny ring and a short GIL switch interval put readers inside append()
+    # as often as possible.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    series = TimeSeries(capacity=4, dim=2)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            series.append(float(i), (i, -i))
+            i += 1
+
+    def reader():
+        try:
+            for _ in range(5000):
+                latest = series.latest()
+                if latest is None:
+                    continue
+                t, value = latest
+                assert value[0] == -value[1] == t
+                held = series.at(t - 1.5)
+                assert held is None or (held[0] == -held[1] and held[0] <= t - 1.5)
+                ts, values = series.window(t - 3, t + 10)
+                assert np.all(np.diff(ts) > 0)
+                assert np.array_equal(values[:, 0], ts) and np.array_equal(values[:, 1], -ts)
+        except AssertionError as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads[1:]:
+            thread.join()
+    finally:
+        stop.set()
+        threads[0].join()
+        sys.setswitchinterval(interval)
+    assert not errors, errors[0]
+
+
+def test_store_pairs_frames_with_sensor_values_at_capture_time():
+    store = StateStore(capacity=16)
+    for t, left in ((1.00, 900), (1.05, 400), (1.10, 120)):
+        store.record_reading(SensorReading(id=0, type="tof", value=left, ts=0, received_at=t))
+
+    frame_ts = 1.07
+    assert store.sensor_at("tof", 0, frame_ts) == 400
+    assert store.sensor_at("tof", 0, frame_ts, back=1) == 900
+    assert store.sensor_at("tof", 0) == 120
+    assert store.sensor_at("tof", 1, frame_ts, default=9999) == 9999
+    assert store.sensors_at("tof", frame_ts) == {0: 400}
@@ -0,0 +1,87 @@
+"""
+Detection boxes used to be drawn with cv2 on a full copy of every outgoing
+frame. The overlay is now rasterized once per DetectionFrame and composited
+with a masked copy into the encoder's own frame, so these check it draws the
+same pixels as before, only re-rasterizes when something changed, and writes
+into the av.VideoFrame in place.
+"""
+
+import av
+import cv2
+import numpy as np
+
+from felix.agents.video_overlay import DetectionOverlay, bgr_view
+from lib.interfaces import Detection, DetectionFrame
+
+
+def _detections(*boxes):
+    return DetectionFrame(
+        detections=[Detection(label, conf, *xyxy) for label, conf, xyxy in boxes],
+        width=960, height=540, ts=0,
+    )
+
+
+def _reference(frame, det):
+    """CameraTrack._draw_boxes as it was."""
+    frame = frame.copy()
+    h, w = frame.shape[:2]
+    for d in det.detections:
+        x1, y1 = int(d.x1 * w), int(d.y1 * h)
+        x2, y2 = int(d.x2 * w), int(d.y2 * h)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        label = f"{d.label} {d.confidence * 100:.0f}%"
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        bh = th + 6
+        ytop = y1 - bh if y1 - bh >= 0 else y1
+        x = max(x1, 0)
+        cv2.rectangle(frame, (x, ytop), (x + tw + 4, ytop + bh), (0, 255, 0), -1)
+        cv2.putText(frame, label, (x + 2, ytop + th + 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+    return frame
+
+
+def _frame():
+    return np.random.default_rng(0).integers(0, 256, (540, 960, 3), dtype=np.uint8)
+
+
+def test_overlay_matches_the_old_drawing():
+    det = _detections(
+        ("person", 0.91, (0.1, 0.3, 0.4, 0.9)),
+        ("dog", 0.55, (0.6, 0.0, 0.95, 0.5)),  # label inside the top edge
+    )
+    overlay = DetectionOverlay()
+    overlay._on_detections(None, payload=det)
+    frame = _frame()
+    drawn = overlay.draw(frame)
+    assert drawn is not frame
+    assert np.array_equal(drawn, _reference(frame, det))
+
+
+def test_rasterizes_only_when_detections_or_size_change():
+    overlay = DetectionOverlay()
+    frame = _frame()
+    assert overlay.composite(frame.copy()) is False
+    assert overlay.draw(frame) is frame
+
+    overlay._on_detections(None, payload=_detections(("cup", 0.7, (0.2, 0.2, 0.3, 0.3))))
+    for _ in range(10):
+        overlay.composite(frame.copy())
+    assert overlay.rasterized == 1
+
+    overlay.composite(np.zeros((270, 480, 3), np.uint8))
+    overlay._on_detections(None, payload=_detections(("cup", 0.7, (0.25, 0.2, 0.35, 0.3))))
+    overlay.composite(frame.copy())
+    assert overlay.rasterized == 3
+
+    overlay._on_detections(None, payload=_detections())
+    assert overlay.composite(frame.copy()) is False
+
+
+def test_composites_into_the_video_frame_in_place():
+    det = _detections(("person", 0.9, (0.1, 0.1, 0.5, 0.5)))
+    overlay = DetectionOverlay()
+    overlay._on_detections(None, payload=det)
+    image = _frame()[:, :957]  # odd width: padded rows
+    video_frame = av.VideoFrame.from_ndarray(np.ascontiguousarray(image), format="bgr24")
+    assert overlay.composite(bgr_view(video_frame))
+    assert np.array_equal(video_frame.to_ndarray(format="bgr24"), _reference(image, det))
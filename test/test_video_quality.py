@@ -0,0 +1,79 @@
+"""
+The WebRTC stream ran at one fixed quality, so a weak link stalled instead of
+degrading. These check the quality ladder, the controller's step-down /
+step-up rules, and that moving a viewer between tiers resumes on a keyframe
+at the new size without the timestamps going backwards.
+"""
+
+import asyncio
+
+import av
+import numpy as np
+
+from felix.agents.video_quality import QualityController, QualityTier, TieredRelay, quality_ladder
+from felix.vision.frame_ring import FrameRing
+
+
+def _ring():
+    ring = FrameRing(slots=4)
+    ring.write(np.random.default_rng(0).integers(0, 256, (120, 200, 3), dtype=np.uint8))
+    return ring
+
+
+def test_ladder_scales_size_rate_and_bitrate_together():
+    ladder = quality_ladder(960, 540, 30, 1_500_000, levels=4)
+    assert ladder[0] == QualityTier(960, 540, 30, 1_500_000)
+    assert ladder[-1] == QualityTier(320, 180, 10, 166_666)
+    assert all(a.bitrate > b.bitrate and a.fps >= b.fps for a, b in zip(ladder, ladder[1:]))
+    assert all(t.width % 2 == 0 and t.height % 2 == 0 for t in ladder)
+    assert quality_ladder(960, 540, 30, 1_500_000, levels=1) == ladder[:1]
+
+
+def test_controller_steps_down_fast_and_up_slowly():
+    async def main():
+        relay = TieredRelay(_ring(), quality_ladder(64, 48, 30, 400_000, levels=3))
+        track = relay.subscribe()
+        qc = QualityController(None, track, relay, up_after=3)
+        levels = [
+            qc.decide(0.20, 0.05, 0),   # heavy loss
+            qc.decide(0.00, 0.90, 0),   # rtt spike
+            qc.decide(0.00, 0.90, 0),   # already at the bottom
+            qc.decide(0.00, 0.05, 0),
+            qc.decide(0.05, 0.05, 0),   # not clean: restarts the count
+            qc.decide(0.00, 0.05, 0),
+            qc.decide(0.00, 0.05, 0),
+            qc.decide(0.00, 0.05, 0),   # third clean interval in a row
+            qc.decide(0.00, 0.05, 1),   # relay queue overflowed
+        ]
+        encoder = track.encoder
+        track.stop()
+        return levels, relay.encoders.index(encoder), qc.stats
+
+    levels, encoder_level, stats = asyncio.run(main())
+    assert levels == [1, 2, 2, 2, 2, 2, 2, 1, 2]
+    assert encoder_level == 2
+    assert stats["level"] == 2 and stats["width"] == 20 and stats["switches"] == 4
+
+
+def test_switching_tiers_resumes_on_a_keyframe():
+    async def main():
+        relay = TieredRelay(_ring(), [QualityTier(160, 96, 30, 300_000), QualityTier(64, 48, 30, 100_000)])
+        track = relay.subscribe()
+        before = [await track.recv() for _ in range(3)]
+        relay.set_level(track, 1)
+        after = [await track.recv() for _ in range(3)]
+        stats = relay.stats
+        track.stop()
+        await asyncio.sleep(0)
+        return before, after, stats, relay
+
+    before, after, stats, relay = asyncio.run(main())
+    assert after[0].is_keyframe
+    pts = [p.pts for p in before + after]
+    assert pts == sorted(pts)
+    assert [s["viewers"] for s in stats] == [0, 1]
+    assert all(e._task is None for e in relay.encoders)
+
+    decoder = av.CodecContext.create("h264", "r")
+    frame = next(f for p in after for f in decoder.decode(p))
+    assert (frame.width, frame.height) == (64, 48)
@@ -0,0 +1,98 @@
+"""
+Every WebRTC viewer used to get its own CameraTrack and its own H.264 encode.
+The SharedEncoder encodes each frame once and relays the packets, so these
+check that viewers share packets, start on a keyframe, resync after falling
+behind, and that a browser-style offer is answered with the relay.
+"""
+
+import asyncio
+import json
+
+import av
+import numpy as np
+from aiortc import RTCPeerConnection, RTCSessionDescription
+
+from felix.agents.video_relay import SharedEncoder
+from felix.vision.frame_ring import FrameRing
+
+
+def _ring():
+    ring = FrameRing(slots=4)
+    rng = np.random.default_rng(0)
+    ring.write(rng.integers(0, 256, (120, 200, 3), dtype=np.uint8))
+    return ring
+
+
+def test_viewers_share_one_encode():
+    async def main():
+        encoder = SharedEncoder(_ring(), width=160, height=96, fps=30)
+        a, b = encoder.subscribe(), encoder.subscribe()
+        received_a = [await a.recv() for _ in range(5)]
+        received_b = [await b.recv() for _ in range(5)]
+        frames = encoder.frames_encoded
+        a.stop()
+        b.stop()
+        await asyncio.sleep(0)
+        return encoder, received_a, received_b, frames
+
+    encoder, received_a, received_b, frames = asyncio.run(main())
+    assert all(x is y for x, y in zip(received_a, received_b))
+    assert received_a[0].is_keyframe
+    assert frames < 10  # once per frame, not once per viewer
+    assert encoder.viewers == 0 and encoder._task is None
+
+    decoder = av.CodecContext.create("h264", "r")
+    decoded = [f for packet in received_a for f in decoder.decode(packet)]
+    assert decoded and (decoded[0].width, decoded[0].height) == (160, 96)
+
+
+def test_slow_viewer_resyncs_on_a_keyframe():
+    async def main():
+        encoder = SharedEncoder(_ring(), width=64, height=48, fps=60, gop_seconds=60)
+        fast, slow = encoder.subscribe(), encoder.subscribe()
+        slow._queue = asyncio.Queue(maxsize=2)
+        for _ in range(4):
+            await fast.recv()
+        flushed = slow._need_keyframe or slow._queue.qsize() < 2
+        packet = await slow.recv()
+        fast.stop()
+        slow.stop()
+        return flushed, packet
+
+    flushed, packet = asyncio.run(main())
+    assert flushed
+    assert packet.is_keyframe
+
+
+def test_offer_is_answered_from_the_shared_encoder():
+    from felix.agents.video_agent import VideoStream
+
+    class _Request:
+        def __init__(self, offer):
+            self._offer = offer
+
+        async def json(self):
+            return {"sdp": self._offer.sdp, "type": self._offer.type}
+
+    async def main():
+        stream = VideoStream(shared_encoder=True)
+        stream.camera = _ring()
+        client = RTCPeerConnection()
+        client.addTransceiver("video", direction="recvonly")
+        got = asyncio.get_running_loop().create_future()
+        client.on("track", lambda track: got.set_result(track))
+        await client.setLocalDescription(await client.createOffer())
+        response = await stream._offer(_Request(client.localDescription))
+        answer = RTCSessionDescription(**json.loads(response.body))
+        await client.setRemoteDescription(answer)
+        frame = await asyncio.wait_for((await got).recv(), timeout=20)
+        viewers = stream._relay.encoders[0].viewers
+        await client.close()
+        for pc in list(stream._pcs):
+            await pc.close()
+        return answer.sdp, frame, viewers
+
+    sdp, frame, viewers = asyncio.run(main())
+    assert "H264/90000" in sdp and "VP8/90000" not in sdp
+    assert viewers == 1
+    assert frame.width > 0
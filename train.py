@@ -29,6 +29,14 @@ logger.addHandler(handler)
     help="Accuracy threshold for early stopping",
 )
 @click.option("--start-clean", is_flag=True, help="Start with a clean model")
+@click.option("--batch-size", type=int, default=None, help="Batch size (default: config)")
+@click.option("--workers", type=int, default=None, help="DataLoader workers (default: config)")
+@click.option("--no-cache", is_flag=True, help="Decode and crop every image each epoch")
+@click.option("--cpu-augment", is_flag=True, help="Augment per sample in the loader, not per batch on the device")
+@click.option("--perf", is_flag=True, help="Mixed precision (CUDA), torch.compile and channels_last")
+@click.option("--accumulate", type=int, default=1, help="Batches per optimizer step")
+@click.option("--incremental", is_flag=True, help="Fine-tune the last block on samples new since the checkpoint")
+@click.option("--replay", type=float, default=4.0, help="Old samples replayed per new one (--incremental)")
 def cli(
     epochs,
     pct_low_light,
@@ -37,7 +45,15 @@ def cli(
     test_pct,
     iterations,
     threshold,
-    start_clean
+    start_clean,
+    batch_size,
+    workers,
+    no_cache,
+    cpu_augment,
+    perf,
+    accumulate,
+    incremental,
+    replay,
 ):
     """
     This script trains Felix's Brain.
@@ -61,8 +77,20 @@ def cli(
         early_stop_threshold=threshold,
         pct_low_light=pct_low_light,
         pct_noise=pct_noise,
+        batch_size=batch_size,
+        num_workers=workers,
+        use_cache=not no_cache,
+        augment_on_device=not cpu_augment,
+        performance=perf,
+        accumulate_steps=accumulate,
     )
 
+    if incremental:
+        # one pass: afterwards every sample is in the checkpoint's manifest
+        result = trainer.train_incremental(replay_ratio=replay)
+        logger.info(f"Incremental training result: {result}")
+        return
+
     for i in range(iterations):
         logger.info(f"Iteration {i + 1} of {iterations}")
         result = trainer.train()